@@ -5,6 +5,8 @@ from sqlalchemy.exc import IntegrityError
 
 # Pastikan import ini sesuai dengan struktur folder Anda
 from src.config.models import User, FilesUploaded, Corpus, SDGMapping, SessionLocal, Base, engine
+from src.services.blob_store import put_blob
+from src.services.publication_index import backfill_publication_index
 
 # Memastikan semua tabel di database dibuat sebelum memasukkan data
 Base.metadata.create_all(engine)
@@ -89,7 +91,7 @@ def add_corpus_data(db: Session):
             "title": "A New Method for Poverty Alleviation",
             "abstract": "This paper presents a new approach to alleviate poverty using sustainable economic models.",
             "date_uploaded": datetime.now(),
-            "file_real": b"dummy content",
+            "blob_sha256": put_blob(db, b"dummy content"),
             "doi": "10.1234/test.paper",
             "authors": json.dumps([
                 {"full_name": "John Doe", "orcid": "0000-0002-1825-0097", "institution": {"name": "Test University", "ror_id": "ror.01abcde"}},
@@ -110,7 +112,7 @@ def add_corpus_data(db: Session):
             "title": "Sustainable Urban Planning",
             "abstract": "An analysis of sustainable urban development strategies and their impact on city well-being.",
             "date_uploaded": datetime.now(),
-            "file_real": b"dummy content",
+            "blob_sha256": put_blob(db, b"dummy content"),
             "doi": "10.5678/urban.planning",
             "authors": json.dumps([
                 {"full_name": "Emily White", "orcid": "0000-0001-2345-6789", "institution": {"name": "Tech Institute", "ror_id": "ror.02fghij"}},
@@ -130,7 +132,7 @@ def add_corpus_data(db: Session):
             "title": "Impact of Climate Change on Agriculture",
             "abstract": "Examining the effects of changing climate on food production and a new agricultural approach.",
             "date_uploaded": datetime.now(),
-            "file_real": b"dummy content 3",
+            "blob_sha256": put_blob(db, b"dummy content 3"),
             "doi": "10.9876/climate.change",
             "authors": json.dumps([
                 {"full_name": "Maria Garcia", "orcid": "0000-0003-4567-8901", "institution": {"name": "National Research Center", "ror_id": "ror.03klmno"}},
@@ -150,7 +152,7 @@ def add_corpus_data(db: Session):
             "title": "Economic Policies for Poverty Alleviation",
             "abstract": "A review of economic policies and their effectiveness in reducing poverty.",
             "date_uploaded": datetime.now(),
-            "file_real": b"dummy content 4",
+            "blob_sha256": put_blob(db, b"dummy content 4"),
             "doi": "10.4321/economic.policy",
             "authors": json.dumps([
                 {"full_name": "John Doe", "orcid": "0000-0002-1825-0097", "institution": {"name": "Test University", "ror_id": "ror.01abcde"}},
@@ -182,5 +184,7 @@ if __name__ == "__main__":
         add_user_and_files(db)
         add_sdg_mapping_data(db)
         add_corpus_data(db)
+        # Indeks statistik untuk data contoh yang ditambahkan lewat ORM
+        backfill_publication_index(db)
     finally:
         db.close()
\ No newline at end of file
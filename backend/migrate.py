@@ -0,0 +1,250 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+
+# Skrip migrasi untuk database yang dibuat oleh versi aplikasi sebelumnya.
+# Jalankan dari folder backend: python migrate.py
+from src.config import models
+from src.config.models import SessionLocal, Base, engine
+from src.services.blob_store import put_blob
+from src.services.graph_store import rebuild_user_graph
+from src.services.publication_index import backfill_publication_index
+from src.services.dedup import backfill_content_hashes
+from src.services.model_registry import load_model
+from src.services.sdg_mapping import load_lexicon, map_model_topics
+from src.services.topic_matrices import open_topic_matrices
+
+# Membuat tabel-tabel baru yang belum ada
+Base.metadata.create_all(engine)
+
+def _columns(db: Session, table: str) -> set:
+    return {column["name"] for column in inspect(db.get_bind()).get_columns(table)}
+
+def _add_column(db: Session, table: str, column: str, ddl: str):
+    """Menambahkan kolom ke tabel lama bila belum ada (create_all tidak mengubah tabel)."""
+    if column not in _columns(db, table):
+        db.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+def _create_indexes(table):
+    """Membuat index yang didefinisikan di model tetapi belum ada di tabel lama."""
+    for index in table.indexes:
+        index.create(engine, checkfirst=True)
+
+def _rebuild_table(table):
+    """
+    Membuat ulang tabel SQLite sesuai definisi model terbaru (mis. untuk
+    mengubah constraint NOT NULL) lalu menyalin kolom yang sama.
+    """
+    with engine.connect() as conn:
+        old_columns = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table.name})")}
+        common = ", ".join(c.name for c in table.columns if c.name in old_columns)
+        # legacy_alter_table mencegah SQLite mengubah REFERENCES di tabel lain ke nama _old
+        conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        conn.exec_driver_sql("PRAGMA legacy_alter_table=ON")
+        conn.commit()
+        try:
+            conn.exec_driver_sql(f"ALTER TABLE {table.name} RENAME TO {table.name}_old")
+            indexes = conn.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type = 'index' "
+                f"AND tbl_name = '{table.name}_old' AND sql IS NOT NULL"
+            ).fetchall()
+            for (index_name,) in indexes:
+                conn.exec_driver_sql(f"DROP INDEX {index_name}")
+            table.create(conn)
+            conn.exec_driver_sql(
+                f"INSERT INTO {table.name} ({common}) SELECT {common} FROM {table.name}_old"
+            )
+            conn.exec_driver_sql(f"DROP TABLE {table.name}_old")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.exec_driver_sql("PRAGMA legacy_alter_table=OFF")
+            conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+            conn.commit()
+
+def migrate_blob_store(db: Session):
+    """
+    Memindahkan isi corpus.file_real ke blob store (satu file per hash SHA-256),
+    mengisi blob_sha256 di corpus dan files_uploaded, lalu menghapus kolom lama.
+    """
+    for table in ("corpus", "files_uploaded"):
+        _add_column(db, table, "blob_sha256", "VARCHAR(64) REFERENCES blobs(sha256)")
+    db.commit()
+
+    if "file_real" not in _columns(db, "corpus"):
+        print("Kolom corpus.file_real sudah tidak ada, migrasi blob dilewati.")
+        return
+
+    migrated_blobs = 0
+    while True:
+        row = db.execute(text(
+            "SELECT id, file_id, file_real FROM corpus "
+            "WHERE blob_sha256 IS NULL AND file_real IS NOT NULL LIMIT 1"
+        )).first()
+        if not row:
+            break
+
+        sha256 = put_blob(db, row.file_real)
+        # Semua baris dari file yang sama dengan isi identik diarahkan ke blob
+        # yang sama; perbandingan isi dilakukan di dalam SQLite.
+        db.execute(text(
+            "UPDATE corpus SET blob_sha256 = :sha256 "
+            "WHERE file_id = :file_id AND blob_sha256 IS NULL "
+            "AND file_real = (SELECT file_real FROM corpus WHERE id = :id)"
+        ), {"sha256": sha256, "file_id": row.file_id, "id": row.id})
+        db.execute(text(
+            "UPDATE files_uploaded SET blob_sha256 = :sha256 "
+            "WHERE id = :file_id AND blob_sha256 IS NULL"
+        ), {"sha256": sha256, "file_id": row.file_id})
+        db.commit()
+        migrated_blobs += 1
+
+    db.execute(text("ALTER TABLE corpus DROP COLUMN file_real"))
+    db.commit()
+    print(f"{migrated_blobs} blob dipindahkan, kolom corpus.file_real dihapus.")
+
+def migrate_training_config(db: Session):
+    """Menambahkan kolom konfigurasi training LDA ke analysis_base_file."""
+    _add_column(db, "analysis_base_file", "engine", "VARCHAR")
+    _add_column(db, "analysis_base_file", "workers", "INTEGER")
+    _add_column(db, "analysis_base_file", "chunksize", "INTEGER")
+    _add_column(db, "analysis_base_file", "update_mode", "VARCHAR")
+    db.commit()
+
+def migrate_model_registry(db: Session):
+    """Menambahkan referensi model registry ke analysis_result."""
+    _add_column(db, "analysis_result", "model_id", "INTEGER REFERENCES trained_models(id) ON DELETE SET NULL")
+    db.commit()
+
+def migrate_topic_matrices(db: Session):
+    """Menambahkan lokasi matriks dokumen x topik ke analysis_result."""
+    _add_column(db, "analysis_result", "matrix_path", "VARCHAR")
+    db.commit()
+
+def migrate_incremental_models(db: Session):
+    """Menambahkan referensi model asal untuk versi hasil update incremental."""
+    _add_column(db, "trained_models", "parent_id", "INTEGER REFERENCES trained_models(id) ON DELETE SET NULL")
+    db.commit()
+
+def migrate_coherence_modes(db: Session):
+    """Mengizinkan coherence NULL (mode deferred) dan menambah kolom detail coherence."""
+    columns = _columns(db, "analysis_result")
+    db.close()
+    if "coherence_mode" not in columns:
+        _rebuild_table(models.AnalysisResult.__table__)
+        print("Tabel analysis_result dibuat ulang dengan kolom coherence baru.")
+
+def migrate_graph_columns(db: Session):
+    """Menambahkan kolom tahun terbit dan index filter graf."""
+    _add_column(db, "corpus", "year", "INTEGER")
+    _add_column(db, "graph_nodes", "year", "INTEGER")
+    db.commit()
+    _create_indexes(models.GraphNode.__table__)
+    _create_indexes(models.GraphEdge.__table__)
+
+def migrate_hot_indexes(db: Session):
+    """Index untuk filter per user/file dan cek duplikat upload, lalu memperbarui statistik planner."""
+    db.close()
+    for table in (
+        models.FilesUploaded.__table__,
+        models.Corpus.__table__,
+        models.Metadata.__table__,
+        models.AnalysisResult.__table__,
+    ):
+        _create_indexes(table)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+def migrate_content_hashes(db: Session):
+    """Mengisi index deduplikasi upload (content_hashes) dari corpus_metadata lama."""
+    total = backfill_content_hashes(db)
+    print(f"{total} hash isi baru dicatat untuk deduplikasi.")
+
+def migrate_graph_store(db: Session):
+    """Membangun graf (graph_nodes/graph_edges) untuk user yang belum memilikinya."""
+    user_ids = [
+        row.id for row in db.query(models.User.id).outerjoin(
+            models.GraphVersion, models.GraphVersion.user_id == models.User.id
+        ).filter(models.GraphVersion.user_id.is_(None))
+    ]
+    for user_id in user_ids:
+        rebuild_user_graph(db, user_id)
+        db.commit()
+    print(f"Graf dibangun untuk {len(user_ids)} user.")
+
+def migrate_publication_index(db: Session):
+    """
+    Mengisi tabel normalisasi (authors, institutions, topics dan relasinya)
+    dari JSON Corpus. Tabelnya sendiri dibuat oleh create_all di atas.
+    """
+    total = backfill_publication_index(db)
+    print(f"{total} publikasi dinormalisasi.")
+
+def migrate_job_heartbeat(db: Session):
+    """Menambahkan pemilik dan heartbeat job analisis (deteksi job yang terputus)."""
+    _add_column(db, "analysis_jobs", "worker", "VARCHAR")
+    _add_column(db, "analysis_jobs", "heartbeat_at", "DATETIME")
+    db.commit()
+
+def migrate_sdg_mapping(db: Session):
+    """
+    Menambahkan kolom model/topik LDA/versi leksikon ke sdg_mapping lalu
+    memetakan topik semua model terlatih yang belum dipetakan dengan versi
+    leksikon saat ini.
+    """
+    _add_column(db, "sdg_mapping", "model_id", "INTEGER REFERENCES trained_models(id) ON DELETE CASCADE")
+    _add_column(db, "sdg_mapping", "lda_topic", "INTEGER")
+    _add_column(db, "sdg_mapping", "lexicon_version", "VARCHAR")
+    db.commit()
+    _create_indexes(models.SDGMapping.__table__)
+
+    lexicon = load_lexicon()
+    current = db.query(models.SDGMapping.model_id).filter(
+        models.SDGMapping.lexicon_version == lexicon["version"]
+    )
+    records = db.query(models.TrainedModel).filter(
+        models.TrainedModel.path.isnot(None),
+        models.TrainedModel.id.notin_(current),
+    ).order_by(models.TrainedModel.id).all()
+    mapped = 0
+    for record in records:
+        try:
+            lda_model = load_model(record)
+        except (FileNotFoundError, OSError) as e:
+            print(f"Model {record.id} dilewati: {e}")
+            continue
+        matrix_path = db.query(models.AnalysisResult.matrix_path).filter(
+            models.AnalysisResult.model_id == record.id,
+            models.AnalysisResult.matrix_path.isnot(None),
+        ).order_by(models.AnalysisResult.id.desc()).scalar()
+        topic_word = open_topic_matrices(matrix_path)["topic_word"] if matrix_path else None
+        map_model_topics(db, record, lda_model, topic_word=topic_word, lexicon=lexicon)
+        db.commit()
+        mapped += 1
+    print(f"Topik {mapped} model dipetakan ke SDG (leksikon versi {lexicon['version']}).")
+
+def vacuum():
+    """Mengembalikan ruang kosong ke sistem file setelah data besar dihapus."""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM"))
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        migrate_blob_store(db)
+        migrate_training_config(db)
+        migrate_model_registry(db)
+        migrate_incremental_models(db)
+        migrate_coherence_modes(db)
+        migrate_topic_matrices(db)
+        migrate_graph_columns(db)
+        migrate_hot_indexes(db)
+        migrate_content_hashes(db)
+        migrate_publication_index(db)
+        migrate_graph_store(db)
+        migrate_sdg_mapping(db)
+        migrate_job_heartbeat(db)
+    finally:
+        db.close()
+    vacuum()
@@ -0,0 +1,23 @@
+import argparse
+import sys
+
+# Men-download data NLTK ke direktori lokal agar server tidak butuh akses
+# internet saat berjalan. Jalankan dari folder backend saat build image:
+# python prefetch_nltk.py [--dir nltk_data]
+from src.config.settings import NLTK_DATA_DIR
+from src.services.nltk_resources import RESOURCES, prefetch
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download NLTK data for offline use")
+    parser.add_argument("--dir", default=NLTK_DATA_DIR, help="Target NLTK data directory")
+    parser.add_argument("resources", nargs="*", help=f"Resources to download (default: {', '.join(RESOURCES)})")
+    args = parser.parse_args()
+    unknown = set(args.resources) - set(RESOURCES)
+    if unknown:
+        parser.error(f"unknown resource(s): {', '.join(sorted(unknown))}")
+
+    failed = prefetch(args.dir, args.resources or None)
+    if failed:
+        print(f"Failed to download: {', '.join(failed)}")
+        sys.exit(1)
+    print(f"NLTK data saved to {args.dir}")
@@ -1,38 +1,116 @@
-from fastapi import HTTPException
-from io import BytesIO
+from fastapi import HTTPException, Request, Response
 from fastapi.responses import StreamingResponse
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime
 from . import models
+from ..services.blob_store import blob_path, blob_exists, iter_blob
 
 
 
-def get_corpus_uploaded(db: Session):
-    return db.query(models.Corpus).all()
+def dialect_insert(db: Session):
+    """insert() sesuai dialek koneksi (PostgreSQL atau SQLite) yang mendukung ON CONFLICT."""
+    return postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
 
-def get_corpus_by(db: Session, user_id=str):
-    return db.query(
+async def get_corpus_by_async(db: AsyncSession, user_id: str):
+    result = await db.execute(select(
         models.FilesUploaded.id,
         models.FilesUploaded.file_name,
         models.FilesUploaded.file_size,
         models.FilesUploaded.file_type,
         models.FilesUploaded.date_uploaded
-    ).filter(models.FilesUploaded.uploaded_by==user_id).all()
+    ).where(models.FilesUploaded.uploaded_by == user_id))
+    return result.all()
     
-def download_file(db: Session, file_id: int):
-    corpus = db.query(models.Corpus).filter(models.Corpus.file_id == file_id).first()
-
-    if not corpus or not corpus.file_real:
+def _parse_range(range_header: str, size: int):
+    """
+    Mengurai header Range satu rentang (bytes=start-end, bytes=start-,
+    bytes=-suffix). Mengembalikan (start, end) inklusif, None bila header
+    tidak didukung, atau raise 416 bila rentang di luar ukuran file.
+    """
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_str, _, end_str = spec.strip().partition("-")
+    try:
+        if start_str:
+            start = int(start_str)
+            end = int(end_str) if end_str else size - 1
+        else:
+            suffix = int(end_str)
+            if suffix == 0:
+                raise ValueError
+            start = max(size - suffix, 0)
+            end = size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, min(end, size - 1)
+
+def _legacy_blob_query(file_id: int):
+    # Data lama: referensi blob hanya tercatat di baris corpus
+    return select(models.Corpus.blob_sha256).where(
+        models.Corpus.file_id == file_id,
+        models.Corpus.blob_sha256.isnot(None)
+    ).limit(1)
+
+async def download_file_async(db: AsyncSession, file_id: int, request: Request = None):
+    file_record = await db.get(models.FilesUploaded, file_id)
+    if not file_record:
         raise HTTPException(status_code=404, detail="File not found")
 
-    file_stream = BytesIO(corpus.file_real)
+    blob_sha256 = file_record.blob_sha256 or (await db.execute(_legacy_blob_query(file_id))).scalar()
+    return blob_response(file_record, blob_sha256, request)
 
-    filename = corpus.file_name or "downloaded_file"
+def blob_response(file_record: models.FilesUploaded, blob_sha256: str, request: Request = None):
+    """Response download isi blob (mendukung ETag/If-None-Match dan Range)."""
+    if not blob_sha256 or not blob_exists(blob_sha256):
+        raise HTTPException(status_code=404, detail="File not found")
 
+    filename = f"{file_record.file_name}{file_record.file_type}"
+    size = blob_path(blob_sha256).stat().st_size
+    # Blob bersifat content-addressed, sehingga hash-nya langsung menjadi ETag yang kuat
+    etag = f'"{blob_sha256}"'
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f'attachment; filename="{filename}"',
+    }
+    request_headers = request.headers if request else {}
+
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    range_header = request_headers.get("range")
+    if_range = request_headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() == etag):
+        byte_range = _parse_range(range_header, size)
+
+    if byte_range:
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(
+            iter_blob(blob_sha256, start, end),
+            status_code=206,
+            media_type="application/octet-stream",
+            headers=headers
+        )
+
+    headers["Content-Length"] = str(size)
     return StreamingResponse(
-        file_stream,
+        iter_blob(blob_sha256),
         media_type="application/octet-stream",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
+        headers=headers
     )
     
 def insert_file_record(
@@ -42,7 +120,8 @@ def insert_file_record(
     file_size: int,
     file_type: str,
     date_uploaded: datetime,
-    status:str
+    status:str,
+    blob_sha256: str = None
     ) -> int:
     file_record = models.FilesUploaded(
         uploaded_by=user_id,
@@ -50,7 +129,8 @@ def insert_file_record(
         file_size=file_size,
         file_type=file_type,
         date_uploaded=date_uploaded,
-        status=status
+        status=status,
+        blob_sha256=blob_sha256
     )
     db.add(file_record)
     db.commit()
@@ -66,7 +146,7 @@ def insert_corpus(
     file_size: int,
     file_type: str,
     date_uploaded: datetime,
-    file_real: bytes,
+    blob_sha256: str,
     doi: str,  
     authors: str, 
     topics: str 
@@ -78,7 +158,7 @@ def insert_corpus(
         file_size=file_size,
         file_type=file_type,
         date_uploaded=date_uploaded,
-        file_real=file_real,
+        blob_sha256=blob_sha256,
         doi=doi,      # Simpan data baru
         authors=authors, # Simpan data baru
         topics=topics    # Simpan data baru
@@ -89,24 +169,21 @@ def insert_corpus(
     return db_upload
 # ---------------------------------------------------
 
-def upload_merged(
-    db:Session,
-    file_id: int, 
-    title:str, 
-    abstract:str
-):
-    db_merged=models.Metadata(
-        file_id=file_id,
-        title=title, 
-        abstract=abstract)
-    db.add(db_merged)
-    db.commit()
-    db.refresh(db_merged)
-    
-    return db_merged
+def bulk_insert_corpus(db: Session, rows: list[dict]) -> list[int]:
+    """Insert banyak baris Corpus sekaligus tanpa commit. Mengembalikan id sesuai urutan rows."""
+    if not rows:
+        return []
+    return db.execute(
+        insert(models.Corpus.__table__).returning(models.Corpus.id, sort_by_parameter_order=True),
+        rows
+    ).scalars().all()
+
+def bulk_insert_metadata(db: Session, rows: list[dict]):
+    """Insert banyak baris Metadata sekaligus (Core executemany) tanpa commit."""
+    if rows:
+        db.execute(insert(models.Metadata.__table__), rows)
 
 
-    
 
 # from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
 # from dotenv import load_dotenv
@@ -1,18 +1,76 @@
 # Import semua modul yang diperlukan untuk model
-from sqlalchemy import Column, JSON, Integer, String, DateTime, ForeignKey, LargeBinary, Float, create_engine, event
+from sqlalchemy import Column, JSON, Integer, String, Text, Boolean, LargeBinary, DateTime, ForeignKey, Float, Index, UniqueConstraint, create_engine, event
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from datetime import datetime
+from .settings import (
+    DATABASE_URL, ASYNC_DATABASE_URL, PROGRESS_DATABASE_URL, DB_ECHO,
+    SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS, SQLITE_MMAP_SIZE, SQLITE_CACHE_SIZE, SQLITE_BUSY_TIMEOUT_MS,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE)
 
-# Membuat koneksi ke database SQLite dan mengaktifkan logging echo.
-# PRAGMA foreign_keys=ON digunakan untuk memastikan integritas data.
-engine = create_engine('sqlite:///database.db', echo=True)
-@event.listens_for(engine, "connect")
-def enforce_foreign_keys(dbapi_connection, connection_record):
+# Driver async per backend untuk AsyncEngine (lihat create_async_db_engine)
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+def _configure_sqlite(dbapi_connection, connection_record):
+    # PRAGMA foreign_keys=ON digunakan untuk memastikan integritas data.
     cursor = dbapi_connection.cursor()
     cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
     cursor.close()
 
-<<<<<<< HEAD
+def _engine_options(url: str) -> dict:
+    if make_url(url).get_backend_name() == "sqlite":
+        return {
+            "echo": DB_ECHO,
+            "connect_args": {"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000, "check_same_thread": False},
+        }
+    return {
+        "echo": DB_ECHO,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        # Koneksi yang diputus server (restart, idle timeout) diganti sebelum dipakai
+        "pool_pre_ping": True,
+    }
+
+def create_db_engine(url: str = DATABASE_URL):
+    """
+    Membuat engine sesuai DSN. SQLite memakai WAL dan PRAGMA per koneksi
+    (pembaca dashboard tidak menunggu upload yang sedang menulis);
+    PostgreSQL memakai QueuePool dengan ukuran pool dari settings.
+    """
+    db_engine = create_engine(url, **_engine_options(url))
+    if db_engine.dialect.name == "sqlite":
+        event.listen(db_engine, "connect", _configure_sqlite)
+    return db_engine
+
+def async_database_url(url: str = DATABASE_URL) -> str:
+    """DSN async: ASYNC_DATABASE_URL bila diisi, selain itu DATABASE_URL dengan driver async."""
+    if ASYNC_DATABASE_URL:
+        return ASYNC_DATABASE_URL
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver known for {parsed.drivername}, set ASYNC_DATABASE_URL")
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+def create_async_db_engine(url: str = None):
+    """AsyncEngine dengan profil yang sama dengan create_db_engine (aiosqlite atau asyncpg)."""
+    url = url or async_database_url()
+    db_engine = create_async_engine(url, **_engine_options(url))
+    if db_engine.dialect.name == "sqlite":
+        event.listen(db_engine.sync_engine, "connect", _configure_sqlite)
+    return db_engine
+
+# Membuat koneksi ke database sesuai DATABASE_URL (default SQLite database.db).
+engine = create_db_engine()
+
 # Mendeklarasikan base untuk model
 Base = declarative_base()
 
@@ -26,30 +84,37 @@ class User(Base):
     first_name = Column(String, nullable=False)
     last_name = Column(String, nullable=False)
     organization = Column(String, nullable=False, default="No Organization")
-=======
-class User(Base):
-    __tablename__ = 'users'
-    
-    id=Column(String, primary_key=True)
-    user_name=Column(String, nullable=False, default="Researcher")
-    email=Column(String, nullable=False)
->>>>>>> 4e73095e06b1994bd6c16400150647e864023857
     
     # Mendefinisikan relasi ke tabel lain
     uploaded = relationship("FilesUploaded", back_populates="users", cascade="all, delete-orphan")
     corpuses = relationship("Corpus", back_populates="users", cascade="all, delete-orphan")
     
+# Mendefinisikan kelas model untuk tabel 'blobs'
+# Isi file upload disimpan sekali di disk (content-addressed, kunci SHA-256),
+# tabel ini hanya mencatat hash dan ukurannya.
+class Blob(Base):
+    __tablename__ = 'blobs'
+    
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(Integer, nullable=False)
+    date_created = Column(DateTime, default=datetime.now)
+    
 # Mendefinisikan kelas model untuk tabel 'files_uploaded'
 class FilesUploaded(Base):
     __tablename__ = 'files_uploaded'
+    __table_args__ = (
+        # Cek file duplikat saat upload (nama dan ukuran file)
+        Index("ix_files_uploaded_name_size", "file_name", "file_size"),
+    )
     
     id = Column(Integer, primary_key=True)
-    uploaded_by = Column(String, ForeignKey(User.id, ondelete="CASCADE"), nullable=False)
+    uploaded_by = Column(String, ForeignKey(User.id, ondelete="CASCADE"), nullable=False, index=True)
     file_name = Column(String, nullable=False)
     file_size = Column(Integer, nullable=False)
     file_type = Column(String, nullable=False)
     date_uploaded = Column(DateTime, default=datetime.now)
     status = Column(String, default="completed")
+    blob_sha256 = Column(String(64), ForeignKey(Blob.sha256), nullable=True)
     
     # Mendefinisikan relasi ke tabel lain
     users = relationship("User", back_populates="uploaded")
@@ -61,29 +126,26 @@ class FilesUploaded(Base):
 # Mendefinisikan kelas model untuk tabel 'corpus'
 class Corpus(Base):
     __tablename__ = 'corpus'
+    __table_args__ = (
+        # Publikasi per file milik user (update graf setelah upload, hapus cascade)
+        Index("ix_corpus_file_user", "file_id", "uploaded_by"),
+    )
     
     id = Column(Integer, primary_key=True)
-<<<<<<< HEAD
     file_name = Column(String, nullable=False)
     file_size = Column(Integer, nullable=False)
     file_type = Column(String, nullable=False)
     file_id = Column(Integer, ForeignKey(FilesUploaded.id, ondelete="CASCADE"), nullable=False)
-    uploaded_by = Column(String, ForeignKey(User.id, ondelete="CASCADE"), nullable=False)
+    uploaded_by = Column(String, ForeignKey(User.id, ondelete="CASCADE"), nullable=False, index=True)
     date_uploaded = Column(DateTime, default=datetime.now)
     title = Column(String, nullable=False)
     abstract = Column(String, nullable=False)
     # Kolom untuk DOI
     doi = Column(String, unique=True, nullable=True)
-    file_real = Column(LargeBinary, nullable=False)
-=======
-    file_name=Column(String, nullable=False)
-    file_size=Column(Integer, nullable=False)
-    file_type=Column(String, nullable=False)
-    file_id=Column(Integer, ForeignKey(FilesUploaded.id, ondelete="CASCADE"), nullable=False)
-    uploaded_by=Column(String,  ForeignKey(User.id, ondelete="CASCADE"), nullable=False)
-    date_uploaded=Column(DateTime, default=datetime.now)
-    file_real=Column(LargeBinary, nullable=False)
->>>>>>> 4e73095e06b1994bd6c16400150647e864023857
+    # Tahun terbit (bila tersedia di file upload)
+    year = Column(Integer, nullable=True)
+    # Referensi ke file asli di blob store (menggantikan kolom file_real)
+    blob_sha256 = Column(String(64), ForeignKey(Blob.sha256), nullable=True)
     
     # TAMBAHAN KOLOM UNTUK DATA GRAFIK
     authors = Column(JSON, nullable=True)
@@ -93,17 +155,118 @@ class Corpus(Base):
     users = relationship("User", back_populates="corpuses")
     uploaded = relationship("FilesUploaded", back_populates="corpuses")
     
+# Mendefinisikan kelas model untuk tabel 'authors'
+# author_key deterministik: ORCID bila ada, selain itu hash nama lengkap.
+class Author(Base):
+    __tablename__ = 'authors'
+    
+    id = Column(Integer, primary_key=True)
+    author_key = Column(String, unique=True, nullable=False)
+    orcid = Column(String, unique=True, nullable=True)
+    full_name = Column(String, nullable=True)
+
+# Mendefinisikan kelas model untuk tabel 'institutions'
+# institution_key deterministik: ROR id bila ada, selain itu hash nama.
+class Institution(Base):
+    __tablename__ = 'institutions'
+    
+    id = Column(Integer, primary_key=True)
+    institution_key = Column(String, unique=True, nullable=False)
+    ror_id = Column(String, unique=True, nullable=True)
+    name = Column(String, nullable=False)
+    country = Column(String, nullable=True)
+
+# Mendefinisikan kelas model untuk tabel 'topics'
+# Topik per user; topic_number adalah topic_id pada data upload dan SDGMapping.
+class Topic(Base):
+    __tablename__ = 'topics'
+    __table_args__ = (
+        UniqueConstraint("user_id", "topic_number", name="uq_topics_user_number"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(String, ForeignKey(User.id, ondelete="CASCADE"), nullable=False)
+    topic_number = Column(Integer, nullable=False, index=True)
+    # Keyword dari publikasi pertama yang memuat topik ini
+    keywords = Column(JSON, nullable=True)
+
+# Mendefinisikan kelas model untuk tabel 'publication_topic'
+# Relasi publikasi-topik dari Corpus.topics, diisi saat upload.
+class PublicationTopic(Base):
+    __tablename__ = 'publication_topic'
+    __table_args__ = (
+        Index("ix_publication_topic_user_topic", "user_id", "topic_id"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    corpus_id = Column(Integer, ForeignKey(Corpus.id, ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(String, ForeignKey(User.id, ondelete="CASCADE"), nullable=False)
+    topic_id = Column(Integer, ForeignKey(Topic.id, ondelete="CASCADE"), nullable=False)
+    topic_probability = Column(Float, nullable=True)
+    keywords = Column(JSON, nullable=True)
+
+# Mendefinisikan kelas model untuk tabel 'publication_author_institution'
+# Satu baris per penulis di Corpus.authors beserta institusinya (bila ada).
+class PublicationAuthorInstitution(Base):
+    __tablename__ = 'publication_author_institution'
+    __table_args__ = (
+        Index("ix_publication_author_institution_user_inst", "user_id", "institution_id", "corpus_id"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    corpus_id = Column(Integer, ForeignKey(Corpus.id, ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(String, ForeignKey(User.id, ondelete="CASCADE"), nullable=False)
+    position = Column(Integer, nullable=True)
+    author_id = Column(Integer, ForeignKey(Author.id, ondelete="CASCADE"), nullable=False, index=True)
+    institution_id = Column(Integer, ForeignKey(Institution.id, ondelete="SET NULL"), nullable=True)
+    
 # Mendefinisikan kelas model untuk tabel 'corpus_metadata'
 class Metadata(Base):
     __tablename__ = 'corpus_metadata'
     
     id = Column(Integer, primary_key=True)
-    file_id = Column(Integer, ForeignKey(FilesUploaded.id, ondelete="CASCADE"), nullable=False)
+    file_id = Column(Integer, ForeignKey(FilesUploaded.id, ondelete="CASCADE"), nullable=False, index=True)
     title = Column(String, nullable=False)
     abstract = Column(String, nullable=False)
     
     uploaded = relationship("FilesUploaded", back_populates="metadatas")
+
+# Mendefinisikan kelas model untuk tabel 'metadata_tokens'
+# Cache hasil tokenisasi per baris metadata; text_hash berubah bila teks
+# atau tokenizer berubah sehingga cache lama otomatis diabaikan.
+class MetadataTokens(Base):
+    __tablename__ = "metadata_tokens"
+    
+    metadata_id = Column(Integer, ForeignKey(Metadata.id, ondelete="CASCADE"), primary_key=True)
+    text_hash = Column(String(32), nullable=False)
+    # Token dipisah spasi (token hanya berisi huruf sehingga aman)
+    tokens = Column(String, nullable=False)
+    
+# Mendefinisikan kelas model untuk tabel 'content_hashes'
+# Indeks deduplikasi upload: hash title+abstract yang sudah dinormalisasi.
+# Primary key menjamin satu entri per isi; baris dihapus bersama file-nya.
+class ContentHash(Base):
+    __tablename__ = "content_hashes"
+    
+    content_hash = Column(String(32), primary_key=True)
+    file_id = Column(Integer, ForeignKey(FilesUploaded.id, ondelete="CASCADE"), nullable=False, index=True)
+
+# Mendefinisikan kelas model untuk tabel 'content_signatures' dan 'content_lsh_bands'
+# Deteksi near-duplicate (opsional, DEDUP_NEAR_THRESHOLD): signature MinHash
+# per isi dan kunci band LSH untuk mencari kandidat lewat index.
+class ContentSignature(Base):
+    __tablename__ = "content_signatures"
+    
+    content_hash = Column(String(32), ForeignKey(ContentHash.content_hash, ondelete="CASCADE"), primary_key=True)
+    signature = Column(LargeBinary, nullable=False)
+
+class ContentLSHBand(Base):
+    __tablename__ = "content_lsh_bands"
     
+    id = Column(Integer, primary_key=True)
+    band_key = Column(String(24), nullable=False, index=True)
+    content_hash = Column(String(32), ForeignKey(ContentHash.content_hash, ondelete="CASCADE"), nullable=False, index=True)
+
 # Mendefinisikan kelas model untuk tabel 'analysis_base_file'
 class AnalysisBaseFile(Base):
     __tablename__ = 'analysis_base_file'
@@ -113,6 +276,11 @@ class AnalysisBaseFile(Base):
     num_topics = Column(Integer, nullable=False)
     iteration = Column(Integer, nullable=False)
     date_analyzed = Column(DateTime, default=datetime.now)
+    # Konfigurasi training yang dipakai untuk analisis ini
+    engine = Column(String, nullable=True)
+    workers = Column(Integer, nullable=True)
+    chunksize = Column(Integer, nullable=True)
+    update_mode = Column(String, nullable=True)
     
     uploaded = relationship("FilesUploaded", back_populates="basefile")
     
@@ -121,37 +289,219 @@ class AnalysisResult(Base):
     __tablename__ = "analysis_result"
     
     id = Column(Integer, primary_key=True)
-    file_id = Column(Integer, ForeignKey(FilesUploaded.id, ondelete="CASCADE"), nullable=False)
+    file_id = Column(Integer, ForeignKey(FilesUploaded.id, ondelete="CASCADE"), nullable=False, index=True)
     file_name = Column(String, nullable=False)
-    coherence = Column(Integer, nullable=False)
+    # coherence bernilai NULL selama mode "deferred" belum selesai dihitung
+    coherence = Column(Float, nullable=True)
+    coherence_mode = Column(String, nullable=True)
+    coherence_seconds = Column(Float, nullable=True)
+    coherence_ci = Column(JSON, nullable=True)
+    coherence_sample_size = Column(Integer, nullable=True)
     topic_count = Column(Integer, nullable=False)
     topic_result = Column(JSON, nullable=False)
+    model_id = Column(Integer, ForeignKey("trained_models.id", ondelete="SET NULL"), nullable=True)
+    # Direktori matriks dokumen x topik dan topik x kata (.npy, lihat topic_matrices)
+    matrix_path = Column(String, nullable=True)
     
     uploaded = relationship("FilesUploaded", back_populates="result")
 
+# Mendefinisikan kelas model untuk tabel 'trained_models'
+# Registry model LDA per file/user. File model disimpan di path dengan format
+# native gensim (array besar terpisah agar bisa di-mmap).
+class TrainedModel(Base):
+    __tablename__ = "trained_models"
+    
+    id = Column(Integer, primary_key=True)
+    file_id = Column(Integer, ForeignKey(FilesUploaded.id, ondelete="CASCADE"), nullable=False)
+    user_id = Column(String, ForeignKey(User.id, ondelete="CASCADE"), nullable=False)
+    version = Column(Integer, nullable=False, default=1)
+    num_topics = Column(Integer, nullable=False)
+    hyperparameters = Column(JSON, nullable=True)
+    path = Column(String, nullable=True)
+    # Model asal bila versi ini hasil update incremental
+    parent_id = Column(Integer, ForeignKey("trained_models.id", ondelete="SET NULL"), nullable=True)
+    date_created = Column(DateTime, default=datetime.now)
+
+# Mendefinisikan kelas model untuk tabel 'analysis_jobs'
+# Antrean persisten untuk analisis LDA yang dijalankan di background.
+# Status: queued, running, done, failed, cancelled (juga dipakai sebagai
+# status channel progres)
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = {DONE, FAILED, CANCELLED}
+
+class AnalysisJob(Base):
+    __tablename__ = "analysis_jobs"
+    
+    id = Column(Integer, primary_key=True)
+    file_id = Column(Integer, ForeignKey(FilesUploaded.id, ondelete="CASCADE"), nullable=False)
+    user_id = Column(String, ForeignKey(User.id, ondelete="CASCADE"), nullable=False)
+    num_topics = Column(Integer, nullable=False)
+    iteration = Column(Integer, nullable=False)
+    # Opsi tambahan analisis (mis. konfigurasi training) dalam bentuk dict
+    options = Column(JSON, nullable=True)
+    status = Column(String, nullable=False, default=QUEUED, index=True)
+    stage = Column(String, nullable=True)
+    progress = Column(Float, nullable=False, default=0)
+    error = Column(String, nullable=True)
+    result_id = Column(Integer, ForeignKey(AnalysisResult.id, ondelete="SET NULL"), nullable=True)
+    date_created = Column(DateTime, default=datetime.now)
+    date_started = Column(DateTime, nullable=True)
+    date_finished = Column(DateTime, nullable=True)
+    # Proses yang menjalankan job ("host:pid") dan waktu heartbeat terakhirnya
+    worker = Column(String, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+
 # Mendefinisikan kelas model untuk tabel 'sdg_mapping'
+# Dua jenis baris dengan ruang id topik yang berbeda:
+# - manual: topic_id = nomor topik pada data upload (Topic.topic_number),
+#   model_id dan lda_topic kosong
+# - otomatis (services/sdg_mapping.py): model_id + lda_topic = nomor topik
+#   LDA model tersebut (sama dengan matriks analisis), topic_id kosong,
+#   beserta versi leksikon yang dipakai
 class SDGMapping(Base):
     __tablename__ = "sdg_mapping"
-    
+    __table_args__ = (
+        Index("ix_sdg_mapping_model_topic", "model_id", "lda_topic"),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     topic_id = Column(Integer, index=True)
     sdg_id = Column(Integer, index=True)
     mapping_weight = Column(Float)
     sdg_name = Column(String)
+    model_id = Column(Integer, ForeignKey(TrainedModel.id, ondelete="CASCADE"), nullable=True)
+    lda_topic = Column(Integer, nullable=True)
+    lexicon_version = Column(String, nullable=True)
     
     def __repr__(self):
         return f"<SDGMapping(id={self.id}, topic_id={self.topic_id}, sdg_id={self.sdg_id}, mapping_weight={self.mapping_weight})>"
 
+# Mendefinisikan kelas model untuk tabel 'graph_versions'
+# Nomor versi graf per user; naik setiap kali graf diperbarui.
+class GraphVersion(Base):
+    __tablename__ = "graph_versions"
+    
+    user_id = Column(String, ForeignKey(User.id, ondelete="CASCADE"), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    date_updated = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+# Mendefinisikan kelas model untuk tabel 'user_data_versions'
+# Nomor versi data dashboard per user; naik setiap upload dan analisis selesai
+# sehingga cache response lama tidak terpakai lagi.
+class UserDataVersion(Base):
+    __tablename__ = "user_data_versions"
+    
+    user_id = Column(String, ForeignKey(User.id, ondelete="CASCADE"), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    date_updated = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+# Mendefinisikan kelas model untuk tabel 'graph_nodes' dan 'graph_edges'
+# Graf publikasi/penulis/institusi/topik/SDG yang sudah jadi per user.
+# Diperbarui saat upload dan analisis; version = versi graf saat baris
+# terakhir berubah sehingga klien dapat mengambil perubahan (delta) saja.
+# payload berisi atribut node/edge dalam bentuk JSON string.
+class GraphNode(Base):
+    __tablename__ = "graph_nodes"
+    __table_args__ = (
+        UniqueConstraint("user_id", "node_id", name="uq_graph_nodes_user_node"),
+        Index("ix_graph_nodes_user_version", "user_id", "version"),
+        Index("ix_graph_nodes_user_type", "user_id", "node_type", "id"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(String, ForeignKey(User.id, ondelete="CASCADE"), nullable=False)
+    node_id = Column(String, nullable=False)
+    node_type = Column(String, nullable=False)
+    payload = Column(Text, nullable=False, default="{}")
+    # Tahun terbit publikasi, disalin dari payload untuk filter
+    year = Column(Integer, nullable=True)
+    version = Column(Integer, nullable=False)
+    deleted = Column(Boolean, nullable=False, default=False)
+
+class GraphEdge(Base):
+    __tablename__ = "graph_edges"
+    __table_args__ = (
+        UniqueConstraint("user_id", "edge_type", "source", "target", name="uq_graph_edges_user_edge"),
+        Index("ix_graph_edges_user_version", "user_id", "version"),
+        Index("ix_graph_edges_user_source", "user_id", "source"),
+        Index("ix_graph_edges_user_target", "user_id", "target"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(String, ForeignKey(User.id, ondelete="CASCADE"), nullable=False)
+    source = Column(String, nullable=False)
+    target = Column(String, nullable=False)
+    edge_type = Column(String, nullable=False)
+    payload = Column(Text, nullable=False, default="{}")
+    version = Column(Integer, nullable=False)
+    deleted = Column(Boolean, nullable=False, default=False)
+
 # Memastikan semua tabel dibuat di database
 Base.metadata.create_all(engine)
 
 # Mendeklarasikan SessionLocal
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Tabel progres berada di database tersendiri (PROGRESS_DATABASE_URL) yang
+# dibagi semua proses: worker uvicorn dan worker analisis. Satu baris per
+# channel berisi event terakhir; seq naik setiap ada event baru.
+ProgressBase = declarative_base()
+
+class ProgressChannel(ProgressBase):
+    __tablename__ = 'progress_channels'
+
+    channel = Column(String, primary_key=True)
+    user_id = Column(String, nullable=True, index=True)
+    stage = Column(String, nullable=False)
+    progress = Column(Float, nullable=True)
+    status = Column(String, nullable=False)
+    message = Column(Text, nullable=True)
+    seq = Column(Integer, nullable=False, default=1)
+    updated_at = Column(DateTime, nullable=False, default=datetime.now)
+
+progress_engine = create_db_engine(PROGRESS_DATABASE_URL)
+ProgressBase.metadata.create_all(progress_engine)
+ProgressSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=progress_engine)
+
 # Fungsi untuk mendapatkan sesi database
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# AsyncEngine dibuat saat pertama dipakai oleh route async, sehingga skrip
+# dan proses worker analisis yang hanya memakai engine sync tidak memerlukan
+# driver async.
+_async_engine = None
+_async_session_factory = None
+
+def get_async_engine():
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_db_engine()
+    return _async_engine
+
+def AsyncSessionLocal() -> AsyncSession:
+    global _async_session_factory
+    if _async_session_factory is None:
+        # expire_on_commit=False: atribut tetap dapat dibaca setelah commit tanpa I/O implisit
+        _async_session_factory = async_sessionmaker(get_async_engine(), expire_on_commit=False)
+    return _async_session_factory()
+
+async def dispose_async_engine():
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    _async_engine = None
+    _async_session_factory = None
+
+# Fungsi untuk mendapatkan sesi database async (route async def)
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
\ No newline at end of file
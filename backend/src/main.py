@@ -1,6 +1,9 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from src.routes import corpus_routes, analysis_routes, sdg_mapping_routes, graph_routes, users_routes
+from src.services.job_queue import resume_pending_jobs, shutdown_executor
+from src.services.nltk_resources import verify_resources
+from src.config.models import dispose_async_engine
 
 app = FastAPI()
 
@@ -16,7 +19,26 @@ app.add_middleware(
     allow_headers=["*"]
     )
 
+@app.on_event("startup")
+async def check_nltk_data():
+    # Data NLTK harus sudah tersedia lokal (python prefetch_nltk.py)
+    verify_resources()
+
+@app.on_event("startup")
+async def start_job_queue():
+    resumed = resume_pending_jobs()
+    if resumed:
+        print(f"{resumed} analysis job(s) re-queued")
+
+@app.on_event("shutdown")
+async def stop_job_queue():
+    shutdown_executor()
+
+@app.on_event("shutdown")
+async def close_async_engine():
+    await dispose_async_engine()
     
 app.include_router(corpus_routes.router, prefix="/api")
+app.include_router(analysis_routes.router, prefix="/api")
 app.include_router(graph_routes.router, prefix="/api")
 app.include_router(users_routes.router, prefix="/api")
\ No newline at end of file
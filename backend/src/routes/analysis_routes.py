@@ -1,18 +1,32 @@
-<<<<<<< HEAD
-from fastapi import APIRouter
-from src.models.analysis_models import Analysis
-
-router = APIRouter()
-=======
-from fastapi import APIRouter, Depends, HTTPException, Request
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Request, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Literal, Optional
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from ..utils import authenticate_and_get_user_details
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from ..utils import get_current_user
 from ..config import models
-from ..config.models import get_db
-from ..services.model_handler import run_lda_analysis
+from ..config.models import get_db, get_async_db, SessionLocal
+from ..services.job_queue import enqueue_analysis, cancel_job, serialize_job, FINISHED_STATES
+from ..services.model_handler import resolve_training_config
+from ..services.response_cache import cached_response_async
+from ..services.progress_bus import subscribe, job_channel
+from ..services.model_registry import get_model_record, load_model
+from ..services.preprocessing import iter_processed_batches
+from ..services.inference import iter_inference_lines, text_batches
+from ..services.topic_matrices import (
+    open_topic_matrices,
+    document_topics,
+    document_topics_by_id,
+    topic_documents,
+    topic_top_words,
+    term_weights)
+from ..services.sdg_mapping import model_topic_sdgs, topic_sdgs, document_sdgs, sdg_totals
+from ..config.settings import INFERENCE_CHUNK_SIZE, INFERENCE_MIN_PROBABILITY, SDG_MAPPING_TOP_N
+import numpy as np
 import json
 
 router = APIRouter()
@@ -22,11 +36,38 @@ class AnalysisRequest(BaseModel):
     num_topics: int
     iteration: int
     date_analyzed: datetime
+    # Opsi training; bila kosong memakai konfigurasi server (LDA_*)
+    engine: Optional[Literal["single", "multicore"]] = None
+    workers: Optional[int] = Field(None, gt=0)
+    chunksize: Optional[int] = Field(None, gt=0)
+    update_mode: Optional[Literal["online", "batch"]] = None
+    # Mode coherence; bila kosong memakai COHERENCE_MODE
+    coherence_mode: Optional[Literal["c_v", "u_mass", "c_v_sample", "deferred"]] = None
+    coherence_sample_size: Optional[int] = Field(None, gt=1)
+
+class InferenceRequest(BaseModel):
+    # Salah satu: dokumen file yang sudah diupload atau daftar teks mentah
+    file_id: Optional[int] = None
+    texts: Optional[List[str]] = None
+    minimum_probability: float = Field(INFERENCE_MIN_PROBABILITY, ge=0, le=1)
+    top_k: Optional[int] = Field(None, gt=0)
 
-@router.post("/analyze")
-def start_analysis(request: Request, payload: AnalysisRequest, db: Session = Depends(get_db)):
+def _get_user_job(db: Session, job_id: int, user_id: str) -> models.AnalysisJob:
+    job = db.query(models.AnalysisJob).filter(
+        models.AnalysisJob.id == job_id,
+        models.AnalysisJob.user_id == user_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Analysis job not found")
+    return job
+
+@router.post("/analyze", status_code=202)
+def start_analysis(
+    request: Request,
+    payload: AnalysisRequest,
+    user_details: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
     # Validasi User
-    user_details= authenticate_and_get_user_details(request, db)
     user_id = user_details.get("user_id")
     # Validasi file
     file = db.query(models.FilesUploaded).filter(
@@ -35,103 +76,365 @@ def start_analysis(request: Request, payload: AnalysisRequest, db: Session = Dep
     if not file:
         raise HTTPException(status_code=404, detail="File not found")
 
-    # Ambil metadata terkait file_id
-    metadata = (
-        db.query(models.Metadata)
-        .filter(models.Metadata.file_id == payload.file_id)
-        .all()
-    )
+    # Pastikan ada metadata terkait file_id
+    has_metadata = db.query(models.Metadata.id).filter(
+        models.Metadata.file_id == payload.file_id
+    ).first()
 
-    if not metadata:
+    if not has_metadata:
         raise HTTPException(status_code=404, detail="No metadata found for file")
 
-    # Gabungkan title dan abstract
-    texts = [f"{m.title} {m.abstract}" for m in metadata]
-
-    # Simpan ke AnalysisBaseFile
-    base = models.AnalysisBaseFile(
-        file_id=payload.file_id,
-        num_topics=payload.num_topics,
-        iteration=payload.iteration,
-        date_analyzed=datetime.now()
+    training_config = resolve_training_config(
+        engine=payload.engine,
+        workers=payload.workers,
+        chunksize=payload.chunksize,
+        update_mode=payload.update_mode,
     )
-    db.add(base)
-    db.commit()
-    db.refresh(base)
-
-    # Jalankan LDA
-    topic_result, coherence = run_lda_analysis(texts, payload.num_topics, payload.iteration)
-
-    # Simpan hasil ke AnalysisResult
-    result = models.AnalysisResult(
-        file_id=payload.file_id,
-        file_name=file.file_name,
-        coherence=coherence,
-        topic_count=payload.num_topics,
-        topic_result=topic_result,  # list of string
+
+    # Masukkan ke antrean, LDA dijalankan oleh worker pool di background
+    job = enqueue_analysis(
+        db,
+        user_id,
+        payload.file_id,
+        payload.num_topics,
+        payload.iteration,
+        options={
+            "training": training_config,
+            "coherence": {
+                "mode": payload.coherence_mode,
+                "sample_size": payload.coherence_sample_size,
+            },
+        },
     )
-    db.add(result)
-    db.commit()
 
     return {
-        "message": "Analisis selesai",
-        "result": {
-            "file_name": result.file_name,
-            "coherence": result.coherence,
-            "topic_count": result.topic_count,
-            "topics": result.topic_result,
-        },
+        "message": "Analisis masuk antrean",
+        "job_id": job.id,
+        "status": job.status,
+        "training": training_config,
+    }
+
+@router.get("/analysis/status/{job_id}")
+def get_analysis_status(
+    request: Request,
+    job_id: int,
+    user_details: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    job = _get_user_job(db, job_id, user_details.get("user_id"))
+    return serialize_job(db, job)
+
+@router.post("/analysis/cancel/{job_id}")
+def cancel_analysis(
+    request: Request,
+    job_id: int,
+    user_details: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    job = _get_user_job(db, job_id, user_details.get("user_id"))
+    if not cancel_job(db, job):
+        raise HTTPException(status_code=409, detail=f"Analysis job already {job.status}")
+    return serialize_job(db, job)
+
+@router.get("/analysis/stream/{job_id}")
+def stream_analysis(
+    request: Request,
+    job_id: int,
+    user_details: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Server-Sent Events: mengirim status job setiap kali berubah, ditutup saat job selesai."""
+    _get_user_job(db, job_id, user_details.get("user_id"))
+
+    def snapshot():
+        stream_db = SessionLocal()
+        try:
+            job = stream_db.get(models.AnalysisJob, job_id)
+            return serialize_job(stream_db, job)
+        finally:
+            stream_db.close()
+
+    async def events():
+        # Status awal dikirim langsung, berikutnya hanya saat event bus
+        # mencatat perubahan (tanpa polling per koneksi). Query sync dijalankan
+        # di threadpool agar tidak menahan event loop.
+        data = await run_in_threadpool(snapshot)
+        last = json.dumps(data, default=str)
+        yield f"data: {last}\n\n"
+        if data["status"] in FINISHED_STATES:
+            return
+        async for _ in subscribe(job_channel(job_id)):
+            data = await run_in_threadpool(snapshot)
+            current = json.dumps(data, default=str)
+            if current != last:
+                last = current
+                yield f"data: {current}\n\n"
+            if data["status"] in FINISHED_STATES:
+                return
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@router.post("/models/{model_id}/infer")
+def infer_topics(
+    request: Request,
+    model_id: int,
+    payload: InferenceRequest,
+    user_details: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Distribusi topik per dokumen dari model terlatih, tanpa training ulang.
+    Hasil dikirim sebagai NDJSON, satu baris per dokumen (id metadata untuk
+    file_id, indeks untuk texts), dihitung per INFERENCE_CHUNK_SIZE dokumen.
+    """
+    user_id = user_details.get("user_id")
+    if (payload.file_id is None) == (payload.texts is None):
+        raise HTTPException(status_code=400, detail="Provide either file_id or texts")
+
+    record = get_model_record(db, model_id, user_id)
+    if record is None or not record.path:
+        raise HTTPException(status_code=404, detail="Model not found")
+    if payload.file_id is not None:
+        file = db.query(models.FilesUploaded.id).filter(
+            models.FilesUploaded.id == payload.file_id,
+            models.FilesUploaded.uploaded_by == user_id).first()
+        if not file:
+            raise HTTPException(status_code=404, detail="File not found")
+    try:
+        lda_model = load_model(record)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Model files not found")
+
+    def lines():
+        # Generator sync: StreamingResponse menjalankannya di threadpool
+        if payload.texts is not None:
+            yield from iter_inference_lines(
+                lda_model, text_batches(payload.texts), payload.minimum_probability, payload.top_k
+            )
+            return
+        stream_db = SessionLocal()
+        try:
+            yield from iter_inference_lines(
+                lda_model,
+                iter_processed_batches(stream_db, payload.file_id, INFERENCE_CHUNK_SIZE),
+                payload.minimum_probability,
+                payload.top_k,
+            )
+        finally:
+            stream_db.close()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+    
+def _user_analysis_matrices(db: Session, analysis_id: int, user_id: str):
+    result = db.query(models.AnalysisResult).join(
+        models.FilesUploaded, models.FilesUploaded.id == models.AnalysisResult.file_id
+    ).filter(
+        models.AnalysisResult.id == analysis_id,
+        models.FilesUploaded.uploaded_by == user_id
+    ).first()
+    if not result:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    if not result.matrix_path:
+        raise HTTPException(status_code=404, detail="No topic matrices stored for this analysis")
+    try:
+        return result, open_topic_matrices(result.matrix_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Topic matrix files not found")
+
+def _parse_ids(value: str, name: str) -> list:
+    try:
+        return [int(item) for item in value.split(",") if item.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be a comma separated list of integers")
+
+def _with_titles(db: Session, rows: list) -> list:
+    titles = dict(db.query(models.Metadata.id, models.Metadata.title).filter(
+        models.Metadata.id.in_([row["id"] for row in rows])
+    ).all()) if rows else {}
+    return [{**row, "title": titles.get(row["id"])} for row in rows]
+
+@router.get("/analysis/{analysis_id}/doc-topics")
+def get_document_topics(
+    request: Request,
+    analysis_id: int,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, gt=0, le=1000),
+    ids: Optional[str] = Query(None),
+    user_details: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Baris matriks dokumen x topik: per halaman (offset/limit) atau untuk id metadata tertentu (ids=1,2,3)."""
+    _, matrices = _user_analysis_matrices(db, analysis_id, user_details.get("user_id"))
+    if ids is not None:
+        rows = document_topics_by_id(matrices, _parse_ids(ids, "ids")[:limit])
+    else:
+        rows = document_topics(matrices, offset, limit)
+    return {"total": len(matrices["doc_ids"]), "documents": _with_titles(db, rows)}
+
+@router.get("/analysis/{analysis_id}/topics/{topic_id}/documents")
+def get_topic_documents(
+    request: Request,
+    analysis_id: int,
+    topic_id: int,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, gt=0, le=1000),
+    user_details: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Dokumen dengan bobot terbesar untuk satu topik."""
+    _, matrices = _user_analysis_matrices(db, analysis_id, user_details.get("user_id"))
+    if not 0 <= topic_id < len(matrices["topic_indptr"]) - 1:
+        raise HTTPException(status_code=404, detail="Topic not found")
+    total = int(matrices["topic_indptr"][topic_id + 1] - matrices["topic_indptr"][topic_id])
+    rows = topic_documents(matrices, topic_id, offset, limit)
+    return {"topic": topic_id, "total": total, "documents": _with_titles(db, rows)}
+
+@router.get("/analysis/{analysis_id}/topic-words")
+def get_topic_words(
+    request: Request,
+    analysis_id: int,
+    topics: Optional[str] = Query(None),
+    top_n: int = Query(10, gt=0, le=200),
+    terms: Optional[str] = Query(None),
+    user_details: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Baris matriks topik x kata: kata teratas per topik (topics=0,1; semua
+    topik bila kosong). Dengan terms=kata1,kata2 dikembalikan kolomnya:
+    bobot setiap kata di semua topik.
+    """
+    result, matrices = _user_analysis_matrices(db, analysis_id, user_details.get("user_id"))
+    record = get_model_record(db, result.model_id) if result.model_id else None
+    if record is None:
+        raise HTTPException(status_code=404, detail="Model not found")
+    id2word = load_model(record).id2word
+
+    num_topics = matrices["topic_word"].shape[0]
+    if terms is not None:
+        words = [word.strip().lower() for word in terms.split(",") if word.strip()]
+        known = [word for word in words if word in id2word.token2id]
+        weights = term_weights(matrices, [id2word.token2id[word] for word in known])
+        return {
+            "terms": [{"term": word, "weights": column} for word, column in zip(known, weights)],
+            "unknown": [word for word in words if word not in id2word.token2id],
+        }
+
+    topic_ids = _parse_ids(topics, "topics") if topics is not None else list(range(num_topics))
+    if any(not 0 <= topic_id < num_topics for topic_id in topic_ids):
+        raise HTTPException(status_code=404, detail="Topic not found")
+    return {"topics": topic_top_words(matrices, topic_ids, id2word, top_n)}
+
+def _analysis_topic_sdgs(db: Session, result, matrices: dict):
+    # Pemetaan otomatis milik model analisis ini (per topik LDA, bukan nomor topik upload)
+    if not result.model_id:
+        raise HTTPException(status_code=404, detail="Model not found")
+    return model_topic_sdgs(db, result.model_id, matrices["topic_word"].shape[0])
+
+@router.get("/analysis/{analysis_id}/topic-sdgs")
+def get_topic_sdgs(
+    request: Request,
+    analysis_id: int,
+    user_details: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """SDG per topik LDA analisis beserta total bobot SDG seluruh dokumen."""
+    result, matrices = _user_analysis_matrices(db, analysis_id, user_details.get("user_id"))
+    topic_sdg, lexicon_version = _analysis_topic_sdgs(db, result, matrices)
+    return {
+        "lexicon_version": lexicon_version,
+        "topics": topic_sdgs(topic_sdg),
+        "totals": sdg_totals(matrices, topic_sdg),
     }
+
+@router.get("/analysis/{analysis_id}/doc-sdgs")
+def get_document_sdgs(
+    request: Request,
+    analysis_id: int,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, gt=0, le=1000),
+    ids: Optional[str] = Query(None),
+    top_n: int = Query(SDG_MAPPING_TOP_N, gt=0, le=17),
+    user_details: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    SDG per publikasi dari baris matriks dokumen x topik dan pemetaan SDG
+    topik model yang sama: per halaman (offset/limit) atau ids=1,2,3.
+    """
+    result, matrices = _user_analysis_matrices(db, analysis_id, user_details.get("user_id"))
+    topic_sdg, _ = _analysis_topic_sdgs(db, result, matrices)
+    doc_ids = matrices["doc_ids"]
+    if ids is not None:
+        wanted = _parse_ids(ids, "ids")[:limit]
+        positions = np.searchsorted(doc_ids, wanted)
+        rows = [
+            int(row) for doc_id, row in zip(wanted, positions)
+            if row < len(doc_ids) and doc_ids[row] == doc_id
+        ]
+    else:
+        rows = list(range(offset, min(offset + limit, len(doc_ids))))
+    return {"total": len(doc_ids), "documents": _with_titles(db, document_sdgs(matrices, topic_sdg, rows, top_n))}
+
+def latest_analysis_query(file_id: int, user: str):
+    # Join ke files_uploaded memastikan file milik user (index analysis_result.file_id)
+    return select(models.AnalysisResult).join(
+        models.FilesUploaded, models.FilesUploaded.id == models.AnalysisResult.file_id
+    ).where(
+        models.AnalysisResult.file_id == file_id,
+        models.FilesUploaded.uploaded_by == user
+    ).order_by(models.AnalysisResult.id.desc()).limit(1)
+
+async def _latest_analysis(db: AsyncSession, file_id: int, user: str):
+    latest_analysis = (await db.execute(latest_analysis_query(file_id, user))).scalar()
+    
+    if not latest_analysis:
+        raise HTTPException(status_code=404, detail="No completed analysis found")
+    
     
+    topics = (
+        json.loads(latest_analysis.topic_result)
+        if isinstance(latest_analysis.topic_result, str)
+        else latest_analysis.topic_result or []
+    )
+
+    # sdg_results = (
+    #     json.loads(latest_analysis.sdg_result)
+    #     if isinstance(latest_analysis.sdg_result, str)
+    #     else latest_analysis.sdg_result or []
+    # )
+
+    
+    return {
+        "success": True,
+        "data": {
+            "topics": topics,  
+            "topic_distribution": topics,  
+            # "sdg_mapping": sdg_results,
+            "file_name": latest_analysis.file_name,
+            "coherence": latest_analysis.coherence,
+            "coherence_mode": latest_analysis.coherence_mode
+        }
+    }
+
 @router.get("/a/{file_id}")
 async def get_latest_analysis(
     request: Request,
     file_id:int,
-    db: Session = Depends(get_db)
+    user_details: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get the most recent completed analysis for the user"""
     try:
         
-        user_details = authenticate_and_get_user_details(request, db)
         user = user_details.get("user_id")
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
        
-        latest_analysis = db.query(models.AnalysisResult).filter(
-            models.AnalysisResult.file_id==file_id,
-            models.FilesUploaded.uploaded_by==user).order_by(
-            models.AnalysisResult.id.desc()).first()
-        
-        if not latest_analysis:
-            raise HTTPException(status_code=404, detail="No completed analysis found")
-        
-        
-        topics = (
-            json.loads(latest_analysis.topic_result)
-            if isinstance(latest_analysis.topic_result, str)
-            else latest_analysis.topic_result or []
-        )
-
-        # sdg_results = (
-        #     json.loads(latest_analysis.sdg_result)
-        #     if isinstance(latest_analysis.sdg_result, str)
-        #     else latest_analysis.sdg_result or []
-        # )
-
-        
-        return {
-            "success": True,
-            "data": {
-                "topics": topics,  
-                "topic_distribution": topics,  
-                # "sdg_mapping": sdg_results,
-                "file_name": latest_analysis.file_name
-            }
-        }
+        return await cached_response_async(request, db, user, lambda: _latest_analysis(db, file_id, user))
         
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get latest analysis: {str(e)}")
->>>>>>> 4e73095e06b1994bd6c16400150647e864023857
@@ -1,37 +1,31 @@
 from fastapi import APIRouter, HTTPException, Request, Depends, UploadFile, File, Query, WebSocket
-import pandas as pd
-from typing import List
-from io import BytesIO
+from typing import Optional
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 from ..config import models
-<<<<<<< HEAD
-from ..config.db import (get_corpus_uploaded, insert_corpus, insert_file_record, upload_merged, get_user)
-from ..utils import authhenticate_and_get_user_details
-=======
 from ..config.db import (
-    get_corpus_uploaded, 
-    insert_corpus, 
-    get_corpus_by, 
-    upload_merged, 
+    get_corpus_by_async,
     insert_file_record,
-    download_file)
-from ..utils import authenticate_and_get_user_details
->>>>>>> 4e73095e06b1994bd6c16400150647e864023857
-from ..config.models import get_db
+    download_file_async)
+from ..utils import get_current_user
+from ..config.models import get_db, get_async_db
+from ..services.ingestion import resolve_columns, clean_frame, ingest_batches
+from ..services.upload_reader import UPLOAD_TYPES, read_columns, iter_batches
+from ..services.blob_store import spool_blob, discard_spool, put_spooled_blob, blob_path
+from ..services.graph_store import add_file_to_graph
+from ..services.response_cache import bump_data_version
+from ..services.job_queue import enqueue_analysis, DONE, FAILED
+from ..services.progress_bus import publish, subscribe, upload_channel
+from ..services.model_registry import get_model_record, latest_user_model
+from ..services.model_handler import VOCAB_POLICIES
+from ..config.settings import UPLOAD_CHUNK_SIZE, INCREMENTAL_VOCAB_POLICY
 import asyncio
 from pathlib import Path
 from pydantic import BaseModel
 from datetime import datetime
-<<<<<<< HEAD
-import json
 
 router = APIRouter()
-
-class RequestModel(BaseModel):
-=======
-from pathlib import Path
-router = APIRouter()
-progress_store ={}
 # class RequestModel(BaseModel):
 #     id: int
 #     title: str
@@ -43,7 +37,6 @@ progress_store ={}
 #         orm_mode = True
 
 class RequestModelByUser(BaseModel):
->>>>>>> 4e73095e06b1994bd6c16400150647e864023857
     id: int
     title: str
     abstract: str
@@ -54,25 +47,18 @@ class RequestModelByUser(BaseModel):
     class Config:
         orm_mode = True
 
-<<<<<<< HEAD
-@router.get("/c", response_model=List[RequestModel])
-async def get_all_corpus(request: Request, db: Session = Depends(get_db)):
-    corpus = get_corpus_uploaded(db)
-    return corpus
-=======
-@router.delete #hapus file
-
-@router.get #view file
-
 @router.get("/c/download")
-async def download_corpus(file_id: int = Query(...), db: Session = Depends(get_db)):
-    return download_file(db, file_id)
+async def download_corpus(request: Request, file_id: int = Query(...), db: AsyncSession = Depends(get_async_db)):
+    return await download_file_async(db, file_id, request)
     
 @router.get("/c/uploaded")
-async def get_uploaded_files(request: Request, db: Session = Depends(get_db)):
-    user_details= authenticate_and_get_user_details(request, db)
+async def get_uploaded_files(
+    request: Request,
+    user_details: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
     user_id = user_details.get("user_id")
-    files = get_corpus_by(db, user_id)
+    files = await get_corpus_by_async(db, user_id)
     
     return [
         {"id": f.id, 
@@ -86,97 +72,138 @@ async def get_uploaded_files(request: Request, db: Session = Depends(get_db)):
 
     
 @router.get("/c/u/analyse")
-async def get_uploaded_for_analyse(request: Request, db: Session = Depends(get_db)):
-    user_details= authenticate_and_get_user_details(request, db)
+async def get_uploaded_for_analyse(
+    request: Request,
+    user_details: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
     user_id = user_details.get("user_id")
-    files = get_corpus_by(db, user_id)
+    files = await get_corpus_by_async(db, user_id)
     
     return {
         "files": [{"id": f.id, "file_name": f.file_name} for f in files]
     }
 
 @router.websocket("/ws/progress/{file_id}")
-async def websocket_progress(websocket: WebSocket, file_id: str):
+async def websocket_progress(websocket: WebSocket, file_id: int):
+    """Mengirim progres upload setiap kali berubah dan menutup koneksi saat upload selesai."""
     await websocket.accept()
-    while True:
-        progress = progress_store.get(file_id, 0)
-        await websocket.send_json({"progress": progress})
-        await asyncio.sleep(1) 
 
->>>>>>> 4e73095e06b1994bd6c16400150647e864023857
+    async def forward():
+        async for event in subscribe(upload_channel(file_id)):
+            await websocket.send_json({
+                "progress": event["progress"],
+                "stage": event["stage"],
+                "status": event["status"],
+                "message": event["message"],
+            })
+
+    async def until_disconnect():
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    # Klien yang menutup koneksi lebih dulu langsung melepas subscription-nya
+    sender = asyncio.create_task(forward())
+    listener = asyncio.create_task(until_disconnect())
+    await asyncio.wait({sender, listener}, return_when=asyncio.FIRST_COMPLETED)
+    listener.cancel()
+    if sender.done():
+        await websocket.close()
+    else:
+        sender.cancel()
+
+
+def _resolve_base_model(db: Session, user_id: str, model_id: Optional[int], vocab_policy: Optional[str]):
+    # Update incremental memakai model yang dipilih atau model terbaru milik user
+    if vocab_policy is not None and vocab_policy not in VOCAB_POLICIES:
+        raise HTTPException(status_code=400, detail=f"vocab_policy must be one of {', '.join(VOCAB_POLICIES)}")
+    base_model = get_model_record(db, model_id, user_id) if model_id is not None else latest_user_model(db, user_id)
+    if base_model is None or not base_model.path:
+        raise HTTPException(status_code=404, detail="No trained model available for incremental update")
+    return base_model
 
 @router.post("/c/upload")
 async def upload_corpus(
     request: Request, 
     file: UploadFile = File(...), 
+    chunk_size: Optional[int] = Query(None, gt=0),
+    incremental: bool = Query(False),
+    model_id: Optional[int] = Query(None),
+    vocab_policy: Optional[str] = Query(None),
+    user_details: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    user_details = authenticate_and_get_user_details(request, db)
     user_id = user_details.get("user_id")
 
-<<<<<<< HEAD
-    file_name = file.filename
-    file_size = 0
-    file_type = Path(file_name).suffix.lower()
+    # Query database, parsing pandas dan penulisan batch berjalan di threadpool
+    # agar event loop tetap melayani request lain selama upload diproses
+    base_model = None
+    if incremental:
+        base_model = await run_in_threadpool(_resolve_base_model, db, user_id, model_id, vocab_policy)
 
-=======
     fileName = file.filename
     file_type = Path(fileName).suffix.lower()
-    file_name_stemmed = Path(fileName).stem
-    status = "completed"
->>>>>>> 4e73095e06b1994bd6c16400150647e864023857
-    if file_type not in [".csv", ".xlsx", ".json"]:
+    if file_type not in UPLOAD_TYPES:
         raise HTTPException(status_code=400, detail="Unsupported file type")
 
-    contents = await file.read()
-    file_size = len(contents)
-    file_binary = bytes(contents)
+    return await run_in_threadpool(
+        _store_upload,
+        db,
+        user_id,
+        fileName,
+        file.file,
+        chunk_size or UPLOAD_CHUNK_SIZE,
+        base_model,
+        vocab_policy,
+    )
 
+def _store_upload(
+    db: Session,
+    user_id: str,
+    fileName: str,
+    source,
+    chunk_size: int,
+    base_model,
+    vocab_policy: Optional[str]
+) -> dict:
+    """
+    Menyalin upload ke file sementara, membaca dan menulis Corpus/Metadata per
+    batch, memperbarui graf, lalu mengantrekan update model bila diminta.
+    """
+    spool_path = None
     try:
-        if file_type == ".csv":
-            df = pd.read_csv(BytesIO(contents))
-        elif file_type == ".xlsx":
-            df = pd.read_excel(BytesIO(contents))
-        elif file_type == ".json":
-            df = pd.read_json(BytesIO(contents))
+        # Isi upload di-spool ke disk (sekaligus di-hash) lalu dibaca per batch
+        spool_path, blob_sha256, file_size = spool_blob(source)
+        return _ingest_spooled(
+            db, user_id, fileName, spool_path, blob_sha256, file_size, chunk_size, base_model, vocab_policy
+        )
+    finally:
+        discard_spool(spool_path)
+
+def _ingest_spooled(
+    db: Session,
+    user_id: str,
+    fileName: str,
+    spool_path: Path,
+    blob_sha256: str,
+    file_size: int,
+    chunk_size: int,
+    base_model,
+    vocab_policy: Optional[str]
+) -> dict:
+    file_type = Path(fileName).suffix.lower()
+    file_name_stemmed = Path(fileName).stem
+    status = "completed"
+
+    try:
+        columns = read_columns(spool_path, file_type)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error reading file: {str(e)}")
 
-    df.columns = df.columns.str.lower().str.strip()
-<<<<<<< HEAD
-
-    # PERBAIKAN: Menambahkan kolom 'doi', 'authors', dan 'topics' sebagai kolom wajib
-    required_columns = {"title", "abstract", "doi", "authors", "topics"}
-    
-    # Memeriksa apakah semua kolom yang dibutuhkan ada, namun tetap fleksibel
-    # Anda bisa memilih untuk tidak menjadikannya wajib jika data di file Anda tidak selalu lengkap
-    
-    # Ganti baris ini jika Anda ingin mengizinkan kolom 'doi', 'authors', 'topics' bersifat opsional
-    if not required_columns.issubset(set(df.columns)):
-        missing_columns = required_columns - set(df.columns)
-        print(f"Warning: Missing columns in uploaded file: {missing_columns}")
-        # Anda bisa memilih untuk raise HTTPException di sini, atau melanjutkan dengan peringatan
-        # Untuk kemudahan, kita akan melanjutkan, tetapi dengan nilai default None atau "[]"
-
-    # Simpan metadata file ke tabel FilesUploaded
-    file_id = insert_file_record(db=db, user_id=user_id, file_name=file_name)
-
-=======
-    total_rows = len(df)
-    rows_inserted = 0
-    
-    required_title=["title", "titles"]
-    required_abstract=["abstract", "abstracts", "summaries", "summary"]
-    required_columns = [required_title, required_abstract]
-    
-    def has_required_columns(columns):
-        return all(any(col in columns for col in group) for group in required_columns)
-    columns_in_file = set(df.columns)
-    if not has_required_columns(columns_in_file):
-        raise ValueError("Missing required columns")
-
-    title_col = next((col for col in required_title if col in df.columns), None)
-    abstract_col = next((col for col in required_abstract if col in df.columns), None)
+    try:
+        title_col, abstract_col = resolve_columns(columns)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     existing_file=db.query(models.FilesUploaded).filter(
             models.FilesUploaded.file_name==file_name_stemmed,
@@ -184,7 +211,9 @@ async def upload_corpus(
         ).first()
     
     if not existing_file:
-    # Simpan metadata file ke tabel FilesUploaded
+        # Pindahkan file ke blob store sekali, baris lain cukup mereferensikan hash-nya
+        put_spooled_blob(db, spool_path, blob_sha256, file_size)
+        # Simpan metadata file ke tabel FilesUploaded
         file_id = insert_file_record(
             db=db, 
             user_id=user_id,    
@@ -192,122 +221,86 @@ async def upload_corpus(
             file_size=file_size,
             file_type=file_type,
             date_uploaded=datetime.now(),
-            status=status
+            status=status,
+            blob_sha256=blob_sha256
             )
-        progress_store[file_id] = 0
     else:
         return {
                 "message": "Upload Skipped, File's Already Stored!"
             }
-    
->>>>>>> 4e73095e06b1994bd6c16400150647e864023857
-    # Ambil kombinasi title-abstract unik dari database
-    existing_pairs = set(
-        db.query(models.Metadata.title, models.Metadata.abstract).all()
-    )
-
-    corpus_entries = []
-<<<<<<< HEAD
-    duplicate_count = 0
 
-    for _, row in df.iterrows():
-        title = str(row.get("title", "")).strip()
-        abstract = str(row.get("abstract", "")).strip()
-=======
-    merged_entries = []
-    
-    duplicate_col = 0
-
-    for _, row in df.iterrows():
-        title = str(row[title_col]).strip()
-        abstract = str(row[abstract_col]).strip()
->>>>>>> 4e73095e06b1994bd6c16400150647e864023857
-
-        # Lewati jika title atau abstract kosong
-        if not title or not abstract:
-            continue
-        
-        if (title, abstract) in existing_pairs:
-            duplicate_col += 1
-            continue
-
-        # PERBAIKAN: Ambil data dari kolom 'doi', 'authors', dan 'topics'
-        # Gunakan .get() untuk menghindari KeyError jika kolom tidak ada
-        doi = row.get("doi", None)
-        authors_data = row.get("authors", "[]") 
-        topics_data = row.get("topics", "[]")
-        
-        # Lakukan validasi dasar untuk data authors dan topics
-        # Ini akan membantu mencegah error JSONDecodeError di graphroutes.py
-        try:
-            json.loads(authors_data)
-        except (json.JSONDecodeError, TypeError):
-            authors_data = "[]"
-            
-        try:
-            json.loads(topics_data)
-        except (json.JSONDecodeError, TypeError):
-            topics_data = "[]"
-
-        # PERBAIKAN: Teruskan data yang baru diambil ke fungsi insert_corpus
-        new_corpus = insert_corpus(
+    channel = upload_channel(file_id)
+    progress = {"value": 0.0}
+
+    def report(stage):
+        publish(channel, stage, progress["value"], user_id=user_id)
+
+    def cleaned_batches():
+        # Setiap batch dibersihkan secara vectorized lalu langsung ditulis;
+        # progres dihitung dari bagian file yang sudah dibaca
+        report("parsing")
+        for batch, fraction in iter_batches(blob_path(blob_sha256), file_type, chunk_size):
+            # Record JSON tidak wajib memiliki semua kolom
+            for col in (title_col, abstract_col):
+                if col not in batch.columns:
+                    batch[col] = None
+            yield clean_frame(batch, title_col, abstract_col)
+            progress["value"] = round(fraction * 100, 2)
+            report("parsing")
+
+    # Tulis seluruh baris dalam batch, satu transaksi untuk satu upload
+    try:
+        rows_inserted, duplicate_col = ingest_batches(
             db=db,
-            file_name=file.filename,
-            file_size=len(file_binary),
-            file_type=file_type,
-<<<<<<< HEAD
-            title=title,
-            abstract=abstract,
-            date_uploaded=datetime.now(),
-            file_real=contents,
-            doi=doi,
-            authors=authors_data,
-            topics=topics_data
-=======
+            batches=cleaned_batches(),
             file_id=file_id,
             user_id=user_id,
-            date_uploaded=datetime.utcnow(),
-            file_real=file_binary
-        )
-        db.add(new_corpus)
-        db.flush()
-
-        merged_entries = upload_merged(
-            db=db,
-            file_id=file_id,  
-            title=title,
-            abstract=abstract
->>>>>>> 4e73095e06b1994bd6c16400150647e864023857
+            file_name=fileName,
+            file_size=file_size,
+            file_type=file_type,
+            blob_sha256=blob_sha256,
+            on_stage=report,
         )
-        db.add(merged_entries)
-        corpus_entries.append(new_corpus)
-<<<<<<< HEAD
-        
-    db.add_all(corpus_entries)
-    db.commit()
-=======
-        rows_inserted += 1
-        progress_store[file_id] = round((rows_inserted / total_rows) * 100, 2)
-    
-    db.commit()  
-    if not corpus_entries:
+        # Perbarui graf yang sudah jadi dalam transaksi yang sama
+        report("graph")
+        add_file_to_graph(db, user_id, file_id)
+        bump_data_version(db, user_id)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        db.query(models.FilesUploaded).filter(models.FilesUploaded.id == file_id).delete()
+        db.commit()
+        publish(channel, FAILED, progress["value"], status=FAILED, message=str(e), user_id=user_id)
+        raise HTTPException(status_code=500, detail=f"Error saving corpus: {str(e)}")
+
+    publish(channel, DONE, 100, status=DONE, user_id=user_id)
+    if not rows_inserted:
         return {
             "message": "Upload skipped. All entries are duplicates.",
             "duplicate_count": duplicate_col
         }
->>>>>>> 4e73095e06b1994bd6c16400150647e864023857
 
-    return {
+    response = {
         "message": "Upload successful",
-        "total_uploaded": len(corpus_entries),
-<<<<<<< HEAD
-        "duplicate_skipped": duplicate_count,
-        "example_title": corpus_entries[0].title if corpus_entries else None,
-        "example_abstract": corpus_entries[0].abstract if corpus_entries else None,
-    }
-=======
+        "total_uploaded": rows_inserted,
         "duplicate_skipped": duplicate_col,
     }
+    if base_model is not None:
+        # Retrain penuh tetap tersedia lewat /analyze; di sini model hanya dilanjutkan
+        job = enqueue_analysis(
+            db,
+            user_id,
+            file_id,
+            base_model.num_topics,
+            (base_model.hyperparameters or {}).get("iteration", 50),
+            options={"update": {
+                "model_id": base_model.id,
+                "vocab_policy": vocab_policy or INCREMENTAL_VOCAB_POLICY,
+            }},
+        )
+        response["update_job_id"] = job.id
+        response["base_model_id"] = base_model.id
+    return response
 
 
 
@@ -343,4 +336,3 @@ async def upload_corpus(
 #           }
 #     except Exception as e:
 #         raise HTTPException(status_code=500, detail=str(e))
->>>>>>> 4e73095e06b1994bd6c16400150647e864023857
@@ -0,0 +1,102 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from sqlalchemy.orm import Session
+from ..config import models
+from ..config.settings import BLOB_DIR, DOWNLOAD_CHUNK_SIZE
+
+# Blob store content-addressed: setiap file disimpan sekali di
+# BLOB_DIR/<2 karakter awal hash>/<hash SHA-256>.
+
+def blob_path(sha256: str) -> Path:
+    return Path(BLOB_DIR) / sha256[:2] / sha256
+
+def _write_atomic(sha256: str, data: bytes):
+    path = blob_path(sha256)
+    if path.exists():
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def put_blob(db: Session, data: bytes) -> str:
+    """
+    Menyimpan isi file ke blob store bila belum ada dan mencatatnya di tabel
+    blobs (tanpa commit). Mengembalikan hash SHA-256 sebagai referensi.
+    """
+    sha256 = hashlib.sha256(data).hexdigest()
+    _write_atomic(sha256, data)
+    if not db.get(models.Blob, sha256):
+        db.add(models.Blob(sha256=sha256, size=len(data)))
+        db.flush()
+    return sha256
+
+def spool_blob(source, chunk_size: int = DOWNLOAD_CHUNK_SIZE) -> tuple:
+    """
+    Menyalin file upload (file object) per potongan ke file sementara di
+    BLOB_DIR sambil menghitung hash SHA-256, tanpa memuat isinya ke memori.
+    Mengembalikan (path file sementara, sha256, ukuran).
+    """
+    Path(BLOB_DIR).mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=BLOB_DIR, suffix=".upload")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while chunk := source.read(chunk_size):
+                digest.update(chunk)
+                size += len(chunk)
+                f.write(chunk)
+    except Exception:
+        discard_spool(tmp_path)
+        raise
+    return Path(tmp_path), digest.hexdigest(), size
+
+def discard_spool(tmp_path):
+    if tmp_path is not None and os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+def put_spooled_blob(db: Session, tmp_path, sha256: str, size: int) -> str:
+    """
+    Memindahkan file hasil spool_blob ke blob store (rename, tanpa menyalin
+    ulang) dan mencatatnya di tabel blobs (tanpa commit).
+    """
+    path = blob_path(sha256)
+    if path.exists():
+        discard_spool(tmp_path)
+    else:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_path, path)
+    if not db.get(models.Blob, sha256):
+        db.add(models.Blob(sha256=sha256, size=size))
+        db.flush()
+    return sha256
+
+def blob_exists(sha256: str) -> bool:
+    return blob_path(sha256).is_file()
+
+def iter_blob(sha256: str, start: int = 0, end: int = None, chunk_size: int = DOWNLOAD_CHUNK_SIZE):
+    """
+    Membaca blob per potongan dari byte start sampai end (inklusif) sehingga
+    pemakaian memori konstan berapa pun ukuran filenya.
+    """
+    path = blob_path(sha256)
+    if end is None:
+        end = path.stat().st_size - 1
+    remaining = end - start + 1
+    with open(path, "rb") as f:
+        f.seek(start)
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
@@ -0,0 +1,216 @@
+import hashlib
+import re
+import unicodedata
+import zlib
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from ..config import models
+from ..config.db import dialect_insert
+from ..config.settings import DEDUP_NEAR_THRESHOLD
+
+# Deduplikasi title/abstract saat upload tanpa memuat seluruh isi database.
+# Setiap isi diwakili hash title+abstract yang dinormalisasi (content_hashes,
+# primary key = index unik). Per chunk upload: hash yang sudah ada dicari
+# dengan IN berbatch, lalu hash baru diklaim dengan INSERT ... ON CONFLICT
+# DO NOTHING RETURNING sehingga upload paralel tidak menulis isi yang sama.
+#
+# Near-duplicate (opsional): signature MinHash dari shingle 3 kata, dibagi
+# menjadi band LSH. Kandidat dicari lewat index band_key, kemudian
+# kemiripan Jaccard diestimasi dari signature.
+
+NUM_PERM = 64
+LSH_BANDS = 16
+ROWS_PER_BAND = NUM_PERM // LSH_BANDS
+SHINGLE_SIZE = 3
+
+# Batas parameter per statement SQLite
+_CHUNK = 900
+
+# Permutasi hash (a*x + b) mod p dengan p prima Mersenne 2^31-1 sehingga
+# perkalian tetap muat di uint64. Seed tetap agar signature sama di setiap proses.
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240601)
+_PERM_A = _rng.integers(1, _PRIME, NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, _PRIME, NUM_PERM, dtype=np.uint64)
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_text(text: str) -> str:
+    """Bentuk kanonik teks: Unicode NFKC, huruf kecil, spasi diringkas."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text).casefold()).strip()
+
+def content_hash(title: str, abstract: str) -> str:
+    key = f"{normalize_text(title)}\x1f{normalize_text(abstract)}"
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+def minhash_signature(text: str) -> np.ndarray:
+    words = normalize_text(text).split()
+    shingles = {
+        " ".join(words[i:i + SHINGLE_SIZE])
+        for i in range(max(len(words) - SHINGLE_SIZE + 1, 1))
+    }
+    values = np.fromiter(
+        (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64, count=len(shingles)
+    ) % _PRIME
+    hashed = (np.outer(values, _PERM_A) + _PERM_B) % _PRIME
+    return hashed.min(axis=0).astype(np.uint32)
+
+def band_keys(signature: np.ndarray) -> list:
+    """Satu kunci per band: nomor band + hash baris signature di band tersebut."""
+    keys = []
+    for band in range(LSH_BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        keys.append(f"{band:02d}{hashlib.blake2b(rows.tobytes(), digest_size=8).hexdigest()}")
+    return keys
+
+def similarity(signature_a: np.ndarray, signature_b: np.ndarray) -> float:
+    """Estimasi kemiripan Jaccard dari dua signature MinHash."""
+    return float(np.mean(signature_a == signature_b))
+
+def _in_batches(db: Session, query_for, values: list) -> list:
+    rows = []
+    for start in range(0, len(values), _CHUNK):
+        rows.extend(db.execute(query_for(values[start:start + _CHUNK])).all())
+    return rows
+
+def _existing_hashes(db: Session, hashes: list) -> set:
+    table = models.ContentHash
+    return {row[0] for row in _in_batches(
+        db, lambda batch: select(table.content_hash).where(table.content_hash.in_(batch)), hashes
+    )}
+
+def _claim_hashes(db: Session, hashes: list, file_id: int) -> set:
+    if not hashes:
+        return set()
+    statement = dialect_insert(db)(models.ContentHash.__table__).on_conflict_do_nothing().returning(
+        models.ContentHash.content_hash
+    )
+    return set(db.execute(statement, [{"content_hash": h, "file_id": file_id} for h in hashes]).scalars())
+
+def _near_duplicates(db: Session, signatures: dict, threshold: float) -> set:
+    """
+    Hash dari signatures (urutan chunk) yang mirip dengan isi di database atau
+    dengan baris sebelumnya di chunk yang sama.
+    """
+    keys = {content: band_keys(signature) for content, signature in signatures.items()}
+    band = models.ContentLSHBand
+    candidates = {}
+    for band_key, content in _in_batches(
+        db,
+        lambda batch: select(band.band_key, band.content_hash).where(band.band_key.in_(batch)),
+        list({key for item_keys in keys.values() for key in item_keys})
+    ):
+        candidates.setdefault(band_key, set()).add(content)
+
+    stored = models.ContentSignature
+    known = {
+        content: np.frombuffer(signature, dtype=np.uint32)
+        for content, signature in _in_batches(
+            db,
+            lambda batch: select(stored.content_hash, stored.signature).where(stored.content_hash.in_(batch)),
+            list({content for contents in candidates.values() for content in contents})
+        )
+    }
+
+    duplicates = set()
+    for content, signature in signatures.items():
+        matches = {other for key in keys[content] for other in candidates.get(key, ())}
+        if any(similarity(signature, known[other]) >= threshold for other in matches if other in known):
+            duplicates.add(content)
+            continue
+        # Baris ini tetap disimpan: baris berikutnya di chunk juga dibandingkan dengannya
+        known[content] = signature
+        for key in keys[content]:
+            candidates.setdefault(key, set()).add(content)
+    return duplicates
+
+def _store_signatures(db: Session, signatures: dict):
+    if not signatures:
+        return
+    db.execute(models.ContentSignature.__table__.insert(), [
+        {"content_hash": content, "signature": signature.tobytes()}
+        for content, signature in signatures.items()
+    ])
+    db.execute(models.ContentLSHBand.__table__.insert(), [
+        {"band_key": key, "content_hash": content}
+        for content, signature in signatures.items()
+        for key in band_keys(signature)
+    ])
+
+def deduplicate_chunk(
+    db: Session,
+    chunk: pd.DataFrame,
+    file_id: int,
+    near_threshold: float = DEDUP_NEAR_THRESHOLD
+):
+    """
+    Membuang baris chunk yang isinya sudah ada (di database, di chunk
+    sebelumnya, atau di chunk ini) lalu mencatat hash baris yang tersisa
+    untuk file_id. Tanpa commit. Mengembalikan (chunk, jumlah duplikat).
+    """
+    if chunk.empty:
+        return chunk, 0
+    titles = chunk["title"].tolist()
+    abstracts = chunk["abstract"].tolist()
+    hashes = pd.Series([content_hash(t, a) for t, a in zip(titles, abstracts)], index=chunk.index)
+
+    keep = ~hashes.duplicated()
+    keep &= ~hashes.isin(_existing_hashes(db, hashes[keep].tolist()))
+
+    signatures = {}
+    if near_threshold > 0:
+        signatures = {
+            hashes[i]: minhash_signature(f"{titles[pos]} {abstracts[pos]}")
+            for pos, i in enumerate(chunk.index) if keep[i]
+        }
+        keep &= ~hashes.isin(_near_duplicates(db, signatures, near_threshold))
+
+    # Hash yang sudah lebih dulu diklaim upload lain dianggap duplikat
+    claimed = _claim_hashes(db, hashes[keep].tolist(), file_id)
+    keep &= hashes.isin(claimed)
+    _store_signatures(db, {content: signatures[content] for content in claimed if content in signatures})
+
+    return chunk[keep], len(chunk) - int(keep.sum())
+
+def backfill_content_hashes(db: Session, batch_size: int = 2000, near_threshold: float = DEDUP_NEAR_THRESHOLD) -> int:
+    """
+    Mengisi content_hashes (dan signature bila near-duplicate aktif) dari
+    corpus_metadata yang sudah ada. Isi yang sama hanya dicatat sekali.
+    """
+    total = 0
+    last_id = 0
+    while True:
+        rows = db.query(
+            models.Metadata.id, models.Metadata.file_id, models.Metadata.title, models.Metadata.abstract
+        ).filter(models.Metadata.id > last_id).order_by(models.Metadata.id).limit(batch_size).all()
+        if not rows:
+            break
+        texts = {}
+        for row in rows:
+            content = content_hash(row.title, row.abstract)
+            if content not in texts:
+                texts[content] = (row.file_id, f"{row.title} {row.abstract}")
+        total += len(_backfill_batch(db, texts, near_threshold))
+        db.commit()
+        last_id = rows[-1].id
+    return total
+
+def _backfill_batch(db: Session, texts: dict, near_threshold: float) -> set:
+    by_file = {}
+    for content, (file_id, _) in texts.items():
+        by_file.setdefault(file_id, []).append(content)
+    claimed = set()
+    for file_id, contents in by_file.items():
+        claimed |= _claim_hashes(db, contents, file_id)
+    if near_threshold > 0:
+        stored = models.ContentSignature
+        signed = {row[0] for row in _in_batches(
+            db, lambda batch: select(stored.content_hash).where(stored.content_hash.in_(batch)), list(texts)
+        )}
+        _store_signatures(db, {
+            content: minhash_signature(text)
+            for content, (_, text) in texts.items() if content not in signed
+        })
+    return claimed
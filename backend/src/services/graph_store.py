@@ -0,0 +1,624 @@
+import json
+from collections import defaultdict
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+from ..config import models
+from ..config.db import dialect_insert
+from .sdg_mapping import SDG_LABELS
+
+# Graf publikasi/penulis/institusi/topik/SDG yang disimpan di tabel
+# graph_nodes dan graph_edges. Node dan edge dari satu file ditambahkan saat
+# upload; lapisan SDG (edge MAPS_TO_SDG dan node SDG beserta tooltip)
+# dihitung ulang setelah analisis. Endpoint /graph-data cukup membaca tabel.
+
+# Batas parameter per statement SQLite
+_CHUNK = 900
+
+def _dumps(data: dict) -> str:
+    return json.dumps(data, sort_keys=True, default=str)
+
+def current_version(db: Session, user_id: str) -> int:
+    return db.query(models.GraphVersion.version).filter(
+        models.GraphVersion.user_id == user_id
+    ).scalar() or 0
+
+def _bump_version(db: Session, user_id: str) -> int:
+    updated = db.execute(
+        update(models.GraphVersion)
+        .where(models.GraphVersion.user_id == user_id)
+        .values(version=models.GraphVersion.version + 1)
+    ).rowcount
+    if not updated:
+        db.add(models.GraphVersion(user_id=user_id, version=1))
+    db.flush()
+    return current_version(db, user_id)
+
+def _publication_details(db: Session, corpus_ids: list):
+    """Penulis (beserta institusi) dan topik per publikasi dari tabel normalisasi."""
+    authors = defaultdict(list)
+    topics = defaultdict(list)
+    for start in range(0, len(corpus_ids), _CHUNK):
+        chunk = corpus_ids[start:start + _CHUNK]
+        rows = db.query(
+            models.PublicationAuthorInstitution.corpus_id,
+            models.PublicationAuthorInstitution.position,
+            models.Author.author_key,
+            models.Author.full_name,
+            models.Institution.institution_key,
+            models.Institution.name.label("institution_name"),
+            models.Institution.country,
+        ).join(
+            models.Author, models.Author.id == models.PublicationAuthorInstitution.author_id
+        ).outerjoin(
+            models.Institution, models.Institution.id == models.PublicationAuthorInstitution.institution_id
+        ).filter(
+            models.PublicationAuthorInstitution.corpus_id.in_(chunk)
+        ).order_by(models.PublicationAuthorInstitution.id)
+        for row in rows:
+            authors[row.corpus_id].append(row)
+
+        rows = db.query(
+            models.PublicationTopic.corpus_id,
+            models.PublicationTopic.topic_probability,
+            models.PublicationTopic.keywords,
+            models.Topic.topic_number,
+            models.Topic.keywords.label("topic_keywords"),
+        ).join(
+            models.Topic, models.Topic.id == models.PublicationTopic.topic_id
+        ).filter(
+            models.PublicationTopic.corpus_id.in_(chunk)
+        ).order_by(models.PublicationTopic.id)
+        for row in rows:
+            topics[row.corpus_id].append(row)
+    return authors, topics
+
+def paper_graph(paper, authors: list, topics: list):
+    """
+    Node dan edge untuk satu publikasi beserta penulis, institusi dan
+    topiknya. Mengembalikan (nodes, edges) berupa dict yang kuncinya id node
+    dan (type, source, target). Id node deterministik (ORCID/ROR atau hash stabil).
+    """
+    nodes = {}
+    edges = {}
+    pub_id = f"doi:{paper.doi}"
+    pub_data = {"title": paper.title, "abstract": paper.abstract}
+    if paper.year is not None:
+        pub_data["year"] = paper.year
+    nodes[pub_id] = ("Publication", pub_data)
+
+    for author in authors:
+        auth_id = f"orcid:{author.author_key}"
+        nodes.setdefault(auth_id, ("Author", {"full_name": author.full_name}))
+        edges[("AUTHORED_BY", pub_id, auth_id)] = {"position": author.position}
+
+        if author.institution_key:
+            inst_id = f"ror:{author.institution_key}"
+            nodes.setdefault(inst_id, ("Institution", {"name": author.institution_name, "country": author.country}))
+            edges.setdefault(("AFFILIATED_WITH", auth_id, inst_id), {})
+
+    for topic in topics:
+        topic_id = f"topic_{topic.topic_number}"
+        nodes.setdefault(topic_id, ("Topic", {"keywords": topic.topic_keywords or []}))
+        edges[("HAS_TOPIC", pub_id, topic_id)] = {"topic_probability": topic.topic_probability}
+
+    return nodes, edges
+
+def _write_nodes(db: Session, user_id: str, version: int, nodes: dict, replace: bool = False):
+    """
+    Menulis node secara bulk. Node yang sudah ada dibiarkan (node pertama yang
+    tercatat yang dipakai), kecuali replace=True: payload diganti bila berubah.
+    """
+    if not nodes:
+        return
+    table = models.GraphNode.__table__
+    rows = [
+        {"user_id": user_id, "node_id": node_id, "node_type": node_type,
+         "payload": _dumps(data), "year": data.get("year"), "version": version, "deleted": False}
+        for node_id, (node_type, data) in nodes.items()
+    ]
+    stmt = dialect_insert(db)(table)
+    if replace:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "node_id"],
+            set_={"payload": stmt.excluded.payload, "version": stmt.excluded.version, "deleted": False},
+            where=(table.c.payload != stmt.excluded.payload) | table.c.deleted,
+        )
+    else:
+        # Node yang sudah ada tidak diubah, kecuali yang sebelumnya dihapus
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "node_id"],
+            set_={"payload": stmt.excluded.payload, "year": stmt.excluded.year,
+                  "version": stmt.excluded.version, "deleted": False},
+            where=table.c.deleted,
+        )
+    db.execute(stmt, rows)
+
+def _write_edges(db: Session, user_id: str, version: int, edges: dict, replace: bool = False):
+    if not edges:
+        return
+    table = models.GraphEdge.__table__
+    rows = [
+        {"user_id": user_id, "edge_type": edge_type, "source": source, "target": target,
+         "payload": _dumps(data), "version": version, "deleted": False}
+        for (edge_type, source, target), data in edges.items()
+    ]
+    keys = ["user_id", "edge_type", "source", "target"]
+    stmt = dialect_insert(db)(table)
+    if replace:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=keys,
+            set_={"payload": stmt.excluded.payload, "version": stmt.excluded.version, "deleted": False},
+            where=(table.c.payload != stmt.excluded.payload) | table.c.deleted,
+        )
+    else:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=keys,
+            set_={"payload": stmt.excluded.payload, "version": stmt.excluded.version, "deleted": False},
+            where=table.c.deleted,
+        )
+    db.execute(stmt, rows)
+
+def _mark_deleted(db: Session, table, ids: list, version: int):
+    for start in range(0, len(ids), _CHUNK):
+        db.execute(
+            update(table)
+            .where(table.c.id.in_(ids[start:start + _CHUNK]))
+            .values(deleted=True, version=version)
+        )
+
+def add_papers(db: Session, user_id: str, *criteria, version: int = None) -> int:
+    """
+    Menambahkan publikasi Corpus milik user yang memenuhi criteria (beserta
+    penulis, institusi dan topiknya) ke graf user (tanpa commit).
+    """
+    version = version or _bump_version(db, user_id)
+    last_id = 0
+    while True:
+        # Diproses per potongan agar memori tetap kecil untuk corpus besar
+        papers = db.query(
+            models.Corpus.id, models.Corpus.doi, models.Corpus.title,
+            models.Corpus.abstract, models.Corpus.year
+        ).filter(
+            models.Corpus.uploaded_by == user_id,
+            models.Corpus.doi.isnot(None),
+            models.Corpus.doi != "",
+            models.Corpus.id > last_id,
+            *criteria
+        ).order_by(models.Corpus.id).limit(2000).all()
+        if not papers:
+            break
+        last_id = papers[-1].id
+
+        authors, topics = _publication_details(db, [paper.id for paper in papers])
+        nodes, edges = {}, {}
+        for paper in papers:
+            paper_nodes, paper_edges = paper_graph(paper, authors[paper.id], topics[paper.id])
+            for node_id, node in paper_nodes.items():
+                nodes.setdefault(node_id, node)
+            for key, data in paper_edges.items():
+                edges.setdefault(key, data)
+        _write_nodes(db, user_id, version, nodes)
+        _write_edges(db, user_id, version, edges)
+    return version
+
+def _sdg_tooltip(db: Session, user_id: str, sdg_id: int, pub_ids: list, topic_ids: set) -> str:
+    sdg_name = SDG_LABELS.get(sdg_id, "Unknown SDG")
+    tooltip_lines = [f"SDG {sdg_id} - {sdg_name}\n"]
+
+    # Detail hanya dibutuhkan untuk tiga publikasi pertama
+    dois = [pub_id[len("doi:"):] for pub_id in pub_ids[:3]]
+    papers = {
+        paper.doi: paper for paper in db.query(
+            models.Corpus.id, models.Corpus.doi, models.Corpus.title
+        ).filter(models.Corpus.uploaded_by == user_id, models.Corpus.doi.in_(dois))
+    }
+    authors, topics = _publication_details(db, [paper.id for paper in papers.values()])
+    for doi in dois:
+        paper = papers.get(doi)
+        if paper is None:
+            continue
+        keywords = next(
+            (topic.keywords or [] for topic in topics[paper.id] if f"topic_{topic.topic_number}" in topic_ids),
+            []
+        )
+
+        tooltip_lines.append(f"Publication: {paper.title}")
+        for author in authors[paper.id]:
+            institution_name = author.institution_name or "Unknown Institution"
+            tooltip_lines.append(f"   - Author: {author.full_name} ({institution_name})")
+        tooltip_lines.append(f"Topic Keywords: {', '.join(keywords)}")
+        tooltip_lines.append("")
+
+    if len(pub_ids) > 3:
+        tooltip_lines.append(f"...and {len(pub_ids) - 3} other publications")
+    return "\n".join(tooltip_lines).strip()
+
+def refresh_sdg_layer(db: Session, user_id: str, version: int = None) -> int:
+    """
+    Menghitung ulang edge MAPS_TO_SDG dan node SDG (beserta tooltip) dari
+    pemetaan manual di tabel SDGMapping untuk topik yang ada di graf user
+    (tanpa commit). Node topik graf memakai nomor topik data upload, sehingga
+    pemetaan otomatis (per topik LDA suatu model) tidak dipakai di sini.
+    Edge/node SDG yang tidak lagi berlaku ditandai deleted.
+    """
+    version = version or _bump_version(db, user_id)
+
+    topic_to_sdg = defaultdict(dict)
+    for mapping in db.query(
+        models.SDGMapping.topic_id, models.SDGMapping.sdg_id, models.SDGMapping.mapping_weight
+    ).filter(models.SDGMapping.model_id.is_(None)):
+        topic_to_sdg[f"topic_{mapping.topic_id}"][mapping.sdg_id] = mapping.mapping_weight
+
+    user_topics = {
+        row.node_id for row in db.query(models.GraphNode.node_id).filter(
+            models.GraphNode.user_id == user_id,
+            models.GraphNode.node_type == "Topic",
+            models.GraphNode.deleted.is_(False),
+        )
+    }
+    mapped_topics = user_topics & topic_to_sdg.keys()
+
+    edges = {}
+    sdg_topics = defaultdict(set)
+    for topic_id in mapped_topics:
+        for sdg_id, weight in topic_to_sdg[topic_id].items():
+            edges[("MAPS_TO_SDG", topic_id, f"sdg_{sdg_id}")] = {"mapping_weight": weight}
+            sdg_topics[sdg_id].add(topic_id)
+
+    # Publikasi per topik sesuai urutan masuknya ke graf
+    topic_pubs = defaultdict(list)
+    if mapped_topics:
+        rows = db.execute(
+            select(models.GraphEdge.source, models.GraphEdge.target)
+            .where(
+                models.GraphEdge.user_id == user_id,
+                models.GraphEdge.edge_type == "HAS_TOPIC",
+                models.GraphEdge.deleted.is_(False),
+            )
+            .order_by(models.GraphEdge.id)
+        )
+        for source, target in rows:
+            if target in mapped_topics:
+                topic_pubs[target].append(source)
+
+    nodes = {}
+    for sdg_id, topic_ids in sdg_topics.items():
+        # Publikasi dikelompokkan per topik (urut kemunculan topik), tanpa duplikat
+        pub_ids = list(dict.fromkeys(
+            pub_id for topic_id in topic_pubs if topic_id in topic_ids
+            for pub_id in topic_pubs[topic_id]
+        ))
+        nodes[f"sdg_{sdg_id}"] = ("SDG", {
+            "name": f"SDG {sdg_id} - {SDG_LABELS.get(sdg_id, 'Unknown SDG')}",
+            "tooltip": _sdg_tooltip(db, user_id, sdg_id, pub_ids, topic_ids),
+        })
+
+    _write_edges(db, user_id, version, edges, replace=True)
+    _write_nodes(db, user_id, version, nodes, replace=True)
+
+    stale_edges = [
+        row.id for row in db.query(models.GraphEdge.id, models.GraphEdge.source, models.GraphEdge.target).filter(
+            models.GraphEdge.user_id == user_id,
+            models.GraphEdge.edge_type == "MAPS_TO_SDG",
+            models.GraphEdge.deleted.is_(False),
+        ) if ("MAPS_TO_SDG", row.source, row.target) not in edges
+    ]
+    stale_nodes = [
+        row.id for row in db.query(models.GraphNode.id, models.GraphNode.node_id).filter(
+            models.GraphNode.user_id == user_id,
+            models.GraphNode.node_type == "SDG",
+            models.GraphNode.deleted.is_(False),
+        ) if row.node_id not in nodes
+    ]
+    _mark_deleted(db, models.GraphEdge.__table__, stale_edges, version)
+    _mark_deleted(db, models.GraphNode.__table__, stale_nodes, version)
+    return version
+
+def rebuild_user_graph(db: Session, user_id: str, reset: bool = False) -> int:
+    """
+    Membangun graf user dari seluruh Corpus (untuk data lama/backfill, tanpa
+    commit). reset=True menandai seluruh node/edge lama sebagai deleted lebih
+    dulu sehingga node yang tidak lagi dihasilkan ikut terhapus di delta.
+    """
+    version = _bump_version(db, user_id)
+    if reset:
+        for table in (models.GraphNode.__table__, models.GraphEdge.__table__):
+            db.execute(
+                update(table)
+                .where(table.c.user_id == user_id, table.c.deleted.is_(False))
+                .values(deleted=True, version=version)
+            )
+    add_papers(db, user_id, version=version)
+    refresh_sdg_layer(db, user_id, version)
+    return version
+
+def add_file_to_graph(db: Session, user_id: str, file_id: int) -> int:
+    """Dipanggil saat upload: menambahkan publikasi satu file lalu memperbarui lapisan SDG."""
+    if not current_version(db, user_id):
+        # Graf belum pernah dibangun: bangun sekaligus dari seluruh corpus user
+        return rebuild_user_graph(db, user_id)
+    version = _bump_version(db, user_id)
+    add_papers(db, user_id, models.Corpus.file_id == file_id, version=version)
+    refresh_sdg_layer(db, user_id, version)
+    return version
+
+def ensure_graph(db: Session, user_id: str) -> int:
+    """Membangun graf bila user belum memilikinya (mis. database lama). Meng-commit bila membangun."""
+    version = current_version(db, user_id)
+    if version:
+        return version
+    version = rebuild_user_graph(db, user_id)
+    db.commit()
+    return version
+
+def _node_json(row) -> dict:
+    return {"id": row.node_id, "type": row.node_type, **json.loads(row.payload)}
+
+def _edge_json(row) -> dict:
+    return {"source": row.source, "target": row.target, "type": row.edge_type, **json.loads(row.payload)}
+
+def read_graph(db: Session, user_id: str, since: int = None) -> dict:
+    """
+    Membaca graf user. Tanpa since: seluruh node/edge aktif. Dengan since:
+    hanya baris yang berubah setelah versi tersebut, ditambah daftar yang dihapus.
+    """
+    version = ensure_graph(db, user_id)
+    node_query = db.query(
+        models.GraphNode.node_id, models.GraphNode.node_type,
+        models.GraphNode.payload, models.GraphNode.deleted
+    ).filter(models.GraphNode.user_id == user_id)
+    edge_query = db.query(
+        models.GraphEdge.source, models.GraphEdge.target, models.GraphEdge.edge_type,
+        models.GraphEdge.payload, models.GraphEdge.deleted
+    ).filter(models.GraphEdge.user_id == user_id)
+
+    if since is None:
+        node_rows = node_query.filter(models.GraphNode.deleted.is_(False)).order_by(models.GraphNode.id)
+        edge_rows = edge_query.filter(models.GraphEdge.deleted.is_(False)).order_by(models.GraphEdge.id)
+        return {
+            "version": version,
+            "nodes": [_node_json(row) for row in node_rows],
+            "links": [_edge_json(row) for row in edge_rows],
+        }
+
+    node_rows = node_query.filter(models.GraphNode.version > since).order_by(models.GraphNode.id).all()
+    edge_rows = edge_query.filter(models.GraphEdge.version > since).order_by(models.GraphEdge.id).all()
+    return {
+        "version": version,
+        "since": since,
+        "nodes": [_node_json(row) for row in node_rows if not row.deleted],
+        "links": [_edge_json(row) for row in edge_rows if not row.deleted],
+        "removed": {
+            "nodes": [row.node_id for row in node_rows if row.deleted],
+            "links": [
+                {"source": row.source, "target": row.target, "type": row.edge_type}
+                for row in edge_rows if row.deleted
+            ],
+        },
+    }
+
+# Jenis node yang dikenal di graf
+NODE_TYPES = ("Publication", "Author", "Institution", "Topic", "SDG")
+
+def _chunks(values: list):
+    for start in range(0, len(values), _CHUNK):
+        yield values[start:start + _CHUNK]
+
+def _edge_sources(user_id: str, edge_type: str, targets):
+    """Subquery id node sumber dari edge bertipe edge_type ke salah satu targets."""
+    return select(models.GraphEdge.source).where(
+        models.GraphEdge.user_id == user_id,
+        models.GraphEdge.edge_type == edge_type,
+        models.GraphEdge.deleted.is_(False),
+        models.GraphEdge.target.in_(targets),
+    )
+
+def publication_query(
+    user_id: str,
+    sdgs: list = None,
+    topics: list = None,
+    institutions: list = None,
+    year_from: int = None,
+    year_to: int = None,
+):
+    """
+    Query publikasi user sesuai filter. Filter SDG dan topik mengikuti edge
+    HAS_TOPIC/MAPS_TO_SDG, filter institusi mengikuti AUTHORED_BY/AFFILIATED_WITH.
+    Semua filter dievaluasi di database.
+    """
+    node = models.GraphNode
+    query = select(node.id, node.node_id).where(
+        node.user_id == user_id,
+        node.node_type == "Publication",
+        node.deleted.is_(False),
+    )
+    if year_from is not None:
+        query = query.where(node.year >= year_from)
+    if year_to is not None:
+        query = query.where(node.year <= year_to)
+    if topics:
+        query = query.where(node.node_id.in_(_edge_sources(user_id, "HAS_TOPIC", topics)))
+    if sdgs:
+        sdg_topics = _edge_sources(user_id, "MAPS_TO_SDG", sdgs)
+        query = query.where(node.node_id.in_(_edge_sources(user_id, "HAS_TOPIC", sdg_topics)))
+    if institutions:
+        inst_authors = _edge_sources(user_id, "AFFILIATED_WITH", institutions)
+        query = query.where(node.node_id.in_(_edge_sources(user_id, "AUTHORED_BY", inst_authors)))
+    return query
+
+def _edges_from(db: Session, user_id: str, sources: list, edge_types: tuple) -> list:
+    rows = []
+    for chunk in _chunks(sources):
+        rows += db.query(
+            models.GraphEdge.source, models.GraphEdge.target, models.GraphEdge.edge_type,
+            models.GraphEdge.payload
+        ).filter(
+            models.GraphEdge.user_id == user_id,
+            models.GraphEdge.source.in_(chunk),
+            models.GraphEdge.edge_type.in_(edge_types),
+            models.GraphEdge.deleted.is_(False),
+        ).order_by(models.GraphEdge.id).all()
+    return rows
+
+def _nodes_by_id(db: Session, user_id: str, node_ids: list, node_types=None) -> list:
+    rows = []
+    for chunk in _chunks(node_ids):
+        query = db.query(
+            models.GraphNode.node_id, models.GraphNode.node_type, models.GraphNode.payload
+        ).filter(
+            models.GraphNode.user_id == user_id,
+            models.GraphNode.node_id.in_(chunk),
+            models.GraphNode.deleted.is_(False),
+        )
+        if node_types:
+            query = query.filter(models.GraphNode.node_type.in_(node_types))
+        rows += query.all()
+    return rows
+
+def _subgraph(db: Session, user_id: str, pub_ids: list, node_types=None) -> dict:
+    """Publikasi beserta penulis, institusi, topik dan SDG yang terhubung dengannya."""
+    pub_edges = _edges_from(db, user_id, pub_ids, ("AUTHORED_BY", "HAS_TOPIC"))
+    author_ids = list(dict.fromkeys(row.target for row in pub_edges if row.edge_type == "AUTHORED_BY"))
+    topic_ids = list(dict.fromkeys(row.target for row in pub_edges if row.edge_type == "HAS_TOPIC"))
+    edge_rows = (
+        pub_edges
+        + _edges_from(db, user_id, author_ids, ("AFFILIATED_WITH",))
+        + _edges_from(db, user_id, topic_ids, ("MAPS_TO_SDG",))
+    )
+
+    node_ids = list(dict.fromkeys(
+        pub_ids + author_ids + topic_ids
+        + [row.target for row in edge_rows if row.edge_type in ("AFFILIATED_WITH", "MAPS_TO_SDG")]
+    ))
+    nodes = [_node_json(row) for row in _nodes_by_id(db, user_id, node_ids, node_types)]
+    kept = {node["id"] for node in nodes}
+    links = [
+        _edge_json(row) for row in edge_rows
+        if row.source in kept and row.target in kept
+    ]
+    return {"nodes": nodes, "links": links}
+
+def read_graph_page(
+    db: Session,
+    user_id: str,
+    limit: int,
+    cursor: int = None,
+    node_types: list = None,
+    **filters,
+) -> dict:
+    """
+    Satu halaman graf: maksimal limit publikasi (urut id, mulai setelah cursor)
+    yang lolos filter beserta tetangganya. next_cursor bernilai None di halaman terakhir.
+    """
+    version = ensure_graph(db, user_id)
+    query = publication_query(user_id, **filters)
+    if cursor is not None:
+        query = query.where(models.GraphNode.id > cursor)
+    rows = db.execute(query.order_by(models.GraphNode.id).limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    page = _subgraph(db, user_id, [row.node_id for row in rows], node_types)
+    return {
+        "version": version,
+        **page,
+        "next_cursor": rows[-1].id if has_more else None,
+    }
+
+def expand_node(
+    db: Session,
+    user_id: str,
+    node_id: str,
+    limit: int,
+    cursor: int = None,
+    node_types: list = None,
+):
+    """
+    Ego-network satu node: node tersebut, edge yang menyentuhnya dan node
+    tetangganya. Untuk node dengan banyak tetangga, edge dipaginasi per limit.
+    Mengembalikan None bila node tidak ada.
+    """
+    version = ensure_graph(db, user_id)
+    center = _nodes_by_id(db, user_id, [node_id])
+    if not center:
+        return None
+
+    edge = models.GraphEdge
+    query = db.query(edge.id, edge.source, edge.target, edge.edge_type, edge.payload).filter(
+        edge.user_id == user_id,
+        edge.deleted.is_(False),
+        (edge.source == node_id) | (edge.target == node_id),
+    )
+    if cursor is not None:
+        query = query.filter(edge.id > cursor)
+    edge_rows = query.order_by(edge.id).limit(limit + 1).all()
+    has_more = len(edge_rows) > limit
+    edge_rows = edge_rows[:limit]
+
+    neighbor_ids = list(dict.fromkeys(
+        row.target if row.source == node_id else row.source for row in edge_rows
+    ))
+    neighbors = _nodes_by_id(db, user_id, neighbor_ids, node_types)
+    kept = {node_id} | {row.node_id for row in neighbors}
+    return {
+        "version": version,
+        "center": node_id,
+        "nodes": [_node_json(row) for row in center + neighbors],
+        "links": [_edge_json(row) for row in edge_rows if row.source in kept and row.target in kept],
+        "next_cursor": edge_rows[-1].id if has_more else None,
+    }
+
+def aggregate_graph(db: Session, user_id: str, **filters) -> dict:
+    """
+    Mode level-of-detail: publikasi diringkas menjadi node agregat per topik
+    dan per SDG dengan jumlah publikasi, dihitung dengan GROUP BY di database.
+    """
+    version = ensure_graph(db, user_id)
+    edge = models.GraphEdge
+    pubs = publication_query(user_id, **filters).with_only_columns(models.GraphNode.node_id)
+
+    has_topic = select(edge.source.label("pub_id"), edge.target.label("topic_id")).where(
+        edge.user_id == user_id,
+        edge.edge_type == "HAS_TOPIC",
+        edge.deleted.is_(False),
+        edge.source.in_(pubs),
+    ).subquery()
+    topic_counts = dict(db.execute(
+        select(has_topic.c.topic_id, func.count(func.distinct(has_topic.c.pub_id)))
+        .group_by(has_topic.c.topic_id)
+    ).all())
+
+    maps_to = select(edge.source, edge.target, edge.payload).where(
+        edge.user_id == user_id,
+        edge.edge_type == "MAPS_TO_SDG",
+        edge.deleted.is_(False),
+    ).subquery()
+    sdg_counts = dict(db.execute(
+        select(maps_to.c.target, func.count(func.distinct(has_topic.c.pub_id)))
+        .join(has_topic, has_topic.c.topic_id == maps_to.c.source)
+        .group_by(maps_to.c.target)
+    ).all())
+    sdg_edges = [
+        row for row in db.execute(select(maps_to.c.source, maps_to.c.target, maps_to.c.payload))
+        if row.source in topic_counts
+    ]
+
+    node_rows = _nodes_by_id(db, user_id, list(topic_counts) + list(sdg_counts))
+    nodes = []
+    for row in node_rows:
+        node = _node_json(row)
+        # Tooltip SDG berisi daftar publikasi sehingga tidak relevan di mode agregat
+        node.pop("tooltip", None)
+        node["aggregate"] = True
+        node["publication_count"] = topic_counts.get(row.node_id) or sdg_counts.get(row.node_id, 0)
+        nodes.append(node)
+
+    return {
+        "version": version,
+        "mode": "aggregate",
+        "nodes": nodes,
+        "links": [
+            {"source": row.source, "target": row.target, "type": "MAPS_TO_SDG", **json.loads(row.payload)}
+            for row in sdg_edges
+        ],
+    }
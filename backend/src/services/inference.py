@@ -0,0 +1,94 @@
+from itertools import chain, repeat
+import numpy as np
+from gensim.matutils import dirichlet_expectation
+from scipy.sparse import coo_matrix, csr_matrix
+from ..config.settings import INFERENCE_CHUNK_SIZE, INFERENCE_MIN_PROBABILITY
+from .preprocessing import preprocess
+
+# Distribusi topik per dokumen dari model yang sudah dilatih, tanpa training
+# ulang. LdaModel.inference menjalankan E-step dokumen demi dokumen di loop
+# Python; di sini update yang sama (alpha, expElogbeta, iterations dan
+# gamma_threshold milik model) dijalankan sekaligus untuk satu chunk lewat
+# matriks sparse dokumen x kata, lalu gamma dinormalisasi per baris.
+# Gamma awal bernilai 1 (rata-rata inisialisasi acak gensim) sehingga hasil
+# satu dokumen selalu sama, tidak bergantung pada chunk atau urutan request.
+
+def doc_term_matrix(lda_model, token_lists: list) -> csr_matrix:
+    """Matriks jumlah kata (dokumen x vocabulary model); token di luar vocabulary diabaikan."""
+    lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=len(token_lists))
+    flat = list(chain.from_iterable(token_lists))
+    terms = np.fromiter(map(lda_model.id2word.token2id.get, flat, repeat(-1)), dtype=np.int64, count=len(flat))
+    docs = np.repeat(np.arange(len(token_lists)), lengths)
+    known = terms >= 0
+    # tocsr menjumlahkan pasangan (dokumen, kata) yang berulang
+    return coo_matrix(
+        (np.ones(int(known.sum()), dtype=lda_model.dtype), (docs[known], terms[known])),
+        shape=(len(token_lists), lda_model.num_terms),
+    ).tocsr()
+
+def infer_gamma(lda_model, counts: csr_matrix) -> np.ndarray:
+    """Variational gamma (dokumen x topik) untuk matriks jumlah kata."""
+    dtype = lda_model.dtype
+    gamma = np.ones((counts.shape[0], lda_model.num_topics), dtype=dtype)
+    if not counts.nnz:
+        return gamma
+    rows = np.repeat(np.arange(counts.shape[0]), np.diff(counts.indptr))
+    exp_elog_beta = np.asarray(lda_model.expElogbeta, dtype=dtype).T
+    # Baris expElogbeta untuk setiap entri non-nol, tetap selama iterasi
+    beta_entries = exp_elog_beta[counts.indices]
+    alpha = np.asarray(lda_model.alpha, dtype=dtype)
+    eps = np.finfo(dtype).eps
+
+    exp_elog_theta = np.exp(dirichlet_expectation(gamma))
+    ratio = counts.copy()
+    for _ in range(lda_model.iterations):
+        phinorm = np.einsum("nk,nk->n", exp_elog_theta[rows], beta_entries) + eps
+        ratio.data = counts.data / phinorm
+        last_gamma = gamma
+        gamma = alpha + exp_elog_theta * (ratio @ exp_elog_beta)
+        exp_elog_theta = np.exp(dirichlet_expectation(gamma))
+        if np.abs(gamma - last_gamma).mean(axis=1).max() < lda_model.gamma_threshold:
+            break
+    return gamma
+
+def infer_distributions(lda_model, counts: csr_matrix) -> np.ndarray:
+    """Matriks (dokumen x topik) float32, setiap baris berjumlah 1."""
+    gamma = infer_gamma(lda_model, counts)
+    return (gamma / gamma.sum(axis=1, keepdims=True)).astype(np.float32)
+
+def iter_inference_lines(
+    lda_model,
+    batches,
+    minimum_probability: float = INFERENCE_MIN_PROBABILITY,
+    top_k: int = None,
+):
+    """
+    batches: iterable (daftar id dokumen, daftar token). Menghasilkan blok
+    NDJSON per batch, satu baris per dokumen: id, jumlah token yang dikenal
+    model, dan pasangan [topic_id, probabilitas] terurut dari yang terbesar.
+    """
+    for ids, token_lists in batches:
+        counts = doc_term_matrix(lda_model, token_lists)
+        distributions = infer_distributions(lda_model, counts)
+        order = np.argsort(-distributions, axis=1, kind="stable")[:, :top_k]
+        ranked = np.take_along_axis(distributions, order, axis=1)
+        known_tokens = np.asarray(counts.sum(axis=1)).ravel().astype(int).tolist()
+        # Baris JSON disusun langsung (id dan angka saja), satu potongan response per chunk
+        yield "".join(
+            '{"id":%d,"tokens":%d,"topics":[%s]}\n' % (
+                doc_id,
+                tokens,
+                ",".join(
+                    f"[{topic},{round(probability, 6)}]"
+                    for topic, probability in zip(topics, probabilities)
+                    if probability >= minimum_probability
+                ),
+            )
+            for doc_id, tokens, topics, probabilities in zip(ids, known_tokens, order.tolist(), ranked.tolist())
+        )
+
+def text_batches(texts: list, chunk_size: int = INFERENCE_CHUNK_SIZE):
+    """Batch (indeks, token) untuk daftar teks mentah dari request."""
+    for start in range(0, len(texts), chunk_size):
+        chunk = texts[start:start + chunk_size]
+        yield list(range(start, start + len(chunk))), preprocess(chunk)
@@ -0,0 +1,131 @@
+import json
+import pandas as pd
+from datetime import datetime
+from sqlalchemy.orm import Session
+from ..config.db import bulk_insert_corpus, bulk_insert_metadata
+from .publication_index import index_publications
+from .dedup import deduplicate_chunk
+
+REQUIRED_TITLE = ["title", "titles"]
+REQUIRED_ABSTRACT = ["abstract", "abstracts", "summaries", "summary"]
+YEAR_COLUMNS = ["year", "publication_year", "pub_year"]
+
+def resolve_columns(columns):
+    """Mencari nama kolom title dan abstract yang dipakai di file upload."""
+    title_col = next((col for col in REQUIRED_TITLE if col in columns), None)
+    abstract_col = next((col for col in REQUIRED_ABSTRACT if col in columns), None)
+    if not title_col or not abstract_col:
+        raise ValueError("Missing required columns")
+    return title_col, abstract_col
+
+def _json_or_empty(value):
+    # Validasi dasar data authors dan topics agar tidak memicu
+    # JSONDecodeError di graph_routes.py
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    try:
+        json.loads(value)
+        return value
+    except (json.JSONDecodeError, TypeError):
+        return "[]"
+
+def clean_frame(df: pd.DataFrame, title_col: str, abstract_col: str) -> pd.DataFrame:
+    """
+    Membersihkan kolom secara vectorized dan mengembalikan DataFrame dengan
+    kolom title, abstract, doi, year, authors, topics. Baris dengan title atau
+    abstract kosong dibuang.
+    """
+    cleaned = pd.DataFrame({
+        "title": df[title_col].fillna("").astype(str).str.strip(),
+        "abstract": df[abstract_col].fillna("").astype(str).str.strip(),
+    })
+
+    if "doi" in df.columns:
+        doi = df["doi"].astype(object)
+        cleaned["doi"] = doi.where(doi.notna(), None)
+    else:
+        cleaned["doi"] = None
+
+    year_col = next((col for col in YEAR_COLUMNS if col in df.columns), None)
+    if year_col:
+        year = pd.to_numeric(df[year_col], errors="coerce").round().astype("Int64")
+        cleaned["year"] = year.astype(object).where(year.notna(), None)
+    else:
+        cleaned["year"] = None
+
+    for col in ("authors", "topics"):
+        cleaned[col] = df[col].map(_json_or_empty) if col in df.columns else "[]"
+
+    return cleaned[(cleaned["title"] != "") & (cleaned["abstract"] != "")]
+
+def ingest_batches(
+    db: Session,
+    batches,
+    file_id: int,
+    user_id: str,
+    file_name: str,
+    file_size: int,
+    file_type: str,
+    blob_sha256: str,
+    on_stage=None,
+) -> tuple:
+    """
+    Menulis baris Corpus dan Metadata per batch (DataFrame hasil clean_frame)
+    dengan executemany, setelah baris yang isinya sudah ada dibuang lewat
+    index deduplikasi. Batch dibaca satu per satu dari iterable sehingga file
+    upload tidak pernah dimuat utuh. Tidak melakukan commit; pemanggil
+    meng-commit sekali di akhir sehingga seluruh upload berjalan dalam satu
+    transaksi. on_stage(stage) dipanggil saat tahap dedup dan insert setiap
+    batch dimulai. Mengembalikan (jumlah baris ditulis, jumlah duplikat).
+    """
+    date_uploaded = datetime.utcnow()
+    inserted = 0
+    duplicates = 0
+
+    for batch in batches:
+        if on_stage:
+            on_stage("dedup")
+        chunk, chunk_duplicates = deduplicate_chunk(db, batch, file_id)
+        duplicates += chunk_duplicates
+        inserted += len(chunk)
+        if chunk.empty:
+            continue
+        if on_stage:
+            on_stage("insert")
+
+        bulk_insert_metadata(db, [
+            {"file_id": file_id, "title": title, "abstract": abstract}
+            for title, abstract in zip(chunk["title"].tolist(), chunk["abstract"].tolist())
+        ])
+
+        authors_list = chunk["authors"].tolist()
+        topics_list = chunk["topics"].tolist()
+        corpus_ids = bulk_insert_corpus(db, [
+            {
+                "uploaded_by": user_id,
+                "file_id": file_id,
+                "file_name": file_name,
+                "file_size": file_size,
+                "file_type": file_type,
+                "date_uploaded": date_uploaded,
+                "blob_sha256": blob_sha256,
+                "title": title,
+                "abstract": abstract,
+                "doi": doi,
+                "year": year,
+                "authors": authors,
+                "topics": topics,
+            }
+            for title, abstract, doi, year, authors, topics in zip(
+                chunk["title"].tolist(),
+                chunk["abstract"].tolist(),
+                chunk["doi"].tolist(),
+                chunk["year"].tolist(),
+                authors_list,
+                topics_list,
+            )
+        ])
+        # Indeks topik dan penulis/institusi untuk statistik dashboard
+        index_publications(db, user_id, corpus_ids, authors_list, topics_list)
+
+    return inserted, duplicates
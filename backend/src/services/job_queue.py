@@ -0,0 +1,413 @@
+import os
+import shutil
+import socket
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import delete, update
+from sqlalchemy.orm import Session
+from ..config import models
+from ..config.models import SessionLocal, QUEUED, RUNNING, DONE, FAILED, CANCELLED, FINISHED_STATES
+from ..config.settings import ANALYSIS_WORKERS, JOB_HEARTBEAT_SECONDS, JOB_STALE_SECONDS
+from .model_handler import run_lda_analysis, resolve_training_config, compute_coherence
+from .preprocessing import load_processed_texts
+from .graph_store import refresh_sdg_layer
+from .response_cache import bump_data_version
+from .model_registry import register_model, get_model_record, load_model_for_update, evict_model
+from .progress_bus import publish, job_channel
+from .topic_matrices import save_topic_matrices, open_topic_matrices
+from .sdg_mapping import map_model_topics
+
+# Antrean analisis LDA di background. Tabel analysis_jobs menjadi antrean
+# persisten; ProcessPoolExecutor menjalankan job di beberapa core sehingga
+# request HTTP langsung kembali dengan job id.
+
+_executor = None
+
+class JobCancelled(Exception):
+    pass
+
+def _init_worker():
+    # Koneksi database hasil fork dari proses induk tidak boleh dipakai ulang
+    models.engine.dispose(close=False)
+    models.progress_engine.dispose(close=False)
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=ANALYSIS_WORKERS, initializer=_init_worker)
+    return _executor
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+def submit_job(job_id: int):
+    get_executor().submit(run_analysis_job, job_id)
+
+def enqueue_analysis(
+    db: Session,
+    user_id: str,
+    file_id: int,
+    num_topics: int,
+    iteration: int,
+    options: dict = None
+) -> models.AnalysisJob:
+    """Mencatat job baru dengan status queued lalu mengirimkannya ke worker pool."""
+    job = models.AnalysisJob(
+        file_id=file_id,
+        user_id=user_id,
+        num_topics=num_topics,
+        iteration=iteration,
+        options=options or {},
+        status=QUEUED,
+        stage=QUEUED,
+        progress=0,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    publish(job_channel(job.id), QUEUED, 0, status=QUEUED, user_id=user_id)
+    submit_job(job.id)
+    return job
+
+def cancel_job(db: Session, job: models.AnalysisJob) -> bool:
+    """
+    Menandai job sebagai cancelled. Job yang masih queued tidak akan dijalankan;
+    job yang sedang running berhenti di batas tahap berikutnya.
+    """
+    if job.status in FINISHED_STATES:
+        return False
+    job.status = CANCELLED
+    job.date_finished = datetime.now()
+    db.commit()
+    publish(job_channel(job.id), job.stage, job.progress, status=CANCELLED, user_id=job.user_id)
+    return True
+
+def _worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def _worker_alive(worker: str) -> bool:
+    """Proses pemilik job masih hidup? Hanya bisa dicek untuk host yang sama."""
+    host, _, pid = (worker or "").rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _interrupted(job: models.AnalysisJob, now: datetime) -> bool:
+    # Worker uvicorn lain bisa sedang menjalankan job ini; hanya job yang
+    # pemiliknya mati atau heartbeat-nya berhenti yang dianggap terputus
+    if job.heartbeat_at is None or job.heartbeat_at < now - timedelta(seconds=JOB_STALE_SECONDS):
+        return True
+    return not _worker_alive(job.worker)
+
+def resume_pending_jobs():
+    """
+    Dipanggil saat startup setiap worker server. Job running yang tertinggal
+    (proses pemiliknya mati atau heartbeat-nya berhenti) ditandai failed agar
+    stream progresnya selesai; job queued dikirim ulang ke worker pool.
+    """
+    db = SessionLocal()
+    try:
+        now = datetime.now()
+        running = db.query(models.AnalysisJob).filter(models.AnalysisJob.status == RUNNING).all()
+        stale = []
+        for job in running:
+            if not _interrupted(job, now):
+                continue
+            # Bersyarat pada heartbeat yang dibaca agar job yang baru saja berdenyut tidak ikut gagal
+            failed = db.execute(
+                update(models.AnalysisJob)
+                .where(
+                    models.AnalysisJob.id == job.id,
+                    models.AnalysisJob.status == RUNNING,
+                    models.AnalysisJob.heartbeat_at.is_(None) if job.heartbeat_at is None
+                    else models.AnalysisJob.heartbeat_at == job.heartbeat_at,
+                )
+                .values(status=FAILED, error="Analysis interrupted by server restart", date_finished=now)
+            ).rowcount
+            if failed:
+                stale.append(job)
+        db.commit()
+        for job in stale:
+            publish(
+                job_channel(job.id), job.stage, job.progress,
+                status=FAILED, message="Analysis interrupted by server restart", user_id=job.user_id,
+            )
+        job_ids = [row.id for row in db.query(models.AnalysisJob.id).filter(models.AnalysisJob.status == QUEUED)]
+    finally:
+        db.close()
+    for job_id in job_ids:
+        submit_job(job_id)
+    return len(job_ids)
+
+def _start_heartbeat(job_id: int) -> threading.Event:
+    """Memperbarui heartbeat_at job dari thread terpisah sampai event yang dikembalikan di-set."""
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(JOB_HEARTBEAT_SECONDS):
+            db = SessionLocal()
+            try:
+                db.execute(
+                    update(models.AnalysisJob)
+                    .where(models.AnalysisJob.id == job_id, models.AnalysisJob.status == RUNNING)
+                    .values(heartbeat_at=datetime.now())
+                )
+                db.commit()
+            except Exception as e:
+                print(f"Heartbeat for analysis job {job_id} failed: {e}")
+            finally:
+                db.close()
+
+    threading.Thread(target=beat, name=f"job-{job_id}-heartbeat", daemon=True).start()
+    return stop
+
+def _set_progress(db: Session, job_id: int, stage: str, progress: float):
+    status = db.query(models.AnalysisJob.status).filter(models.AnalysisJob.id == job_id).scalar()
+    if status == CANCELLED:
+        raise JobCancelled()
+    db.execute(
+        update(models.AnalysisJob)
+        .where(models.AnalysisJob.id == job_id)
+        .values(stage=stage, progress=progress)
+    )
+    db.commit()
+    publish(job_channel(job_id), stage, progress)
+
+def _discard_model(db: Session, registered: dict):
+    """
+    Menghapus model dari job yang batal/gagal dari registry (dipanggil setelah
+    rollback). Baris TrainedModel bisa sudah ter-commit oleh _set_progress
+    sebelum job selesai, jadi dihapus dalam transaksi baru beserta filenya.
+    """
+    model_id = registered.get("model_id")
+    if model_id is not None:
+        db.execute(delete(models.TrainedModel).where(models.TrainedModel.id == model_id))
+        db.commit()
+        evict_model(model_id)
+    if registered.get("path"):
+        shutil.rmtree(registered["path"], ignore_errors=True)
+
+def _fill_deferred_coherence(db: Session, result_id: int, user_id: str, lda_model, processed_texts):
+    try:
+        coherence = compute_coherence(lda_model, processed_texts, None, lda_model.id2word, mode="c_v")
+    except Exception as e:
+        print(f"Deferred coherence for analysis result {result_id} failed: {e}")
+        return
+    db.execute(
+        update(models.AnalysisResult)
+        .where(models.AnalysisResult.id == result_id)
+        .values(
+            coherence=coherence["value"],
+            coherence_mode=coherence["mode"],
+            coherence_seconds=coherence["seconds"]
+        )
+    )
+    bump_data_version(db, user_id)
+    db.commit()
+
+def run_analysis_job(job_id: int):
+    """Dijalankan di proses worker: melatih LDA dan menyimpan hasilnya."""
+    db = SessionLocal()
+    registered = {}
+    heartbeat = None
+    try:
+        # Klaim job secara atomik agar satu job tidak dijalankan dua kali
+        now = datetime.now()
+        claimed = db.execute(
+            update(models.AnalysisJob)
+            .where(models.AnalysisJob.id == job_id, models.AnalysisJob.status == QUEUED)
+            .values(status=RUNNING, stage="loading", date_started=now, worker=_worker_name(), heartbeat_at=now)
+        ).rowcount
+        db.commit()
+        if not claimed:
+            return
+        heartbeat = _start_heartbeat(job_id)
+        publish(job_channel(job_id), "loading", 0)
+
+        job = db.get(models.AnalysisJob, job_id)
+        file = db.get(models.FilesUploaded, job.file_id)
+
+        # Token title + abstract per baris metadata, diambil dari cache bila ada
+        _set_progress(db, job_id, "preprocessing", 5)
+        processed_texts = load_processed_texts(db, job.file_id)
+        if not processed_texts:
+            raise ValueError("No metadata found for file")
+        db.commit()
+        options = job.options or {}
+        training_config = resolve_training_config(**options.get("training", {}))
+
+        # Update incremental: lanjutkan model yang sudah ada dengan dokumen file baru
+        update_options = options.get("update")
+        base_model, base_record = None, None
+        if update_options:
+            base_record = get_model_record(db, update_options["model_id"], job.user_id)
+            if base_record is None:
+                raise ValueError("Base model not found")
+            base_model = load_model_for_update(base_record)
+
+        hyperparameters = {"iteration": job.iteration, **training_config}
+        if base_record is not None:
+            hyperparameters = {
+                **(base_record.hyperparameters or {}),
+                "updated_with_file_id": job.file_id,
+                "vocab_policy": update_options.get("vocab_policy"),
+            }
+
+        # Model hasil training dicatat di registry per file/user
+        def on_trained(lda_model):
+            registered["lda"] = lda_model
+            registered["model"] = register_model(
+                db,
+                lda_model,
+                file_id=job.file_id,
+                user_id=job.user_id,
+                num_topics=lda_model.num_topics,
+                hyperparameters=hyperparameters,
+                parent_id=base_record.id if base_record is not None else None,
+            )
+            # Disimpan terpisah: atribut record tidak bisa dibaca setelah rollback
+            registered["model_id"] = registered["model"].id
+            registered["path"] = registered["model"].path
+
+        coherence_options = options.get("coherence", {})
+
+        # Jalankan LDA
+        topic_result, coherence = run_lda_analysis(
+            None,
+            job.num_topics,
+            job.iteration,
+            on_progress=lambda stage, progress: _set_progress(db, job_id, stage, progress),
+            training_config=training_config,
+            processed_texts=processed_texts,
+            retrain=base_model is None,
+            model=base_model,
+            update=base_model is not None,
+            vocab_policy=update_options.get("vocab_policy") if update_options else None,
+            on_trained=on_trained,
+            coherence_mode=coherence_options.get("mode"),
+            coherence_sample_size=coherence_options.get("sample_size")
+        )
+
+        # Matriks dokumen x topik dan topik x kata disimpan di samping file model
+        matrix_path = None
+        if "model" in registered:
+            _set_progress(db, job_id, "matrices", 90)
+            doc_ids = [row.id for row in db.query(models.Metadata.id).filter(
+                models.Metadata.file_id == job.file_id
+            ).order_by(models.Metadata.id)]
+            matrix_path = save_topic_matrices(registered["lda"], registered["model"].path, doc_ids, processed_texts)
+            # Pemetaan SDG ditulis dalam transaksi yang sama dengan hasil analisis
+            map_model_topics(
+                db, registered["model"], registered["lda"],
+                topic_word=open_topic_matrices(matrix_path)["topic_word"],
+            )
+
+        # AnalysisBaseFile beserta konfigurasi training yang dipakai ditulis
+        # dalam transaksi yang sama dengan status done, sehingga job yang
+        # gagal/batal tidak meninggalkan baris
+        db.add(models.AnalysisBaseFile(
+            file_id=job.file_id,
+            num_topics=job.num_topics,
+            iteration=job.iteration,
+            date_analyzed=job.date_started,
+            **training_config
+        ))
+
+        # Simpan hasil ke AnalysisResult
+        result = models.AnalysisResult(
+            file_id=job.file_id,
+            file_name=file.file_name,
+            coherence=coherence["value"],
+            coherence_mode=coherence["mode"],
+            coherence_seconds=coherence["seconds"],
+            coherence_ci=coherence["ci"],
+            coherence_sample_size=coherence["sample_size"],
+            topic_count=registered["lda"].num_topics if registered else job.num_topics,
+            topic_result=topic_result,
+            model_id=registered["model"].id if registered else None,
+            matrix_path=matrix_path,
+        )
+        db.add(result)
+        db.flush()
+
+        done = db.execute(
+            update(models.AnalysisJob)
+            .where(models.AnalysisJob.id == job_id, models.AnalysisJob.status == RUNNING)
+            .values(status=DONE, stage=DONE, progress=100, result_id=result.id, date_finished=datetime.now())
+        ).rowcount
+        if not done:
+            raise JobCancelled()
+        bump_data_version(db, job.user_id)
+        db.commit()
+        # Model sudah menjadi bagian hasil job yang selesai, tidak lagi dibuang
+        registered.pop("model_id", None)
+        registered.pop("path", None)
+        publish(job_channel(job_id), DONE, 100, status=DONE)
+
+        # Lapisan SDG pada graf user mengikuti pemetaan topik terbaru
+        try:
+            refresh_sdg_layer(db, job.user_id)
+            bump_data_version(db, job.user_id)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Graph refresh after analysis job {job_id} failed: {e}")
+
+        # Mode deferred: job sudah selesai bagi klien, c_v eksak dihitung sesudahnya
+        if coherence["mode"] == "deferred" and "lda" in registered:
+            _fill_deferred_coherence(db, result.id, job.user_id, registered["lda"], processed_texts)
+    except JobCancelled:
+        db.rollback()
+        _discard_model(db, registered)
+    except Exception as e:
+        db.rollback()
+        _discard_model(db, registered)
+        db.execute(
+            update(models.AnalysisJob)
+            .where(models.AnalysisJob.id == job_id)
+            .values(status=FAILED, error=str(e), date_finished=datetime.now())
+        )
+        db.commit()
+        publish(job_channel(job_id), FAILED, None, status=FAILED, message=str(e))
+    finally:
+        if heartbeat is not None:
+            heartbeat.set()
+        db.close()
+
+def serialize_job(db: Session, job: models.AnalysisJob) -> dict:
+    data = {
+        "job_id": job.id,
+        # Id AnalysisResult untuk /analysis/{analysis_id}/..., terisi setelah job selesai
+        "analysis_id": job.result_id,
+        "file_id": job.file_id,
+        "status": job.status,
+        "stage": job.stage,
+        "progress": job.progress,
+        "message": job.error,
+        "date_created": job.date_created,
+        "date_started": job.date_started,
+        "date_finished": job.date_finished,
+    }
+    if job.status == DONE and job.result_id:
+        result = db.get(models.AnalysisResult, job.result_id)
+        if result:
+            data["results"] = {
+                "file_name": result.file_name,
+                "coherence": result.coherence,
+                "coherence_mode": result.coherence_mode,
+                "coherence_seconds": result.coherence_seconds,
+                "coherence_ci": result.coherence_ci,
+                "topic_count": result.topic_count,
+                "topics": result.topic_result,
+            }
+    return data
@@ -1,24 +1,25 @@
 import pickle
+import random
+import statistics
+import time
+import numpy as np
+from collections import Counter
 from gensim import corpora, models
 from gensim.models.coherencemodel import CoherenceModel
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-import nltk
 import os
-nltk.download("punkt")
-nltk.download("punkt_tab")
-nltk.download("stopwords")
+from scipy import stats
+from ..config.settings import (
+    LDA_ENGINE, LDA_WORKERS, LDA_CHUNKSIZE, LDA_UPDATE_MODE,
+    COHERENCE_MODE, COHERENCE_SAMPLE_SIZE, COHERENCE_SAMPLE_REPLICATES,
+    INCREMENTAL_VOCAB_POLICY, VOCAB_MIN_DF, VOCAB_MAX_NEW_TERMS
+)
+from .preprocessing import preprocess
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODEL_PATH = os.path.join(BASE_DIR, "LDAModels50.pkl")
 
-def preprocess(texts):
-    stop_words = set(stopwords.words("english"))
-    return [
-        [word for word in word_tokenize(doc.lower()) if word.isalpha() and word not in stop_words]
-        for doc in texts
-    ]
-
+# Model global lama (sebelum ada registry), hanya dipakai sebagai fallback
+# bila retrain=False tanpa model dari registry.
 def load_model():
     if not os.path.exists(MODEL_PATH):
         raise FileNotFoundError(f"Model LDA belum dilatih di {MODEL_PATH}.")
@@ -26,40 +27,222 @@ def load_model():
         data = pickle.load(f)
         return data["model"], data["dictionary"], data["corpus"]
 
-def save_model(lda_model, dictionary, corpus):
-    with open(MODEL_PATH, "wb") as f:
-        pickle.dump({
-            "model": lda_model,
-            "dictionary": dictionary,
-            "corpus": corpus
-        }, f)
+LDA_ENGINES = ("single", "multicore")
+LDA_UPDATE_MODES = ("online", "batch")
 
-def run_lda_analysis(texts, num_topics=10, iterations=50, retrain=True):
-    processed_texts = preprocess(texts)
+def resolve_training_config(engine=None, workers=None, chunksize=None, update_mode=None):
+    """Menggabungkan opsi training dari request dengan default konfigurasi server."""
+    config = {
+        "engine": engine or LDA_ENGINE,
+        "workers": workers or LDA_WORKERS,
+        "chunksize": chunksize or LDA_CHUNKSIZE,
+        "update_mode": update_mode or LDA_UPDATE_MODE,
+    }
+    if config["engine"] not in LDA_ENGINES:
+        raise ValueError(f"Unknown LDA engine: {config['engine']}")
+    if config["update_mode"] not in LDA_UPDATE_MODES:
+        raise ValueError(f"Unknown LDA update mode: {config['update_mode']}")
+    if config["engine"] == "single":
+        config["workers"] = 1
+    return config
 
-    if not retrain:
-        lda_model, dictionary, _ = load_model()
-        corpus = [dictionary.doc2bow(text) for text in processed_texts]
-    else:
-        dictionary = corpora.Dictionary(processed_texts)
-        corpus = [dictionary.doc2bow(text) for text in processed_texts]
-        lda_model = models.LdaModel(
+def train_lda(corpus, dictionary, num_topics, iterations, training_config):
+    batch = training_config["update_mode"] == "batch"
+    if training_config["engine"] == "multicore":
+        return models.LdaMulticore(
             corpus=corpus,
             id2word=dictionary,
             num_topics=num_topics,
             iterations=iterations,
             passes=10,
+            workers=training_config["workers"],
+            chunksize=training_config["chunksize"],
+            batch=batch,
             random_state=42,
         )
-        save_model(lda_model, dictionary, corpus)
+    return models.LdaModel(
+        corpus=corpus,
+        id2word=dictionary,
+        num_topics=num_topics,
+        iterations=iterations,
+        passes=10,
+        chunksize=training_config["chunksize"],
+        # update_every=0 berarti batch LDA, 1 berarti online LDA
+        update_every=0 if batch else 1,
+        random_state=42,
+    )
+
+VOCAB_POLICIES = ("grow", "fixed")
 
-    coherence_model = CoherenceModel(
+def grow_vocabulary(lda_model, new_texts, min_df=VOCAB_MIN_DF, max_new_terms=VOCAB_MAX_NEW_TERMS):
+    """
+    Menambahkan kata baru (df >= min_df, maksimal max_new_terms kata paling
+    sering) ke dictionary model lalu memperlebar matriks topik-kata. Kata
+    baru mendapat prior eta rata-rata dan sstats nol. Mengembalikan jumlah
+    kata yang ditambahkan.
+    """
+    dictionary = lda_model.id2word
+    new_dfs = Counter(
+        token for doc in new_texts for token in set(doc) if token not in dictionary.token2id
+    )
+    allowed = {token for token, df in new_dfs.most_common(max_new_terms) if df >= min_df}
+    if not allowed:
+        return 0
+
+    dictionary.add_documents([
+        [token for token in doc if token in allowed or token in dictionary.token2id]
+        for doc in new_texts
+    ])
+    extra = len(dictionary) - lda_model.num_terms
+    if extra <= 0:
+        return 0
+
+    state = lda_model.state
+    lda_model.eta = np.concatenate([
+        lda_model.eta, np.full(extra, lda_model.eta.mean(), dtype=lda_model.eta.dtype)
+    ])
+    state.eta = lda_model.eta
+    state.sstats = np.hstack([
+        state.sstats, np.zeros((lda_model.num_topics, extra), dtype=state.sstats.dtype)
+    ])
+    lda_model.num_terms = len(dictionary)
+    lda_model.sync_state()
+    return extra
+
+def update_lda(lda_model, new_texts, vocab_policy=None):
+    """Update online model yang sudah ada dengan dokumen baru (tanpa retrain penuh)."""
+    vocab_policy = vocab_policy or INCREMENTAL_VOCAB_POLICY
+    if vocab_policy not in VOCAB_POLICIES:
+        raise ValueError(f"Unknown vocabulary policy: {vocab_policy}")
+    if vocab_policy == "grow":
+        grow_vocabulary(lda_model, new_texts)
+    corpus = [lda_model.id2word.doc2bow(text) for text in new_texts]
+    lda_model.update(corpus)
+    return corpus
+
+COHERENCE_MODES = ("c_v", "u_mass", "c_v_sample", "deferred")
+
+def _c_v(lda_model, texts, dictionary):
+    return CoherenceModel(
         model=lda_model,
-        texts=processed_texts,
+        texts=texts,
         dictionary=dictionary,
         coherence='c_v'
+    ).get_coherence()
+
+def compute_coherence(
+    lda_model,
+    processed_texts,
+    corpus,
+    dictionary,
+    mode=None,
+    sample_size=None,
+    replicates=COHERENCE_SAMPLE_REPLICATES
+):
+    """
+    Menghitung coherence sesuai mode:
+    - c_v: sliding window pada seluruh teks (paling lambat, eksak)
+    - u_mass: dari corpus BoW yang sudah ada (cepat)
+    - c_v_sample: c_v pada beberapa sampel acak dokumen, dengan interval kepercayaan 95%
+    - deferred: tidak dihitung sekarang (value None), diisi belakangan
+    Mengembalikan dict berisi value, mode, seconds, ci dan sample_size.
+    """
+    mode = mode or COHERENCE_MODE
+    if mode not in COHERENCE_MODES:
+        raise ValueError(f"Unknown coherence mode: {mode}")
+
+    started = time.perf_counter()
+    info = {"mode": mode, "value": None, "ci": None, "sample_size": None}
+
+    if mode == "c_v":
+        info["value"] = _c_v(lda_model, processed_texts, dictionary)
+    elif mode == "u_mass":
+        info["value"] = CoherenceModel(
+            model=lda_model,
+            corpus=corpus,
+            dictionary=dictionary,
+            coherence='u_mass'
+        ).get_coherence()
+    elif mode == "c_v_sample":
+        sample_size = sample_size or COHERENCE_SAMPLE_SIZE
+        if len(processed_texts) <= sample_size:
+            value = _c_v(lda_model, processed_texts, dictionary)
+            info.update(value=value, ci=[value, value], sample_size=len(processed_texts))
+        else:
+            rng = random.Random(42)
+            scores = [
+                _c_v(lda_model, rng.sample(processed_texts, sample_size), dictionary)
+                for _ in range(max(replicates, 2))
+            ]
+            value = statistics.mean(scores)
+            margin = stats.t.ppf(0.975, len(scores) - 1) * statistics.stdev(scores) / len(scores) ** 0.5
+            info.update(value=value, ci=[value - margin, value + margin], sample_size=sample_size)
+
+    info["seconds"] = time.perf_counter() - started
+    return info
+
+def run_lda_analysis(
+    texts,
+    num_topics=10,
+    iterations=50,
+    retrain=True,
+    on_progress=None,
+    training_config=None,
+    processed_texts=None,
+    model=None,
+    on_trained=None,
+    coherence_mode=None,
+    coherence_sample_size=None,
+    update=False,
+    vocab_policy=None
+):
+    # on_progress(stage, persen) dipanggil di awal setiap tahap analisis
+    report = on_progress or (lambda stage, progress: None)
+
+    # processed_texts dapat diberikan dari cache token sehingga tokenisasi dilewati
+    if processed_texts is None:
+        report("preprocessing", 5)
+        processed_texts = preprocess(texts)
+
+    report("training", 20)
+    if not retrain:
+        # model berasal dari registry; fallback ke model global lama
+        if model is not None:
+            lda_model, dictionary = model, model.id2word
+        else:
+            lda_model, dictionary, _ = load_model()
+
+        if update and model is not None:
+            # Update incremental: model lama dilanjutkan dengan dokumen baru
+            corpus = update_lda(lda_model, processed_texts, vocab_policy)
+            if on_trained:
+                on_trained(lda_model)
+        else:
+            corpus = [dictionary.doc2bow(text) for text in processed_texts]
+    else:
+        dictionary = corpora.Dictionary(processed_texts)
+        corpus = [dictionary.doc2bow(text) for text in processed_texts]
+        lda_model = train_lda(
+            corpus,
+            dictionary,
+            num_topics,
+            iterations,
+            training_config or resolve_training_config(),
+        )
+        # Penyimpanan model diserahkan ke pemanggil (registry model)
+        if on_trained:
+            on_trained(lda_model)
+
+    report("coherence", 70)
+    # coherence berupa dict (value, mode, seconds, ci, sample_size)
+    coherence = compute_coherence(
+        lda_model,
+        processed_texts,
+        corpus,
+        dictionary,
+        mode=coherence_mode,
+        sample_size=coherence_sample_size
     )
-    coherence = coherence_model.get_coherence()
 
     topics = lda_model.print_topics(num_topics=num_topics)
     result = [f"Topic {i + 1}: {t}" for i, t in enumerate([x[1] for x in topics])]
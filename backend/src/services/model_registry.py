@@ -0,0 +1,117 @@
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from gensim import models as gensim_models
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from ..config import models
+from ..config.settings import MODEL_DIR, MODEL_CACHE_SIZE
+
+# Registry model LDA. Setiap model hasil training disimpan per user/file/id
+# dengan format native gensim; expElogbeta dan sstats disimpan sebagai .npy
+# terpisah sehingga dapat dibuka dengan mmap='r' tanpa memuat corpus training.
+
+MODEL_FILE = "lda"
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def model_dir(user_id: str, file_id: int, model_id: int) -> Path:
+    return Path(MODEL_DIR) / user_id / str(file_id) / str(model_id)
+
+def save_model_files(lda_model, path: Path):
+    path.mkdir(parents=True, exist_ok=True)
+    fname = str(path / MODEL_FILE)
+    lda_model.save(fname, separately=["expElogbeta"])
+    # LdaModel.save tidak meneruskan 'separately' ke state, simpan ulang agar sstats bisa di-mmap
+    lda_model.state.save(f"{fname}.state", separately=["sstats"])
+
+def register_model(
+    db: Session,
+    lda_model,
+    file_id: int,
+    user_id: str,
+    num_topics: int,
+    hyperparameters: dict = None,
+    parent_id: int = None
+) -> models.TrainedModel:
+    """Mencatat model baru di registry dan menyimpan filenya (tanpa commit)."""
+    version = (db.query(func.max(models.TrainedModel.version)).filter(
+        models.TrainedModel.file_id == file_id
+    ).scalar() or 0) + 1
+    record = models.TrainedModel(
+        file_id=file_id,
+        user_id=user_id,
+        version=version,
+        num_topics=num_topics,
+        hyperparameters=hyperparameters or {},
+        parent_id=parent_id,
+    )
+    db.add(record)
+    db.flush()
+
+    path = model_dir(user_id, file_id, record.id)
+    try:
+        save_model_files(lda_model, path)
+    except Exception:
+        shutil.rmtree(path, ignore_errors=True)
+        raise
+    record.path = str(path)
+    db.flush()
+    return record
+
+def _cache_put(model_id: int, lda_model):
+    with _cache_lock:
+        _cache[model_id] = lda_model
+        _cache.move_to_end(model_id)
+        while len(_cache) > MODEL_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+def evict_model(model_id: int):
+    with _cache_lock:
+        _cache.pop(model_id, None)
+
+def load_model(record: models.TrainedModel, mmap: str = "r"):
+    """
+    Memuat model dari registry. Model yang sering dipakai disimpan di LRU;
+    array besar dibuka dengan mmap sehingga load hanya butuh milidetik.
+    Dictionary tersedia di lda_model.id2word.
+    """
+    with _cache_lock:
+        lda_model = _cache.get(record.id)
+        if lda_model is not None:
+            _cache.move_to_end(record.id)
+            return lda_model
+
+    if not record.path:
+        raise FileNotFoundError(f"Model {record.id} belum memiliki file tersimpan.")
+    lda_model = gensim_models.LdaModel.load(str(Path(record.path) / MODEL_FILE), mmap=mmap)
+    _cache_put(record.id, lda_model)
+    return lda_model
+
+def load_model_for_update(record: models.TrainedModel):
+    """
+    Memuat salinan model yang dapat diubah (tanpa mmap dan di luar cache)
+    untuk update incremental; versi lama di registry tetap utuh.
+    """
+    if not record.path:
+        raise FileNotFoundError(f"Model {record.id} belum memiliki file tersimpan.")
+    return gensim_models.LdaModel.load(str(Path(record.path) / MODEL_FILE))
+
+def get_model_record(db: Session, model_id: int, user_id: str = None) -> models.TrainedModel:
+    query = db.query(models.TrainedModel).filter(models.TrainedModel.id == model_id)
+    if user_id is not None:
+        query = query.filter(models.TrainedModel.user_id == user_id)
+    return query.first()
+
+def latest_model_record(db: Session, file_id: int, user_id: str = None) -> models.TrainedModel:
+    query = db.query(models.TrainedModel).filter(models.TrainedModel.file_id == file_id)
+    if user_id is not None:
+        query = query.filter(models.TrainedModel.user_id == user_id)
+    return query.order_by(models.TrainedModel.id.desc()).first()
+
+def latest_user_model(db: Session, user_id: str) -> models.TrainedModel:
+    return db.query(models.TrainedModel).filter(
+        models.TrainedModel.user_id == user_id
+    ).order_by(models.TrainedModel.id.desc()).first()
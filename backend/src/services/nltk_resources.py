@@ -0,0 +1,119 @@
+import os
+import sys
+import threading
+from functools import lru_cache
+from pathlib import Path
+from ..config.settings import NLTK_DATA_DIR, PREPROCESS_TOKENIZER
+
+# Pengelola data NLTK. Data dibaca dari direktori lokal (NLTK_DATA_DIR) atau
+# lokasi standar NLTK dan tidak pernah di-download saat runtime; modul nltk sendiri baru di-import
+# ketika tokenizer/stopwords pertama kali dipakai sehingga start worker cepat.
+
+# Nama resource -> path relatif di dalam direktori data NLTK
+RESOURCES = {
+    "punkt": "tokenizers/punkt",
+    "punkt_tab": "tokenizers/punkt_tab",
+    "stopwords": "corpora/stopwords",
+}
+
+STOPWORDS_LANGUAGE = "english"
+
+_configure_lock = threading.Lock()
+_configured = False
+
+def _default_dirs() -> list:
+    # Salinan urutan nltk.data.path bawaan (~/nltk_data, sys.prefix, /usr/...)
+    # agar pemeriksaan saat startup tidak perlu import nltk
+    dirs = []
+    if "APPENGINE_RUNTIME" not in os.environ and os.path.expanduser("~/") != "~/":
+        dirs.append(os.path.expanduser("~/nltk_data"))
+    dirs += [
+        os.path.join(sys.prefix, "nltk_data"),
+        os.path.join(sys.prefix, "share", "nltk_data"),
+        os.path.join(sys.prefix, "lib", "nltk_data"),
+    ]
+    if sys.platform.startswith("win"):
+        dirs += [
+            os.path.join(os.environ.get("APPDATA", "C:\\"), "nltk_data"),
+            r"C:\nltk_data", r"D:\nltk_data", r"E:\nltk_data",
+        ]
+    else:
+        dirs += ["/usr/share/nltk_data", "/usr/local/share/nltk_data", "/usr/lib/nltk_data", "/usr/local/lib/nltk_data"]
+    return dirs
+
+def data_dirs() -> list:
+    """
+    Direktori yang dicari: NLTK_DATA_DIR, env NLTK_DATA, lalu lokasi bawaan
+    NLTK (~/nltk_data, /usr/share/nltk_data, ...), tanpa duplikat.
+    """
+    dirs = [NLTK_DATA_DIR]
+    dirs += [p for p in os.getenv("NLTK_DATA", "").split(os.pathsep) if p]
+    dirs += _default_dirs()
+    return [Path(p) for p in dict.fromkeys(dirs)]
+
+def required_resources(tokenizer: str = PREPROCESS_TOKENIZER) -> list:
+    # Tokenizer regex hanya butuh stopwords; punkt hanya untuk word_tokenize
+    if tokenizer == "nltk":
+        return ["stopwords", "punkt", "punkt_tab"]
+    return ["stopwords"]
+
+def find_resource(name: str):
+    """Mengembalikan path resource (folder atau .zip) atau None bila tidak ada."""
+    relative = RESOURCES[name]
+    for directory in data_dirs():
+        for candidate in (directory / relative, directory / f"{relative}.zip"):
+            if candidate.exists():
+                return candidate
+    return None
+
+def missing_resources(tokenizer: str = PREPROCESS_TOKENIZER) -> list:
+    return [name for name in required_resources(tokenizer) if find_resource(name) is None]
+
+def verify_resources(tokenizer: str = PREPROCESS_TOKENIZER):
+    """Dipanggil sekali saat startup; hanya memeriksa file, tanpa import nltk."""
+    missing = missing_resources(tokenizer)
+    if missing:
+        raise RuntimeError(
+            f"NLTK data not found in {', '.join(str(d) for d in data_dirs())}: "
+            f"{', '.join(missing)}. Run 'python prefetch_nltk.py' to download it."
+        )
+
+def _configure_nltk():
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return
+        import nltk
+        for directory in reversed(data_dirs()):
+            if str(directory) not in nltk.data.path:
+                nltk.data.path.insert(0, str(directory))
+        _configured = True
+
+@lru_cache(maxsize=None)
+def get_stop_words(language: str = STOPWORDS_LANGUAGE) -> frozenset:
+    # File stopwords yang sudah diekstrak dibaca langsung tanpa import nltk
+    resource = find_resource("stopwords")
+    if resource is not None and resource.is_dir():
+        path = resource / language
+        if path.is_file():
+            return frozenset(path.read_text(encoding="utf-8").split())
+
+    _configure_nltk()
+    from nltk.corpus import stopwords
+    return frozenset(stopwords.words(language))
+
+@lru_cache(maxsize=1)
+def get_word_tokenizer():
+    _configure_nltk()
+    from nltk.tokenize import word_tokenize
+    return word_tokenize
+
+def prefetch(download_dir: str = NLTK_DATA_DIR, resources=None) -> list:
+    """Men-download resource NLTK ke download_dir (dipakai saat build image)."""
+    import nltk
+    Path(download_dir).mkdir(parents=True, exist_ok=True)
+    failed = []
+    for name in resources or RESOURCES:
+        if not nltk.download(name, download_dir=download_dir, quiet=True, raise_on_error=False):
+            failed.append(name)
+    return failed
@@ -0,0 +1,116 @@
+import hashlib
+import re
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+from ..config import models
+from ..config.settings import PREPROCESS_TOKENIZER, PREPROCESS_WORKERS, PREPROCESS_PARALLEL_MIN_DOCS
+from .nltk_resources import get_stop_words, get_word_tokenizer
+
+# Tokenizer "regex": rangkaian huruf. Tidak setara dengan word_tokenize:
+# token ber-tanda hubung ("state-of-the-art") dipecah per bagian, sedangkan
+# word_tokenize mempertahankannya utuh lalu dibuang oleh filter isalpha.
+WORD_RE = re.compile(r"[^\W\d_]+")
+
+def tokenize(doc: str, tokenizer: str = PREPROCESS_TOKENIZER) -> list:
+    stop_words = get_stop_words()
+    if tokenizer == "nltk":
+        words = get_word_tokenizer()(doc.lower())
+    else:
+        words = WORD_RE.findall(doc.lower())
+    return [word for word in words if word.isalpha() and word not in stop_words]
+
+def _tokenize_chunk(chunk: list, tokenizer: str) -> list:
+    return [tokenize(doc, tokenizer) for doc in chunk]
+
+def preprocess(texts, tokenizer: str = PREPROCESS_TOKENIZER, workers: int = PREPROCESS_WORKERS):
+    """
+    Tokenisasi dan pembuangan stopword. Untuk jumlah dokumen besar dan
+    workers > 1, dokumen dibagi per potongan ke beberapa proses.
+    """
+    texts = list(texts)
+    if workers <= 1 or len(texts) < PREPROCESS_PARALLEL_MIN_DOCS:
+        return _tokenize_chunk(texts, tokenizer)
+
+    chunk_size = -(-len(texts) // (workers * 4))
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(_tokenize_chunk, chunks, [tokenizer] * len(chunks))
+        return [tokens for chunk in results for tokens in chunk]
+
+def text_hash(text: str, tokenizer: str = PREPROCESS_TOKENIZER) -> str:
+    return hashlib.blake2b(f"{tokenizer}\0{text}".encode("utf-8"), digest_size=16).hexdigest()
+
+def _token_rows_query(db: Session, file_id: int):
+    return db.query(
+        models.Metadata.id,
+        models.Metadata.title,
+        models.Metadata.abstract,
+        models.MetadataTokens.text_hash,
+        models.MetadataTokens.tokens,
+    ).outerjoin(
+        models.MetadataTokens, models.MetadataTokens.metadata_id == models.Metadata.id
+    ).filter(
+        models.Metadata.file_id == file_id
+    )
+
+def _tokens_for_rows(db: Session, rows: list, tokenizer: str) -> list:
+    """
+    Token setiap baris dari cache metadata_tokens; baris yang belum ada di
+    cache atau teksnya berubah ditokenisasi lalu disimpan (tanpa commit).
+    """
+    processed = [None] * len(rows)
+    missing = []
+    stale_ids = []
+    for i, row in enumerate(rows):
+        text = f"{row.title} {row.abstract}"
+        digest = text_hash(text, tokenizer)
+        if row.text_hash == digest:
+            processed[i] = row.tokens.split() if row.tokens else []
+            continue
+        missing.append((i, row.id, text, digest))
+        if row.text_hash is not None:
+            stale_ids.append(row.id)
+
+    if missing:
+        tokenized = preprocess([text for _, _, text, _ in missing], tokenizer)
+        # Hapus cache lama per potongan agar tidak melebihi batas parameter SQLite
+        for start in range(0, len(stale_ids), 900):
+            db.execute(delete(models.MetadataTokens).where(
+                models.MetadataTokens.metadata_id.in_(stale_ids[start:start + 900])
+            ))
+        db.execute(insert(models.MetadataTokens.__table__), [
+            {"metadata_id": metadata_id, "text_hash": digest, "tokens": " ".join(tokens)}
+            for (_, metadata_id, _, digest), tokens in zip(missing, tokenized)
+        ])
+        for (i, _, _, _), tokens in zip(missing, tokenized):
+            processed[i] = tokens
+
+    return processed
+
+def load_processed_texts(db: Session, file_id: int, tokenizer: str = PREPROCESS_TOKENIZER) -> list:
+    """
+    Mengembalikan token untuk setiap baris metadata file_id (urut berdasarkan id).
+    Hanya baris yang belum ada di cache metadata_tokens, atau teksnya berubah,
+    yang ditokenisasi ulang; hasilnya langsung disimpan ke cache (tanpa commit).
+    """
+    rows = _token_rows_query(db, file_id).order_by(models.Metadata.id).all()
+    return _tokens_for_rows(db, rows, tokenizer)
+
+def iter_processed_batches(db: Session, file_id: int, batch_size: int, tokenizer: str = PREPROCESS_TOKENIZER):
+    """
+    Seperti load_processed_texts tetapi per halaman (keyset pada id) sehingga
+    file besar tidak dimuat sekaligus. Menghasilkan (daftar metadata id,
+    daftar token); cache token setiap halaman di-commit.
+    """
+    last_id = 0
+    while True:
+        rows = _token_rows_query(db, file_id).filter(
+            models.Metadata.id > last_id
+        ).order_by(models.Metadata.id).limit(batch_size).all()
+        if not rows:
+            return
+        processed = _tokens_for_rows(db, rows, tokenizer)
+        db.commit()
+        last_id = rows[-1].id
+        yield [row.id for row in rows], processed
@@ -0,0 +1,160 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select
+from starlette.concurrency import run_in_threadpool
+from ..config import models
+from ..config.db import dialect_insert
+from ..config.models import ProgressSessionLocal, RUNNING, FINISHED_STATES
+from ..config.settings import PROGRESS_POLL_INTERVAL, PROGRESS_RETENTION_SECONDS
+
+# Event progres upload dan analisis. publish() menulis event terakhir per
+# channel ke progress_channels (terlihat oleh semua proses) lalu langsung
+# membangunkan subscriber di proses yang sama. Perubahan dari proses lain
+# (worker analisis, worker uvicorn lain) diambil satu poller per proses yang
+# hanya berjalan selama ada subscriber; subscriber sendiri menunggu
+# asyncio.Event sehingga koneksi yang idle tidak memakai CPU. Stream selesai
+# begitu channel mencapai status akhir. Channel yang sudah selesai lebih
+# lama dari PROGRESS_RETENTION_SECONDS dihapus setiap ada channel lain yang
+# selesai, sehingga ukuran tabel tidak terus bertambah.
+
+def upload_channel(file_id: int) -> str:
+    return f"upload:{int(file_id)}"
+
+def job_channel(job_id: int) -> str:
+    return f"job:{int(job_id)}"
+
+def _serialize(row) -> dict:
+    return {
+        "channel": row.channel,
+        "stage": row.stage,
+        "progress": row.progress,
+        "status": row.status,
+        "message": row.message,
+        "seq": row.seq,
+        "updated_at": row.updated_at,
+    }
+
+def publish(
+    channel: str,
+    stage: str,
+    progress: float = None,
+    status: str = RUNNING,
+    message: str = None,
+    user_id: str = None,
+):
+    """
+    Mencatat event terbaru channel (transaksi sendiri, terpisah dari
+    transaksi pemanggil). Kegagalan menulis progres tidak menggagalkan
+    upload atau analisis.
+    """
+    table = models.ProgressChannel.__table__
+    values = {
+        "stage": stage,
+        "progress": progress,
+        "status": status,
+        "message": message,
+        "updated_at": datetime.now(),
+    }
+    try:
+        with ProgressSessionLocal() as db:
+            statement = dialect_insert(db)(table).values(channel=channel, user_id=user_id, seq=1, **values)
+            db.execute(statement.on_conflict_do_update(
+                index_elements=[table.c.channel],
+                set_={**values, "seq": table.c.seq + 1},
+            ))
+            if status in FINISHED_STATES:
+                _prune_finished(db, values["updated_at"])
+            db.commit()
+    except Exception as e:
+        print(f"Publishing progress for {channel} failed: {e}")
+        return
+    _broker.notify(channel)
+
+def _prune_finished(db, now: datetime):
+    table = models.ProgressChannel
+    db.execute(delete(table).where(
+        table.status.in_(FINISHED_STATES),
+        table.updated_at < now - timedelta(seconds=PROGRESS_RETENTION_SECONDS),
+    ))
+
+def read_event(channel: str):
+    with ProgressSessionLocal() as db:
+        row = db.get(models.ProgressChannel, channel)
+        return _serialize(row) if row else None
+
+def _current_seqs(channels: list) -> dict:
+    table = models.ProgressChannel
+    with ProgressSessionLocal() as db:
+        return dict(db.execute(select(table.channel, table.seq).where(table.channel.in_(channels))).all())
+
+class _Broker:
+    """Subscriber per channel di proses ini beserta poller lintas proses."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.waiters = {}
+        self.seen = {}
+        self.poller = None
+
+    def register(self, channel: str) -> asyncio.Event:
+        waiter = asyncio.Event()
+        with self.lock:
+            self.waiters.setdefault(channel, set()).add((asyncio.get_running_loop(), waiter))
+        if self.poller is None or self.poller.done():
+            self.poller = asyncio.create_task(self._poll())
+        return waiter
+
+    def unregister(self, channel: str, waiter: asyncio.Event):
+        with self.lock:
+            entries = self.waiters.get(channel, set())
+            entries.discard((asyncio.get_running_loop(), waiter))
+            if not entries:
+                self.waiters.pop(channel, None)
+                self.seen.pop(channel, None)
+
+    def notify(self, channel: str):
+        # Dipanggil dari thread mana pun (mis. threadpool upload)
+        with self.lock:
+            entries = list(self.waiters.get(channel, ()))
+        for loop, waiter in entries:
+            loop.call_soon_threadsafe(waiter.set)
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(PROGRESS_POLL_INTERVAL)
+            with self.lock:
+                channels = list(self.waiters)
+            if not channels:
+                return
+            try:
+                seqs = await run_in_threadpool(_current_seqs, channels)
+            except Exception as e:
+                print(f"Progress poll failed: {e}")
+                continue
+            for channel, seq in seqs.items():
+                if self.seen.get(channel) != seq:
+                    self.seen[channel] = seq
+                    self.notify(channel)
+
+_broker = _Broker()
+
+async def subscribe(channel: str):
+    """
+    Async generator event channel: event terakhir segera dikirim, lalu
+    setiap event baru; berhenti setelah event dengan status akhir.
+    """
+    waiter = _broker.register(channel)
+    try:
+        last_seq = None
+        while True:
+            waiter.clear()
+            event = await run_in_threadpool(read_event, channel)
+            if event is not None and event["seq"] != last_seq:
+                last_seq = event["seq"]
+                yield event
+                if event["status"] in FINISHED_STATES:
+                    return
+            await waiter.wait()
+    finally:
+        _broker.unregister(channel, waiter)
@@ -0,0 +1,191 @@
+import hashlib
+import json
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from ..config import models
+from ..config.db import dialect_insert
+
+# Normalisasi isi JSON Corpus.authors dan Corpus.topics ke tabel authors,
+# institutions, topics dan tabel relasinya. Diisi sekali saat upload (dan
+# lewat migrate.py untuk data lama) sehingga graf dan statistik cukup
+# memakai join ber-index tanpa mem-parsing JSON setiap request.
+
+# Batas parameter per statement SQLite
+_CHUNK = 900
+
+def _loads_list(value) -> list:
+    try:
+        data = json.loads(value) if value else []
+    except (json.JSONDecodeError, TypeError):
+        return []
+    return data if isinstance(data, list) else []
+
+def stable_key(prefix: str, text: str) -> str:
+    """Id pengganti yang sama di setiap proses (berbeda dengan hash() bawaan Python)."""
+    return f"{prefix}{hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()}"
+
+def author_key(author: dict) -> str:
+    return author.get("orcid") or stable_key("unknown_orcid_", author.get("full_name", ""))
+
+def institution_key(institution: dict) -> str:
+    return institution.get("ror_id") or stable_key("unknown_ror_", institution["name"])
+
+def _topic_number(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _probability(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def parse_publication(authors, topics):
+    """
+    Mengurai JSON satu publikasi. Mengembalikan (daftar penulis, daftar topik)
+    dengan kunci author/institution yang sudah ditentukan. Topik tanpa
+    topic_id numerik dilewati karena tidak dapat dipetakan ke SDG.
+    """
+    parsed_authors = []
+    for author in _loads_list(authors):
+        if not isinstance(author, dict):
+            continue
+        institution = author.get("institution")
+        if not (isinstance(institution, dict) and institution.get("name")):
+            institution = None
+        parsed_authors.append({
+            "author_key": author_key(author),
+            "orcid": author.get("orcid") or None,
+            "full_name": author.get("full_name", "Unknown Author"),
+            "position": author.get("position"),
+            "institution": None if institution is None else {
+                "institution_key": institution_key(institution),
+                "ror_id": institution.get("ror_id") or None,
+                "name": institution["name"],
+                "country": institution.get("country"),
+            },
+        })
+
+    parsed_topics = []
+    for topic in _loads_list(topics):
+        if not isinstance(topic, dict):
+            continue
+        number = _topic_number(topic.get("topic_id"))
+        if number is None:
+            continue
+        parsed_topics.append({
+            "topic_number": number,
+            "keywords": topic.get("keywords", []),
+            "topic_probability": _probability(topic.get("topic_probability")),
+        })
+    return parsed_authors, parsed_topics
+
+def _lookup(db: Session, column, key_column, keys: list, *criteria) -> dict:
+    ids = {}
+    for start in range(0, len(keys), _CHUNK):
+        rows = db.execute(
+            select(key_column, column).where(key_column.in_(keys[start:start + _CHUNK]), *criteria)
+        )
+        ids.update(dict(rows.all()))
+    return ids
+
+def _upsert_entities(db: Session, user_id: str, publications: list):
+    """
+    Insert author, institution dan topik yang belum ada (entri pertama yang
+    tercatat dipakai) lalu mengembalikan peta kunci -> id untuk ketiganya.
+    """
+    authors, institutions, topics = {}, {}, {}
+    for parsed_authors, parsed_topics in publications:
+        for author in parsed_authors:
+            authors.setdefault(author["author_key"], {
+                "author_key": author["author_key"],
+                "orcid": author["orcid"],
+                "full_name": author["full_name"],
+            })
+            if author["institution"]:
+                institutions.setdefault(author["institution"]["institution_key"], author["institution"])
+        for topic in parsed_topics:
+            topics.setdefault(topic["topic_number"], {
+                "user_id": user_id,
+                "topic_number": topic["topic_number"],
+                "keywords": topic["keywords"],
+            })
+
+    insert_ = dialect_insert(db)
+    if authors:
+        db.execute(insert_(models.Author.__table__).on_conflict_do_nothing(), list(authors.values()))
+    if institutions:
+        db.execute(insert_(models.Institution.__table__).on_conflict_do_nothing(), list(institutions.values()))
+    if topics:
+        db.execute(
+            insert_(models.Topic.__table__).on_conflict_do_nothing(index_elements=["user_id", "topic_number"]),
+            list(topics.values())
+        )
+
+    return (
+        _lookup(db, models.Author.id, models.Author.author_key, list(authors)),
+        _lookup(db, models.Institution.id, models.Institution.institution_key, list(institutions)),
+        _lookup(db, models.Topic.id, models.Topic.topic_number, list(topics), models.Topic.user_id == user_id),
+    )
+
+def index_publications(db: Session, user_id: str, corpus_ids: list, authors: list, topics: list):
+    """Menulis entitas dan relasi untuk sekumpulan Corpus yang baru di-insert (tanpa commit)."""
+    publications = [parse_publication(a, t) for a, t in zip(authors, topics)]
+    author_ids, institution_ids, topic_ids = _upsert_entities(db, user_id, publications)
+
+    author_rows, topic_rows = [], []
+    for corpus_id, (parsed_authors, parsed_topics) in zip(corpus_ids, publications):
+        for author in parsed_authors:
+            institution = author["institution"]
+            author_rows.append({
+                "corpus_id": corpus_id,
+                "user_id": user_id,
+                "position": author["position"],
+                "author_id": author_ids[author["author_key"]],
+                "institution_id": institution_ids[institution["institution_key"]] if institution else None,
+            })
+        for topic in parsed_topics:
+            topic_rows.append({
+                "corpus_id": corpus_id,
+                "user_id": user_id,
+                "topic_id": topic_ids[topic["topic_number"]],
+                "topic_probability": topic["topic_probability"],
+                "keywords": topic["keywords"],
+            })
+    if author_rows:
+        db.execute(insert(models.PublicationAuthorInstitution.__table__), author_rows)
+    if topic_rows:
+        db.execute(insert(models.PublicationTopic.__table__), topic_rows)
+
+def backfill_publication_index(db: Session, batch_size: int = 2000) -> int:
+    """Mengisi tabel normalisasi untuk Corpus yang belum memiliki baris relasi sama sekali."""
+    indexed = select(models.PublicationTopic.corpus_id).union(
+        select(models.PublicationAuthorInstitution.corpus_id)
+    )
+    total = 0
+    last_id = 0
+    while True:
+        rows = db.query(
+            models.Corpus.id, models.Corpus.uploaded_by, models.Corpus.authors, models.Corpus.topics
+        ).filter(
+            models.Corpus.id > last_id, models.Corpus.id.not_in(indexed)
+        ).order_by(models.Corpus.id).limit(batch_size).all()
+        if not rows:
+            break
+        by_user = {}
+        for row in rows:
+            by_user.setdefault(row.uploaded_by, []).append(row)
+        for user_id, user_rows in by_user.items():
+            index_publications(
+                db,
+                user_id,
+                [row.id for row in user_rows],
+                [row.authors for row in user_rows],
+                [row.topics for row in user_rows],
+            )
+        db.commit()
+        last_id = rows[-1].id
+        total += len(rows)
+    return total
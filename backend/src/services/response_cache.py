@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from ..config import models
+from ..config.settings import RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_DIR
+
+# Cache response endpoint dashboard. Kunci cache memuat user id dan versi data
+# user (user_data_versions) yang dinaikkan setiap upload dan analisis selesai,
+# sehingga invalidasi cukup dengan menaikkan versi; entri lama tidak pernah
+# cocok lagi dan tersingkir oleh LRU/TTL. Body disimpan sudah dalam bentuk
+# JSON beserta ETag-nya agar cache hit tidak perlu serialisasi ulang.
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_bytes = 0
+
+def data_version(db: Session, user_id: str) -> int:
+    return db.query(models.UserDataVersion.version).filter(
+        models.UserDataVersion.user_id == user_id
+    ).scalar() or 0
+
+async def data_version_async(db: AsyncSession, user_id: str) -> int:
+    return (await db.execute(
+        select(models.UserDataVersion.version).where(models.UserDataVersion.user_id == user_id)
+    )).scalar() or 0
+
+def bump_data_version(db: Session, user_id: str):
+    """Menandai data dashboard user berubah (tanpa commit, ikut transaksi pemanggil)."""
+    updated = db.execute(
+        update(models.UserDataVersion)
+        .where(models.UserDataVersion.user_id == user_id)
+        .values(version=models.UserDataVersion.version + 1)
+    ).rowcount
+    if not updated:
+        db.add(models.UserDataVersion(user_id=user_id, version=1))
+    db.flush()
+    # Entri disk versi lama tidak akan terbaca lagi
+    if RESPONSE_CACHE_DIR:
+        shutil.rmtree(_user_dir(user_id), ignore_errors=True)
+
+def _user_dir(user_id: str) -> Path:
+    return Path(RESPONSE_CACHE_DIR) / hashlib.blake2b(user_id.encode("utf-8"), digest_size=8).hexdigest()
+
+def _disk_path(user_id: str, key: str) -> Path:
+    return _user_dir(user_id) / f"{hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()}.json"
+
+def _memory_get(key: str):
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            _memory_pop(key)
+            return None
+        _cache.move_to_end(key)
+        return entry[1], entry[2]
+
+def _memory_pop(key: str):
+    global _cache_bytes
+    entry = _cache.pop(key, None)
+    if entry is not None:
+        _cache_bytes -= len(entry[1])
+
+def _memory_put(key: str, body: bytes, etag: str, ttl: int):
+    global _cache_bytes
+    if len(body) > RESPONSE_CACHE_MAX_BYTES:
+        return
+    with _cache_lock:
+        _memory_pop(key)
+        _cache[key] = (time.monotonic() + ttl, body, etag)
+        _cache_bytes += len(body)
+        while _cache_bytes > RESPONSE_CACHE_MAX_BYTES:
+            _memory_pop(next(iter(_cache)))
+
+def _disk_get(user_id: str, key: str, ttl: int):
+    path = _disk_path(user_id, key)
+    try:
+        if time.time() - path.stat().st_mtime > ttl:
+            path.unlink(missing_ok=True)
+            return None
+        body = path.read_bytes()
+    except OSError:
+        return None
+    return body, _etag(body)
+
+def _disk_put(user_id: str, key: str, body: bytes):
+    path = _disk_path(user_id, key)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_bytes(body)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Response cache write failed: {e}")
+
+def _etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+def clear_cache():
+    global _cache_bytes
+    with _cache_lock:
+        _cache.clear()
+        _cache_bytes = 0
+
+def _cache_key(request: Request, user_id: str, version: int) -> str:
+    query = sorted(request.query_params.multi_items())
+    return json.dumps([user_id, version, request.url.path, query])
+
+def _lookup(user_id: str, key: str, ttl: int):
+    cached = _memory_get(key)
+    if cached is None and RESPONSE_CACHE_DIR:
+        cached = _disk_get(user_id, key, ttl)
+        if cached is not None:
+            _memory_put(key, cached[0], cached[1], ttl)
+    return cached
+
+def _store(user_id: str, key: str, data, ttl: int):
+    body = json.dumps(
+        jsonable_encoder(data), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+    etag = _etag(body)
+    _memory_put(key, body, etag, ttl)
+    if RESPONSE_CACHE_DIR:
+        _disk_put(user_id, key, body)
+    return body, etag
+
+def _respond(request: Request, body: bytes, etag: str) -> Response:
+    # no-cache: browser boleh menyimpan, tetapi wajib validasi ulang lewat ETag
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def cached_response(request: Request, db: Session, user_id: str, build, ttl: int = RESPONSE_CACHE_TTL) -> Response:
+    """
+    Mengembalikan response JSON dari cache (memori, lalu disk bila diaktifkan)
+    atau dari build() bila belum ada. Kunci cache: path dan query string
+    request, user id dan versi data user. Response membawa ETag; request
+    dengan If-None-Match yang cocok dijawab 304 tanpa body.
+    """
+    key = _cache_key(request, user_id, data_version(db, user_id))
+    cached = _lookup(user_id, key, ttl) or _store(user_id, key, build(), ttl)
+    return _respond(request, *cached)
+
+async def cached_response_async(
+    request: Request, db: AsyncSession, user_id: str, build, ttl: int = RESPONSE_CACHE_TTL
+) -> Response:
+    """Versi cached_response untuk route async; build adalah coroutine function."""
+    key = _cache_key(request, user_id, await data_version_async(db, user_id))
+    cached = _lookup(user_id, key, ttl) or _store(user_id, key, await build(), ttl)
+    return _respond(request, *cached)
@@ -0,0 +1,186 @@
+import json
+from functools import lru_cache
+from pathlib import Path
+import numpy as np
+from scipy import sparse
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+from ..config import models
+from ..config.settings import (
+    SDG_LEXICON_PATH, SDG_MAPPING_TOP_N, SDG_MAPPING_MIN_WEIGHT, SDG_MIN_KEYWORD_MASS)
+
+# Pemetaan topik -> SDG otomatis. Leksikon kata kunci SDG (berversi) diubah
+# menjadi matriks sparse SDG x kata sesuai dictionary model, lalu bobot semua
+# topik terhadap 17 SDG didapat dari satu perkalian matriks dengan topic_word
+# (K x V). Bobot per topik dinormalisasi menjadi proporsi terhadap total massa
+# kata kunci SDG pada topik tersebut.
+#
+# Baris disimpan per (model_id, lda_topic); nomor topik LDA tidak berhubungan
+# dengan nomor topik pada data upload (kolom topic_id, pemetaan manual). SDG
+# per publikasi diturunkan dari matriks dokumen x topik analisis model yang
+# sama: bobot SDG dokumen = sum_k p(k|dokumen) * bobot(k, SDG).
+
+SDG_LABELS = {
+    1: "No Poverty", 2: "Zero Hunger", 3: "Good Health and Well-being",
+    4: "Quality Education", 5: "Gender Equality", 6: "Clean Water and Sanitation",
+    7: "Affordable and Clean Energy", 8: "Decent Work and Economic Growth",
+    9: "Industry, Innovation and Infrastructure", 10: "Reduced Inequalities",
+    11: "Sustainable Cities and Communities", 12: "Responsible Consumption and Production",
+    13: "Climate Action", 14: "Life Below Water", 15: "Life on Land",
+    16: "Peace, Justice and Strong Institutions", 17: "Partnerships for the Goals"
+}
+
+SDG_IDS = tuple(SDG_LABELS)
+
+DEFAULT_LEXICON = Path(__file__).with_name("sdg_lexicon.json")
+
+@lru_cache(maxsize=4)
+def load_lexicon(path: str = None) -> dict:
+    """Leksikon {"version": str, "sdgs": {sdg_id: [kata, ...]}} dengan kata huruf kecil."""
+    with open(path or SDG_LEXICON_PATH or DEFAULT_LEXICON, encoding="utf-8") as f:
+        data = json.load(f)
+    return {
+        "version": str(data["version"]),
+        "sdgs": {int(sdg_id): sorted({term.lower() for term in terms}) for sdg_id, terms in data["sdgs"].items()},
+    }
+
+def sdg_term_matrix(lexicon: dict, token2id: dict, num_terms: int) -> sparse.csr_matrix:
+    """
+    Matriks sparse SDG x kata (baris mengikuti SDG_IDS). Kata yang muncul di
+    beberapa SDG dibagi rata agar tidak dihitung berulang.
+    """
+    rows, cols = [], []
+    for row, sdg_id in enumerate(SDG_IDS):
+        for term in lexicon["sdgs"].get(sdg_id, ()):
+            term_id = token2id.get(term)
+            if term_id is not None:
+                rows.append(row)
+                cols.append(term_id)
+    cols = np.asarray(cols, dtype=np.int64)
+    shares = np.bincount(cols, minlength=num_terms)[cols] if len(cols) else cols
+    return sparse.csr_matrix(
+        (1.0 / np.maximum(shares, 1), (np.asarray(rows, dtype=np.int64), cols)),
+        shape=(len(SDG_IDS), num_terms), dtype=np.float32,
+    )
+
+def topic_sdg_weights(topic_word: np.ndarray, sdg_terms: sparse.csr_matrix):
+    """
+    (proporsi K x 17, massa kata kunci K) dari satu perkalian sparse x dense.
+    Topik tanpa kata kunci SDG memiliki proporsi nol. Hanya kolom kata kunci
+    yang dibaca dari topic_word (ratusan dari puluhan ribu kata), sehingga
+    topic_word hasil mmap tidak perlu dimuat utuh.
+    """
+    terms = np.unique(sdg_terms.indices)
+    mass = np.asarray(sdg_terms[:, terms] @ np.asarray(topic_word[:, terms]).T).T
+    total = mass.sum(axis=1)
+    weights = np.divide(mass, total[:, None], out=np.zeros_like(mass), where=total[:, None] > 0)
+    return weights, total
+
+def top_mappings(
+    weights: np.ndarray,
+    total: np.ndarray,
+    top_n: int = SDG_MAPPING_TOP_N,
+    min_weight: float = SDG_MAPPING_MIN_WEIGHT,
+    min_mass: float = SDG_MIN_KEYWORD_MASS,
+) -> list:
+    """(indeks topik, sdg_id, bobot) untuk top_n SDG per topik yang lolos ambang."""
+    top_n = min(top_n, weights.shape[1])
+    order = np.argsort(-weights, axis=1, kind="stable")[:, :top_n]
+    top = np.take_along_axis(weights, order, axis=1)
+    keep = (top >= min_weight) & (total[:, None] >= min_mass)
+    topics, ranks = np.nonzero(keep)
+    sdg_ids = np.asarray(SDG_IDS)[order[topics, ranks]]
+    return list(zip(topics.tolist(), sdg_ids.tolist(), top[topics, ranks].tolist()))
+
+def map_model_topics(
+    db: Session,
+    record: models.TrainedModel,
+    lda_model,
+    topic_word: np.ndarray = None,
+    lexicon: dict = None,
+) -> int:
+    """
+    Menghitung ulang pemetaan SDG semua topik satu model dan menulisnya ke
+    sdg_mapping menggantikan baris lama model tersebut (tanpa commit).
+    topic_word (K x V) dapat diberikan dari matriks analisis; bila tidak,
+    diambil dari lda_model.get_topics(). Mengembalikan jumlah baris.
+    """
+    lexicon = lexicon or load_lexicon()
+    if topic_word is None:
+        topic_word = lda_model.get_topics()
+    sdg_terms = sdg_term_matrix(lexicon, lda_model.id2word.token2id, topic_word.shape[1])
+    rows = [
+        {
+            "model_id": record.id,
+            "lda_topic": topic,
+            "sdg_id": sdg_id,
+            "mapping_weight": round(weight, 6),
+            "sdg_name": SDG_LABELS[sdg_id],
+            "lexicon_version": lexicon["version"],
+        }
+        for topic, sdg_id, weight in top_mappings(*topic_sdg_weights(topic_word, sdg_terms))
+    ]
+    db.execute(delete(models.SDGMapping).where(models.SDGMapping.model_id == record.id))
+    if rows:
+        db.execute(models.SDGMapping.__table__.insert(), rows)
+    return len(rows)
+
+def model_topic_sdgs(db: Session, model_id: int, num_topics: int):
+    """
+    Matriks topik x SDG (K x 17, kolom mengikuti SDG_IDS) dari pemetaan
+    otomatis model beserta versi leksikonnya (None bila belum dipetakan).
+    """
+    matrix = np.zeros((num_topics, len(SDG_IDS)), dtype=np.float32)
+    column = {sdg_id: i for i, sdg_id in enumerate(SDG_IDS)}
+    version = None
+    for topic, sdg_id, weight, version in db.execute(
+        select(
+            models.SDGMapping.lda_topic, models.SDGMapping.sdg_id,
+            models.SDGMapping.mapping_weight, models.SDGMapping.lexicon_version,
+        ).where(models.SDGMapping.model_id == model_id)
+    ):
+        if 0 <= topic < num_topics and sdg_id in column:
+            matrix[topic, column[sdg_id]] = weight
+    return matrix, version
+
+def _ranked(weights: np.ndarray, top_n: int) -> list:
+    order = np.argsort(-weights, kind="stable")[:top_n]
+    return [[SDG_IDS[i], round(float(weights[i]), 6)] for i in order if weights[i] > 0]
+
+def topic_sdgs(topic_sdg: np.ndarray) -> list:
+    """SDG per topik LDA, urut bobot turun."""
+    return [{"topic": topic, "sdgs": _ranked(row, len(SDG_IDS))} for topic, row in enumerate(topic_sdg)]
+
+def document_sdgs(matrices: dict, topic_sdg: np.ndarray, rows: list, top_n: int = SDG_MAPPING_TOP_N) -> list:
+    """
+    SDG teratas untuk baris dokumen tertentu dari matriks analisis: baris CSR
+    dokumen x topik yang dipilih dikalikan sekaligus dengan matriks topik x SDG.
+    """
+    indptr = matrices["doc_indptr"]
+    spans = [(int(indptr[row]), int(indptr[row + 1])) for row in rows]
+    lengths = np.array([stop - start for start, stop in spans], dtype=np.int64)
+    entries = np.concatenate([np.arange(start, stop) for start, stop in spans]) if spans else np.zeros(0, dtype=np.int64)
+    selected = sparse.csr_matrix(
+        (matrices["doc_weights"][entries], matrices["doc_topics"][entries],
+         np.concatenate(([0], np.cumsum(lengths)))),
+        shape=(len(rows), topic_sdg.shape[0]),
+    )
+    scores = np.asarray(selected @ topic_sdg)
+    return [
+        {"id": int(matrices["doc_ids"][row]), "sdgs": _ranked(score, top_n)}
+        for row, score in zip(rows, scores)
+    ]
+
+def sdg_totals(matrices: dict, topic_sdg: np.ndarray) -> list:
+    """
+    Jumlah bobot SDG seluruh dokumen analisis (perkiraan jumlah dokumen per
+    SDG): massa topik di matriks dokumen x topik dikali matriks topik x SDG.
+    """
+    topic_mass = np.bincount(
+        matrices["doc_topics"], weights=matrices["doc_weights"], minlength=topic_sdg.shape[0]
+    )
+    totals = topic_mass @ topic_sdg
+    return [
+        {"sdg_id": sdg_id, "sdg_name": SDG_LABELS[sdg_id], "weight": round(float(weight), 4)}
+        for sdg_id, weight in zip(SDG_IDS, totals) if weight > 0
+    ]
@@ -0,0 +1,152 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+import numpy as np
+from ..config.settings import INFERENCE_CHUNK_SIZE, DOC_TOPIC_TOP_K, DOC_TOPIC_MIN_PROBABILITY
+from .inference import doc_term_matrix, infer_distributions
+
+# Matriks hasil analisis disimpan di <direktori model>/matrices sebagai file
+# .npy terpisah sehingga dapat dibuka dengan mmap_mode="r" dan diiris tanpa
+# memuat seluruh isinya:
+#   doc_ids        int64 (D)      id corpus_metadata per baris, urut naik
+#   doc_indptr     int64 (D+1)    CSR dokumen -> topik (top-k per dokumen)
+#   doc_topics     int16/int32    nomor topik, urut probabilitas turun per baris
+#   doc_weights    float32        probabilitas topik
+#   topic_indptr   int64 (K+1)    indeks balik topik -> dokumen
+#   topic_rows     int32          baris dokumen, urut probabilitas turun per topik
+#   topic_weights  float32
+#   topic_word     float32 (K x V) distribusi kata per topik (lda.get_topics())
+
+MATRIX_DIR = "matrices"
+ARRAYS = (
+    "doc_ids", "doc_indptr", "doc_topics", "doc_weights",
+    "topic_indptr", "topic_rows", "topic_weights", "topic_word",
+)
+
+def _sparsify(distributions: np.ndarray, top_k: int, minimum_probability: float):
+    order = np.argsort(-distributions, axis=1, kind="stable")[:, :top_k]
+    weights = np.take_along_axis(distributions, order, axis=1)
+    # Topik teratas selalu disimpan walaupun di bawah minimum_probability
+    keep = weights >= minimum_probability
+    keep[:, 0] = True
+    return order[keep], weights[keep], keep.sum(axis=1)
+
+def build_doc_topics(
+    lda_model,
+    token_lists: list,
+    top_k: int = DOC_TOPIC_TOP_K,
+    minimum_probability: float = DOC_TOPIC_MIN_PROBABILITY,
+    chunk_size: int = INFERENCE_CHUNK_SIZE,
+) -> dict:
+    """Matriks dokumen x topik dalam bentuk CSR top-k beserta indeks balik per topik."""
+    topic_dtype = np.int16 if lda_model.num_topics <= np.iinfo(np.int16).max else np.int32
+    topics, weights, lengths = [], [], []
+    for start in range(0, len(token_lists), chunk_size):
+        counts = doc_term_matrix(lda_model, token_lists[start:start + chunk_size])
+        chunk_topics, chunk_weights, chunk_lengths = _sparsify(
+            infer_distributions(lda_model, counts), top_k, minimum_probability
+        )
+        topics.append(chunk_topics.astype(topic_dtype))
+        weights.append(chunk_weights.astype(np.float32))
+        lengths.append(chunk_lengths)
+
+    doc_topics = np.concatenate(topics) if topics else np.zeros(0, dtype=topic_dtype)
+    doc_weights = np.concatenate(weights) if weights else np.zeros(0, dtype=np.float32)
+    doc_indptr = np.zeros(len(token_lists) + 1, dtype=np.int64)
+    if lengths:
+        np.cumsum(np.concatenate(lengths), out=doc_indptr[1:])
+
+    rows = np.repeat(np.arange(len(token_lists), dtype=np.int32), np.diff(doc_indptr))
+    by_topic = np.lexsort((-doc_weights, doc_topics))
+    topic_indptr = np.zeros(lda_model.num_topics + 1, dtype=np.int64)
+    np.cumsum(np.bincount(doc_topics, minlength=lda_model.num_topics), out=topic_indptr[1:])
+    return {
+        "doc_indptr": doc_indptr,
+        "doc_topics": doc_topics,
+        "doc_weights": doc_weights,
+        "topic_indptr": topic_indptr,
+        "topic_rows": rows[by_topic],
+        "topic_weights": doc_weights[by_topic],
+    }
+
+def save_topic_matrices(lda_model, model_path: str, doc_ids: list, token_lists: list) -> str:
+    """
+    Menghitung dan menulis matriks analysis ke <model_path>/matrices.
+    Direktori ditulis lengkap di lokasi sementara lalu di-rename.
+    Mengembalikan path direktori matriks.
+    """
+    arrays = build_doc_topics(lda_model, token_lists)
+    arrays["doc_ids"] = np.asarray(doc_ids, dtype=np.int64)
+    arrays["topic_word"] = lda_model.get_topics().astype(np.float32)
+
+    target = Path(model_path) / MATRIX_DIR
+    tmp_dir = Path(tempfile.mkdtemp(dir=model_path, prefix=f".{MATRIX_DIR}."))
+    try:
+        for name in ARRAYS:
+            np.save(tmp_dir / f"{name}.npy", arrays[name])
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(tmp_dir, target)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return str(target)
+
+def open_topic_matrices(matrix_path: str) -> dict:
+    """Membuka semua array dengan mmap (hanya halaman yang diiris yang dibaca dari disk)."""
+    return {name: np.load(Path(matrix_path) / f"{name}.npy", mmap_mode="r") for name in ARRAYS}
+
+def _doc_row(matrices: dict, row: int) -> dict:
+    start, stop = matrices["doc_indptr"][row], matrices["doc_indptr"][row + 1]
+    return {
+        "id": int(matrices["doc_ids"][row]),
+        "topics": [
+            [int(topic), round(float(weight), 6)]
+            for topic, weight in zip(matrices["doc_topics"][start:stop], matrices["doc_weights"][start:stop])
+        ],
+    }
+
+def document_topics(matrices: dict, offset: int = 0, limit: int = 100) -> list:
+    """Baris offset..offset+limit matriks dokumen x topik."""
+    stop = min(offset + limit, len(matrices["doc_ids"]))
+    return [_doc_row(matrices, row) for row in range(offset, stop)]
+
+def document_topics_by_id(matrices: dict, doc_ids: list) -> list:
+    """Baris untuk id metadata tertentu (binary search pada doc_ids); id yang tidak ada dilewati."""
+    ids = matrices["doc_ids"]
+    rows = np.searchsorted(ids, doc_ids)
+    return [
+        _doc_row(matrices, int(row))
+        for doc_id, row in zip(doc_ids, rows)
+        if row < len(ids) and ids[row] == doc_id
+    ]
+
+def topic_documents(matrices: dict, topic_id: int, offset: int = 0, limit: int = 50) -> list:
+    """Dokumen dengan bobot terbesar untuk satu topik (kolom matriks)."""
+    start = int(matrices["topic_indptr"][topic_id]) + offset
+    stop = min(start + limit, int(matrices["topic_indptr"][topic_id + 1]))
+    if start >= stop:
+        return []
+    rows = matrices["topic_rows"][start:stop]
+    return [
+        {"id": int(doc_id), "weight": round(float(weight), 6)}
+        for doc_id, weight in zip(matrices["doc_ids"][rows], matrices["topic_weights"][start:stop])
+    ]
+
+def topic_top_words(matrices: dict, topic_ids: list, id2word, top_n: int = 10) -> list:
+    """Kata dengan bobot terbesar per topik, dari baris topic_word."""
+    result = []
+    for topic_id in topic_ids:
+        row = np.asarray(matrices["topic_word"][topic_id])
+        top = np.argpartition(-row, min(top_n, len(row) - 1))[:top_n]
+        top = top[np.argsort(-row[top], kind="stable")]
+        result.append({
+            "topic": topic_id,
+            "words": [[id2word[int(term)], round(float(row[term]), 6)] for term in top],
+        })
+    return result
+
+def term_weights(matrices: dict, term_ids: list) -> list:
+    """Bobot kata tertentu di setiap topik (kolom topic_word)."""
+    columns = np.asarray(matrices["topic_word"][:, term_ids])
+    return [[round(float(weight), 6) for weight in column] for column in columns.T]
@@ -0,0 +1,187 @@
+import codecs
+import json
+from itertools import islice
+from pathlib import Path
+import pandas as pd
+from openpyxl import load_workbook
+from ..config.settings import UPLOAD_CHUNK_SIZE
+
+# Membaca file upload per batch baris langsung dari disk sehingga memori
+# puncak sebanding dengan ukuran batch, bukan ukuran file:
+# - CSV   : pd.read_csv dengan chunksize
+# - XLSX  : openpyxl read-only, baris dibaca lewat iterator
+# - JSON  : array of records di-decode satu record demi satu record
+# - NDJSON: satu record per baris (.ndjson/.jsonl, atau .json yang isinya per baris)
+# Setiap batch dikembalikan bersama fraksi file yang sudah dibaca (0..1)
+# untuk laporan progres.
+
+UPLOAD_TYPES = (".csv", ".xlsx", ".json", ".ndjson", ".jsonl")
+
+_READ_BLOCK = 64 * 1024
+
+def normalize_columns(frame: pd.DataFrame) -> pd.DataFrame:
+    frame.columns = [str(col).lower().strip() for col in frame.columns]
+    return frame
+
+def read_columns(path: Path, file_type: str) -> set:
+    """Nama kolom (huruf kecil) dari header file atau record pertama."""
+    batches = iter_batches(path, file_type, chunk_size=1)
+    try:
+        for frame, _ in batches:
+            return set(frame.columns)
+    finally:
+        batches.close()
+    if file_type == ".csv":
+        return {str(col).lower().strip() for col in pd.read_csv(path, nrows=0).columns}
+    raise ValueError("File contains no records")
+
+def iter_batches(path: Path, file_type: str, chunk_size: int = UPLOAD_CHUNK_SIZE):
+    """Generator (DataFrame berisi maksimal chunk_size baris, fraksi file yang sudah dibaca)."""
+    if file_type == ".csv":
+        batches = _iter_csv(path, chunk_size)
+    elif file_type == ".xlsx":
+        batches = _iter_xlsx(path, chunk_size)
+    elif file_type in (".ndjson", ".jsonl"):
+        batches = _iter_ndjson(path, chunk_size)
+    elif file_type == ".json":
+        batches = _iter_json(path, chunk_size)
+    else:
+        raise ValueError("Unsupported file type")
+    for frame, fraction in batches:
+        yield normalize_columns(frame), fraction
+
+def _iter_csv(path: Path, chunk_size: int):
+    size = path.stat().st_size or 1
+    with open(path, "rb") as f:
+        with pd.read_csv(f, chunksize=chunk_size) as reader:
+            for frame in reader:
+                yield frame, min(f.tell() / size, 1.0)
+
+def _iter_xlsx(path: Path, chunk_size: int):
+    # File object: blob tidak memiliki ekstensi yang diperiksa openpyxl
+    with open(path, "rb") as f:
+        yield from _iter_sheet(load_workbook(f, read_only=True, data_only=True), chunk_size)
+
+def _iter_sheet(workbook, chunk_size: int):
+    try:
+        # Sama seperti pd.read_excel: sheet pertama, baris pertama sebagai header
+        sheet = workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [
+            str(name) if name is not None else f"unnamed: {i}"
+            for i, name in enumerate(header)
+        ]
+        width = len(columns)
+        total = max((sheet.max_row or 0) - 1, 1)
+        done = 0
+        while batch := list(islice(rows, chunk_size)):
+            done += len(batch)
+            records = [tuple(row[:width]) + (None,) * (width - len(row)) for row in batch]
+            yield pd.DataFrame.from_records(records, columns=columns), min(done / total, 1.0)
+    finally:
+        workbook.close()
+
+def _iter_records(records, chunk_size: int, position):
+    while batch := list(islice(records, chunk_size)):
+        yield pd.DataFrame.from_records(batch), position()
+
+def _iter_ndjson(path: Path, chunk_size: int):
+    size = path.stat().st_size or 1
+    with open(path, "rb") as f:
+        records = (json.loads(line) for line in f if line.strip())
+        yield from _iter_records(records, chunk_size, lambda: min(f.tell() / size, 1.0))
+
+def _iter_json(path: Path, chunk_size: int):
+    size = path.stat().st_size or 1
+    with open(path, "rb") as f:
+        # BOM dibuang oleh decoder utf-8-sig tetapi tetap dihitung untuk progres
+        bom = len(codecs.BOM_UTF8) if f.read(len(codecs.BOM_UTF8)) == codecs.BOM_UTF8 else 0
+    with open(path, "r", encoding="utf-8-sig") as f:
+        reader = _JSONArrayReader(f, consumed=bom)
+        first = reader.peek()
+        if first == "[":
+            yield from _iter_records(reader.records(), chunk_size, lambda: min(reader.consumed / size, 1.0))
+            return
+        lines = first == "{" and _is_record_line(f.readline())
+    if lines:
+        yield from _iter_ndjson(path, chunk_size)
+        return
+    # Format lain yang didukung pd.read_json (mis. orient="columns") tidak
+    # bisa dibaca bertahap, sehingga dimuat utuh lalu dibagi per batch
+    frame = pd.read_json(path)
+    for start in range(0, len(frame), chunk_size):
+        yield frame.iloc[start:start + chunk_size], min((start + chunk_size) / len(frame), 1.0)
+
+def _is_record_line(line: str) -> bool:
+    """Baris berisi satu record utuh (bukan objek orient="columns" yang nilainya dict)."""
+    try:
+        value = json.loads(line)
+    except json.JSONDecodeError:
+        return False
+    return isinstance(value, dict) and not all(isinstance(item, dict) for item in value.values())
+
+class _JSONArrayReader:
+    """
+    Decoder bertahap untuk JSON berbentuk array of records: teks dibaca per
+    blok dan setiap elemen di-decode dengan raw_decode begitu lengkap, jadi
+    buffer hanya memuat satu record ditambah satu blok.
+    """
+
+    def __init__(self, f, consumed: int = 0):
+        self.f = f
+        self.buffer = ""
+        self.pos = 0
+        self.consumed = consumed
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        block = self.f.read(_READ_BLOCK)
+        if not block:
+            return False
+        self.consumed += len(block.encode("utf-8"))
+        self.buffer = self.buffer[self.pos:] + block
+        self.pos = 0
+        return True
+
+    def _skip_whitespace(self) -> str:
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def peek(self) -> str:
+        """Karakter pertama dokumen; posisi file dikembalikan ke awal bila bukan array."""
+        char = self._skip_whitespace()
+        if char != "[":
+            self.f.seek(0)
+        return char
+
+    def records(self):
+        self.pos += 1
+        if self._skip_whitespace() == "]":
+            return
+        while True:
+            if self._skip_whitespace() != "{":
+                raise ValueError("JSON array elements must be objects")
+            while True:
+                try:
+                    record, end = self.decoder.raw_decode(self.buffer, self.pos)
+                    break
+                except json.JSONDecodeError:
+                    # Record terpotong di batas blok: baca blok berikutnya
+                    if not self._fill():
+                        raise
+            self.pos = end
+            yield record
+            char = self._skip_whitespace()
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError("Expected ',' or ']' in JSON array")
+            self.pos += 1
@@ -1,7 +1,13 @@
-from fastapi import Request, HTTPException
+from fastapi import Request, HTTPException, Depends
 from sqlalchemy.orm import Session
 from src.config import models
+from src.config.models import get_db
+from src.config.settings import AUTH_TOKEN_CACHE_SIZE
 from clerk_backend_api import Clerk, AuthenticateRequestOptions
+from collections import OrderedDict
+import hashlib
+import threading
+import time
 import os
 from dotenv import load_dotenv
 
@@ -9,24 +15,106 @@ load_dotenv()
 
 clerk_sdk = Clerk(bearer_auth=os.getenv("CLERK_SECRET_KEY"))
 
-def authenticate_and_get_user_details(request: Request, db: Session):
-    try:
-        auth_header = request.headers.get("authorization")
-        if not auth_header or not auth_header.startswith("Bearer "):
-            raise HTTPException(status_code=401, detail="Authorization header missing or malformed")
-
-        request_state = clerk_sdk.authenticate_request(
-            request,
-            AuthenticateRequestOptions(
-                authorized_parties=["http://localhost:5173", "http://localhost:5174"],
-                jwt_key=os.getenv("JWT_KEY")
-            )
+# Verifikasi token dilakukan sekali per token: claims token yang valid
+# disimpan sampai token expired (exp). Kunci publik JWKS di-cache oleh SDK
+# Clerk; bila JWT_KEY diisi verifikasi berjalan tanpa jaringan sama sekali.
+_token_cache = OrderedDict()
+_token_lock = threading.Lock()
+
+# Data user terakhir yang sudah sama dengan tabel users, per user id.
+# Upsert ke database hanya dilakukan bila claims berubah.
+_synced_users = {}
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def _cached_claims(token: str):
+    key = _token_key(token)
+    with _token_lock:
+        entry = _token_cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            _token_cache.pop(key, None)
+            return None
+        _token_cache.move_to_end(key)
+        return entry[1]
+
+def _cache_claims(token: str, payload: dict):
+    expires_at = payload.get("exp")
+    if not expires_at:
+        return
+    with _token_lock:
+        _token_cache[_token_key(token)] = (expires_at, payload)
+        while len(_token_cache) > AUTH_TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+
+def verify_request_token(request: Request) -> dict:
+    """Mengembalikan payload token Bearer yang valid (dari cache bila sudah pernah diverifikasi)."""
+    auth_header = request.headers.get("authorization")
+    if not auth_header or not auth_header.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Authorization header missing or malformed")
+    token = auth_header[len("Bearer "):].strip()
+
+    payload = _cached_claims(token)
+    if payload is not None:
+        return payload
+
+    request_state = clerk_sdk.authenticate_request(
+        request,
+        AuthenticateRequestOptions(
+            authorized_parties=["http://localhost:5173", "http://localhost:5174"],
+            jwt_key=os.getenv("JWT_KEY")
         )
+    )
+
+    if not request_state.is_signed_in:
+        raise HTTPException(status_code=401, detail="Invalid token")
 
-        if not request_state.is_signed_in:
-            raise HTTPException(status_code=401, detail="Invalid token")
+    payload = request_state.payload
+    _cache_claims(token, payload)
+    return payload
 
-        payload = request_state.payload
+def sync_user(db: Session, user_details: dict, first_name: str = None, last_name: str = None):
+    """
+    Menyimpan atau memperbarui user di database hanya bila datanya berbeda
+    dari yang terakhir disinkronkan, sehingga request baca tidak menulis.
+    """
+    user_id = user_details["user_id"]
+    claims = (user_details["user_name"], user_details["email"], first_name, last_name)
+    if _synced_users.get(user_id) == claims:
+        return
+
+    user = db.query(models.User).filter_by(id=user_id).first()
+    if user:
+        changed = user.user_name != user_details["user_name"] or user.email != user_details["email"]
+        # Nama depan/belakang hanya diperbarui bila ada di token
+        if first_name is not None and user.first_name != first_name:
+            changed = True
+        if last_name is not None and user.last_name != last_name:
+            changed = True
+        if changed:
+            user.user_name = user_details["user_name"]
+            user.email = user_details["email"]
+            if first_name is not None:
+                user.first_name = first_name
+            if last_name is not None:
+                user.last_name = last_name
+            db.commit()
+    else:
+        db.add(models.User(
+            id=user_id,
+            user_name=user_details["user_name"],
+            email=user_details["email"],
+            first_name=first_name or "",
+            last_name=last_name or "",
+        ))
+        db.commit()
+    _synced_users[user_id] = claims
+
+def authenticate_and_get_user_details(request: Request, db: Session):
+    try:
+        payload = verify_request_token(request)
 
         user_id = payload.get("sub")
         user_name = payload.get("username") or "Researcher"
@@ -35,28 +123,26 @@ def authenticate_and_get_user_details(request: Request, db: Session):
         if not user_id:
             raise HTTPException(status_code=400, detail="Token missing essential user_id")
 
-        # Simpan atau update user di database
-        user = db.query(models.User).filter_by(id=user_id).first()
-        if user:
-            # update user
-            user.username = user_name
-            user.email = email
-        else:
-            # insert user
-            user = models.User(
-                id=user_id,
-                user_name=user_name,
-                email=email,
-            )
-            db.add(user)
-
-        db.commit()
-
-        return {
+        user_details = {
             "user_id": user_id,
             "user_name": user_name,
             "email": email,
         }
+        # Simpan atau update user di database bila claims berubah
+        sync_user(db, user_details, payload.get("first_name"), payload.get("last_name"))
 
+        return user_details
+
+    except HTTPException:
+        raise
     except Exception as e:
+        db.rollback()
         raise HTTPException(status_code=500, detail=f"Token validation error: {str(e)}")
+
+def get_current_user(request: Request, db: Session = Depends(get_db)) -> dict:
+    """
+    Dependency FastAPI untuk endpoint yang membutuhkan login. FastAPI
+    menyimpan hasil dependency per request sehingga autentikasi hanya
+    dijalankan sekali walaupun dipakai oleh beberapa dependency.
+    """
+    return authenticate_and_get_user_details(request, db)
@@ -0,0 +1,10 @@
+import os
+import tempfile
+
+# Database dan direktori data test dibuat di folder sementara sebelum modul
+# src di-import (models.py membuat engine dan tabel progres saat import).
+_data_dir = tempfile.mkdtemp(prefix="sdg-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_data_dir}/database.db")
+os.environ.setdefault("PROGRESS_DATABASE_URL", f"sqlite:///{_data_dir}/progress.db")
+os.environ.setdefault("BLOB_DIR", os.path.join(_data_dir, "blobs"))
+os.environ.setdefault("MODEL_DIR", os.path.join(_data_dir, "models"))
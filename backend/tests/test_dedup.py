@@ -0,0 +1,93 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+from src.config import models
+from src.services import dedup
+
+ABSTRACT = (
+    "Smallholder farmers in coastal villages adopt drought tolerant rice varieties "
+    "and community irrigation schemes to stabilise yields, household income and food "
+    "security during increasingly irregular monsoon seasons across the region"
+)
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    models.Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+def _chunk(rows: list) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=["title", "abstract"])
+
+def _stored_hashes(db) -> set:
+    return set(db.execute(select(models.ContentHash.content_hash)).scalars())
+
+def test_normalized_duplicates_within_chunk(db):
+    chunk = _chunk([
+        ("Rice yields", "Drought and rice."),
+        ("  RICE   yields ", "drought and RICE."),
+        ("Coral reefs", "Bleaching events."),
+    ])
+    kept, duplicates = dedup.deduplicate_chunk(db, chunk, file_id=1, near_threshold=0)
+    assert duplicates == 1
+    assert kept["title"].tolist() == ["Rice yields", "Coral reefs"]
+    assert _stored_hashes(db) == {
+        dedup.content_hash("Rice yields", "Drought and rice."),
+        dedup.content_hash("Coral reefs", "Bleaching events."),
+    }
+
+def test_duplicates_across_chunks_and_files(db):
+    first = _chunk([("Rice yields", "Drought and rice."), ("Coral reefs", "Bleaching events.")])
+    dedup.deduplicate_chunk(db, first, file_id=1, near_threshold=0)
+    db.commit()
+
+    second = _chunk([("Coral Reefs", "bleaching  events."), ("Urban heat", "Street trees.")])
+    kept, duplicates = dedup.deduplicate_chunk(db, second, file_id=2, near_threshold=0)
+    assert duplicates == 1
+    assert kept["title"].tolist() == ["Urban heat"]
+
+def test_hash_claimed_by_concurrent_upload_is_duplicate(db, monkeypatch):
+    # Upload lain mengklaim hash setelah pengecekan isi yang sudah ada
+    other = dedup.content_hash("Coral reefs", "Bleaching events.")
+    db.add(models.ContentHash(content_hash=other, file_id=9))
+    db.flush()
+    monkeypatch.setattr(dedup, "_existing_hashes", lambda db, hashes: set())
+
+    chunk = _chunk([("Coral reefs", "Bleaching events."), ("Urban heat", "Street trees.")])
+    kept, duplicates = dedup.deduplicate_chunk(db, chunk, file_id=1, near_threshold=0)
+    assert duplicates == 1
+    assert kept["title"].tolist() == ["Urban heat"]
+    assert db.get(models.ContentHash, other).file_id == 9
+
+def test_near_duplicates_within_and_across_chunks(db):
+    near = ABSTRACT.replace("the region", "the regions")
+    assert dedup.content_hash("Rice", near) != dedup.content_hash("Rice", ABSTRACT)
+    assert dedup.similarity(
+        dedup.minhash_signature(f"Rice {ABSTRACT}"), dedup.minhash_signature(f"Rice {near}")
+    ) >= 0.8
+
+    chunk = _chunk([("Rice", ABSTRACT), ("Rice", near), ("Coral reefs", "Bleaching events in the reef.")])
+    kept, duplicates = dedup.deduplicate_chunk(db, chunk, file_id=1, near_threshold=0.8)
+    assert duplicates == 1
+    assert kept["abstract"].tolist() == [ABSTRACT, "Bleaching events in the reef."]
+    db.commit()
+
+    later = _chunk([("Rice", near + " today"), ("Urban heat", "Street trees cool neighbourhoods.")])
+    kept, duplicates = dedup.deduplicate_chunk(db, later, file_id=2, near_threshold=0.8)
+    assert duplicates == 1
+    assert kept["title"].tolist() == ["Urban heat"]
+
+def test_near_duplicates_kept_when_disabled(db):
+    near = ABSTRACT.replace("region", "wider region")
+    chunk = _chunk([("Rice", ABSTRACT), ("Rice", near)])
+    kept, duplicates = dedup.deduplicate_chunk(db, chunk, file_id=1, near_threshold=0)
+    assert duplicates == 0 and len(kept) == 2
+
+def test_band_keys_match_for_identical_text():
+    signature = dedup.minhash_signature(ABSTRACT)
+    assert signature.shape == (dedup.NUM_PERM,)
+    assert dedup.band_keys(signature) == dedup.band_keys(dedup.minhash_signature(f"  {ABSTRACT.upper()} "))
+    assert len(set(dedup.band_keys(signature))) == dedup.LSH_BANDS
@@ -0,0 +1,86 @@
+import json
+import numpy as np
+import pytest
+from gensim.corpora import Dictionary
+from gensim.models import LdaModel
+from src.services.inference import doc_term_matrix, infer_distributions, infer_gamma, iter_inference_lines
+
+THEMES = [
+    ["water", "river", "sanitation", "drinking", "irrigation", "flood"],
+    ["solar", "energy", "electricity", "renewable", "battery", "grid"],
+    ["school", "student", "teacher", "learning", "literacy", "curriculum"],
+]
+
+def _documents(count: int, seed: int) -> list:
+    rng = np.random.default_rng(seed)
+    documents = []
+    for i in range(count):
+        main, other = THEMES[i % 3], THEMES[(i + 1) % 3]
+        words = list(rng.choice(main, 12)) + list(rng.choice(other, 3))
+        documents.append([str(word) for word in words])
+    return documents
+
+@pytest.fixture(scope="module")
+def lda_model():
+    documents = _documents(120, seed=1)
+    dictionary = Dictionary(documents)
+    return LdaModel(
+        [dictionary.doc2bow(doc) for doc in documents],
+        id2word=dictionary, num_topics=3, passes=10, random_state=7,
+    )
+
+class _OnesState:
+    """random_state pengganti agar gamma awal gensim sama dengan infer_gamma (semua 1)."""
+
+    def gamma(self, shape, scale, size):
+        return np.ones(size)
+
+def test_doc_term_matrix_counts_known_tokens(lda_model):
+    counts = doc_term_matrix(lda_model, [["water", "water", "unknown"], [], ["solar"]])
+    token2id = lda_model.id2word.token2id
+    assert counts.shape == (3, lda_model.num_terms)
+    assert counts[0, token2id["water"]] == 2
+    assert counts.sum(axis=1).ravel().tolist() == [[2, 0, 1]]
+
+def test_infer_gamma_matches_gensim_estep(lda_model, monkeypatch):
+    documents = _documents(30, seed=2)
+    monkeypatch.setattr(lda_model, "random_state", _OnesState())
+    expected, _ = lda_model.inference([lda_model.id2word.doc2bow(doc) for doc in documents])
+
+    gamma = infer_gamma(lda_model, doc_term_matrix(lda_model, documents))
+    np.testing.assert_allclose(gamma, expected, rtol=0, atol=0.01)
+
+def test_infer_distributions_close_to_get_document_topics(lda_model):
+    documents = _documents(30, seed=3)
+    distributions = infer_distributions(lda_model, doc_term_matrix(lda_model, documents))
+    assert distributions.dtype == np.float32
+    np.testing.assert_allclose(distributions.sum(axis=1), 1, atol=1e-5)
+
+    for row, doc in zip(distributions, documents):
+        expected = np.zeros(lda_model.num_topics)
+        for topic, probability in lda_model.get_document_topics(
+            lda_model.id2word.doc2bow(doc), minimum_probability=0
+        ):
+            expected[topic] = probability
+        np.testing.assert_allclose(row, expected, atol=0.005)
+        assert row.argmax() == expected.argmax()
+
+def test_result_does_not_depend_on_chunking(lda_model):
+    documents = _documents(10, seed=4)
+    together = infer_distributions(lda_model, doc_term_matrix(lda_model, documents))
+    alone = infer_distributions(lda_model, doc_term_matrix(lda_model, documents[4:5]))
+    np.testing.assert_allclose(alone[0], together[4], atol=1e-4)
+
+def test_document_without_known_tokens_gets_uniform_distribution(lda_model):
+    distributions = infer_distributions(lda_model, doc_term_matrix(lda_model, [["zzz"], []]))
+    np.testing.assert_allclose(distributions, 1 / lda_model.num_topics)
+
+def test_inference_lines_are_ranked_ndjson(lda_model):
+    documents = _documents(4, seed=5)
+    block = "".join(iter_inference_lines(lda_model, [([11, 12, 13, 14], documents)], minimum_probability=0, top_k=2))
+    lines = [json.loads(line) for line in block.splitlines()]
+    assert [line["id"] for line in lines] == [11, 12, 13, 14]
+    for line in lines:
+        assert line["tokens"] == 15
+        assert len(line["topics"]) == 2
+        assert line["topics"][0][1] >= line["topics"][1][1]
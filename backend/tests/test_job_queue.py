@@ -0,0 +1,63 @@
+import os
+import socket
+import subprocess
+import sys
+from datetime import datetime, timedelta
+import pytest
+from src.config import models
+from src.services import job_queue
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.setattr(job_queue, "submit_job", lambda job_id: None)
+    session = models.SessionLocal()
+    session.query(models.AnalysisJob).delete()
+    if session.get(models.User, "u") is None:
+        session.add(models.User(id="u", user_name="u", email="e", first_name="a", last_name="b"))
+        session.add(models.FilesUploaded(id=1, uploaded_by="u", file_name="f", file_size=1, file_type=".csv"))
+    session.commit()
+    yield session
+    session.close()
+
+def _dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+def _running_job(db, worker: str, heartbeat_at) -> int:
+    job = models.AnalysisJob(
+        file_id=1, user_id="u", num_topics=3, iteration=5, status=models.RUNNING,
+        stage="training", worker=worker, heartbeat_at=heartbeat_at,
+    )
+    db.add(job)
+    db.commit()
+    return job.id
+
+def _status(db, job_id: int) -> str:
+    db.expire_all()
+    return db.get(models.AnalysisJob, job_id).status
+
+def test_resume_keeps_jobs_of_live_workers(db):
+    now = datetime.now()
+    host = socket.gethostname()
+    alive = _running_job(db, f"{host}:{os.getpid()}", now)
+    other_host = _running_job(db, "other-host:1", now)
+    dead = _running_job(db, f"{host}:{_dead_pid()}", now)
+    silent = _running_job(db, f"{host}:{os.getpid()}", now - timedelta(seconds=job_queue.JOB_STALE_SECONDS + 1))
+    legacy = _running_job(db, None, None)
+
+    job_queue.resume_pending_jobs()
+    assert _status(db, alive) == models.RUNNING
+    assert _status(db, other_host) == models.RUNNING
+    for job_id in (dead, silent, legacy):
+        assert _status(db, job_id) == models.FAILED
+        assert db.get(models.AnalysisJob, job_id).error == "Analysis interrupted by server restart"
+
+def test_resume_requeues_queued_jobs(db, monkeypatch):
+    submitted = []
+    monkeypatch.setattr(job_queue, "submit_job", submitted.append)
+    job = models.AnalysisJob(file_id=1, user_id="u", num_topics=3, iteration=5, status=models.QUEUED)
+    db.add(job)
+    db.commit()
+    assert job_queue.resume_pending_jobs() == 1
+    assert submitted == [job.id]
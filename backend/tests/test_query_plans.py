@@ -0,0 +1,88 @@
+import pytest
+from sqlalchemy import create_engine, select
+from src.config import models
+from src.routes.analysis_routes import latest_analysis_query
+
+# Query yang sering dipanggil harus memakai index (EXPLAIN QUERY PLAN pada
+# SQLite di memori yang dibuat dari definisi model), bukan full table scan.
+
+USER_ID = "user"
+FILE_ID = 1
+
+def hot_queries():
+    """(nama, statement, index yang wajib dipakai)"""
+    return [
+        (
+            "files by user (/c/uploaded)",
+            select(models.FilesUploaded.id, models.FilesUploaded.file_name).where(
+                models.FilesUploaded.uploaded_by == USER_ID
+            ),
+            ["ix_files_uploaded_uploaded_by"],
+        ),
+        (
+            "duplicate file check (/c/upload)",
+            select(models.FilesUploaded).where(
+                models.FilesUploaded.file_name == "corpus",
+                models.FilesUploaded.file_size == 1024,
+            ).limit(1),
+            ["ix_files_uploaded_name_size"],
+        ),
+        (
+            "corpus pages by user (graph rebuild)",
+            select(models.Corpus.id, models.Corpus.doi).where(
+                models.Corpus.uploaded_by == USER_ID,
+                models.Corpus.id > 0,
+            ).order_by(models.Corpus.id).limit(2000),
+            ["ix_corpus_uploaded_by"],
+        ),
+        (
+            "corpus by file (graph update after upload)",
+            select(models.Corpus.id, models.Corpus.doi).where(
+                models.Corpus.uploaded_by == USER_ID,
+                models.Corpus.file_id == FILE_ID,
+                models.Corpus.id > 0,
+            ).order_by(models.Corpus.id).limit(2000),
+            ["ix_corpus_file_user"],
+        ),
+        (
+            "metadata by file (analysis input)",
+            select(models.Metadata.id, models.Metadata.title).where(
+                models.Metadata.file_id == FILE_ID
+            ).order_by(models.Metadata.id),
+            ["ix_corpus_metadata_file_id"],
+        ),
+        (
+            "latest analysis (/a/{file_id})",
+            latest_analysis_query(FILE_ID, USER_ID),
+            ["ix_analysis_result_file_id"],
+        ),
+    ]
+
+def explain(conn, statement) -> list:
+    sql = str(statement.compile(conn, compile_kwargs={"literal_binds": True}))
+    return [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+
+def check_plan(plan: list, expected_indexes: list) -> list:
+    """Mengembalikan daftar masalah: full scan atau index yang diharapkan tidak dipakai."""
+    problems = [f"full scan: {step}" for step in plan if step.startswith("SCAN ")]
+    text = "\n".join(plan)
+    problems += [f"index not used: {index}" for index in expected_indexes if index not in text]
+    return problems
+
+@pytest.fixture(scope="module")
+def conn():
+    engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(engine)
+    with engine.connect() as connection:
+        yield connection
+
+@pytest.mark.parametrize("name, statement, expected_indexes", hot_queries(), ids=[q[0] for q in hot_queries()])
+def test_hot_query_uses_index(conn, name, statement, expected_indexes):
+    plan = explain(conn, statement)
+    assert check_plan(plan, expected_indexes) == [], "\n".join(plan)
+
+def test_check_plan_reports_full_scan():
+    assert check_plan(["SCAN corpus"], ["ix_corpus_uploaded_by"]) == [
+        "full scan: SCAN corpus",
+        "index not used: ix_corpus_uploaded_by",
+    ]
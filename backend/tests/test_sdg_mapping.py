@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+from src.config import models
+from src.services import sdg_mapping
+
+LEXICON = {
+    "version": "test",
+    "sdgs": {6: ["water", "sanitation"], 7: ["energy", "solar"], 4: ["school", "water"]},
+}
+TOKEN2ID = {"water": 0, "sanitation": 1, "energy": 2, "solar": 3, "school": 4, "noise": 5}
+
+# Tiga topik: air, energi, dan topik tanpa kata kunci SDG
+TOPIC_WORD = np.array([
+    [0.5, 0.3, 0.0, 0.0, 0.0, 0.2],
+    [0.0, 0.0, 0.6, 0.3, 0.0, 0.1],
+    [0.0, 0.0, 0.0, 0.0, 0.0, 1.0],
+], dtype=np.float32)
+
+def _column(sdg_id: int) -> int:
+    return sdg_mapping.SDG_IDS.index(sdg_id)
+
+class _Model:
+    class id2word:
+        token2id = TOKEN2ID
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    models.Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(models.User(id="u", user_name="u", email="e", first_name="a", last_name="b"))
+        session.add(models.FilesUploaded(id=1, uploaded_by="u", file_name="f", file_size=1, file_type=".csv"))
+        session.add(models.TrainedModel(id=1, file_id=1, user_id="u", num_topics=3))
+        session.flush()
+        yield session
+
+def test_shared_keyword_is_split_between_sdgs():
+    terms = sdg_mapping.sdg_term_matrix(LEXICON, TOKEN2ID, len(TOKEN2ID))
+    assert terms.shape == (17, len(TOKEN2ID))
+    assert terms[_column(6), 0] == pytest.approx(0.5)
+    assert terms[_column(4), 0] == pytest.approx(0.5)
+    assert terms[_column(6), 1] == pytest.approx(1.0)
+    assert terms[:, 5].nnz == 0
+
+def test_topic_weights_match_dense_product():
+    terms = sdg_mapping.sdg_term_matrix(LEXICON, TOKEN2ID, len(TOKEN2ID))
+    weights, total = sdg_mapping.topic_sdg_weights(TOPIC_WORD, terms)
+    mass = TOPIC_WORD @ terms.toarray().T
+    np.testing.assert_allclose(total, mass.sum(axis=1), atol=1e-6)
+    np.testing.assert_allclose(weights[:2], mass[:2] / mass[:2].sum(axis=1, keepdims=True), atol=1e-6)
+    assert not weights[2].any()
+
+def test_mappings_are_keyed_by_model_and_lda_topic(db):
+    count = sdg_mapping.map_model_topics(db, db.get(models.TrainedModel, 1), _Model, TOPIC_WORD, LEXICON)
+    rows = db.query(models.SDGMapping).order_by(models.SDGMapping.lda_topic).all()
+    assert count == len(rows) > 0
+    assert {row.lda_topic for row in rows} == {0, 1}
+    assert all(row.model_id == 1 and row.topic_id is None and row.lexicon_version == "test" for row in rows)
+
+    # Pemetaan ulang menggantikan baris lama model yang sama
+    sdg_mapping.map_model_topics(db, db.get(models.TrainedModel, 1), _Model, TOPIC_WORD, LEXICON)
+    assert db.query(models.SDGMapping).count() == count
+
+    topic_sdg, version = sdg_mapping.model_topic_sdgs(db, 1, 3)
+    assert version == "test"
+    assert topic_sdg[1, _column(7)] == pytest.approx(1.0)
+    assert not topic_sdg[2].any()
+
+def _matrices(doc_ids: list, distributions: np.ndarray) -> dict:
+    rows, topics = np.nonzero(distributions)
+    return {
+        "doc_ids": np.asarray(doc_ids, dtype=np.int64),
+        "doc_indptr": np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=len(doc_ids))))),
+        "doc_topics": topics.astype(np.int32),
+        "doc_weights": distributions[rows, topics].astype(np.float32),
+    }
+
+def test_document_sdgs_weight_topic_mappings_by_document_topics():
+    topic_sdg = np.zeros((3, 17), dtype=np.float32)
+    topic_sdg[0, _column(6)] = 0.6
+    topic_sdg[0, _column(4)] = 0.4
+    topic_sdg[1, _column(7)] = 1.0
+    distributions = np.array([[0.75, 0.25, 0.0], [0.0, 0.0, 1.0], [0.1, 0.9, 0.0]], dtype=np.float32)
+    matrices = _matrices([10, 11, 12], distributions)
+
+    documents = sdg_mapping.document_sdgs(matrices, topic_sdg, [2, 0, 1], top_n=2)
+    assert [doc["id"] for doc in documents] == [12, 10, 11]
+    assert documents[0]["sdgs"] == [[7, pytest.approx(0.9)], [6, pytest.approx(0.06)]]
+    assert documents[1]["sdgs"] == [[6, pytest.approx(0.45)], [4, pytest.approx(0.3)]]
+    assert documents[2]["sdgs"] == []
+
+    totals = {row["sdg_id"]: row["weight"] for row in sdg_mapping.sdg_totals(matrices, topic_sdg)}
+    expected = distributions.sum(axis=0) @ topic_sdg
+    assert totals == {
+        sdg_id: pytest.approx(float(expected[_column(sdg_id)]), abs=1e-4) for sdg_id in (4, 6, 7)
+    }
@@ -0,0 +1,102 @@
+import json
+import pandas as pd
+import pytest
+from src.services.upload_reader import _READ_BLOCK, iter_batches, read_columns
+
+def _records(count: int, abstract_size: int = 10) -> list:
+    return [
+        {"title": f"Title {i}", "abstract": f"abstract {i} " + "x" * abstract_size, "year": 2000 + i % 20}
+        for i in range(count)
+    ]
+
+def _read(path, file_type: str, chunk_size: int = 7) -> tuple:
+    batches = list(iter_batches(path, file_type, chunk_size))
+    frames = [frame for frame, _ in batches]
+    fractions = [fraction for _, fraction in batches]
+    frame = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    return frame, fractions, [len(f) for f in frames]
+
+def _assert_records(frame: pd.DataFrame, records: list):
+    assert frame[["title", "abstract", "year"]].to_dict("records") == records
+
+def test_json_array_records_split_across_blocks(tmp_path):
+    # Record ~1 KiB sehingga banyak record terpotong di batas blok 64 KiB
+    records = _records(300, abstract_size=1000)
+    path = tmp_path / "corpus"
+    path.write_text(json.dumps(records), encoding="utf-8")
+    assert path.stat().st_size > 4 * _READ_BLOCK
+
+    frame, fractions, sizes = _read(path, ".json", chunk_size=50)
+    _assert_records(frame, records)
+    assert sizes == [50] * 6
+    assert fractions == sorted(fractions)
+    assert fractions[-1] == 1.0
+
+def test_json_record_larger_than_block(tmp_path):
+    records = _records(3, abstract_size=3 * _READ_BLOCK)
+    path = tmp_path / "corpus"
+    path.write_text(json.dumps(records), encoding="utf-8")
+
+    frame, _, _ = _read(path, ".json")
+    _assert_records(frame, records)
+
+def test_json_pretty_printed_array_with_unicode(tmp_path):
+    records = _records(20)
+    records[3]["title"] = "Kemiskinan di perkotaan — studi “kasus”"
+    path = tmp_path / "corpus"
+    path.write_text("﻿" + json.dumps(records, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    frame, fractions, sizes = _read(path, ".json")
+    _assert_records(frame, records)
+    assert sizes == [7, 7, 6]
+    assert fractions[-1] == 1.0
+
+def test_empty_json_array(tmp_path):
+    path = tmp_path / "corpus"
+    path.write_text(" [ ]\n", encoding="utf-8")
+
+    frame, fractions, _ = _read(path, ".json")
+    assert frame.empty and fractions == []
+    with pytest.raises(ValueError):
+        read_columns(path, ".json")
+
+def test_json_array_of_non_objects_is_rejected(tmp_path):
+    path = tmp_path / "corpus"
+    path.write_text("[1, 2, 3]", encoding="utf-8")
+    with pytest.raises(ValueError):
+        _read(path, ".json")
+
+def test_ndjson_inside_json_file(tmp_path):
+    records = _records(15)
+    path = tmp_path / "corpus"
+    path.write_text("\n".join(json.dumps(r) for r in records) + "\n\n", encoding="utf-8")
+
+    frame, fractions, sizes = _read(path, ".json")
+    _assert_records(frame, records)
+    assert sizes == [7, 7, 1]
+    assert fractions[-1] == 1.0
+
+def test_single_line_orient_columns_json(tmp_path):
+    records = _records(10)
+    path = tmp_path / "corpus"
+    pd.DataFrame(records).to_json(path, orient="columns")
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 1
+
+    frame, fractions, sizes = _read(path, ".json", chunk_size=4)
+    _assert_records(frame, records)
+    assert sizes == [4, 4, 2]
+    assert fractions[-1] == 1.0
+    assert read_columns(path, ".json") == {"title", "abstract", "year"}
+
+def test_ndjson_columns_are_normalized(tmp_path):
+    path = tmp_path / "corpus"
+    path.write_text('{" Title ": "a", "ABSTRACT": "b"}\n', encoding="utf-8")
+    assert read_columns(path, ".ndjson") == {"title", "abstract"}
+
+def test_csv_header_only(tmp_path):
+    path = tmp_path / "corpus"
+    path.write_text("Title,Abstract\n", encoding="utf-8")
+
+    frame, _, _ = _read(path, ".csv")
+    assert frame.empty
+    assert read_columns(path, ".csv") == {"title", "abstract"}
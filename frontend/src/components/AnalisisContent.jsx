@@ -177,6 +177,27 @@ const AnalisisContent = ({ isdarkmode = false }) => {
     });
   };
 
+  // Official SDG colors, index = sdg_id - 1
+  const sdgColors = [
+    "#E5243B",
+    "#DDA83A",
+    "#4C9F38",
+    "#C5192D",
+    "#FF3A21",
+    "#26BDE2",
+    "#FCC30B",
+    "#A21942",
+    "#FD6925",
+    "#DD1367",
+    "#FD9D24",
+    "#BF8B2E",
+    "#3F7E44",
+    "#0A97D9",
+    "#56C02B",
+    "#00689D",
+    "#19486A",
+  ];
+
   const makeAuthenticatedRequest = async (url, options = {}) => {
     const token = await getToken();
     if (!token) {
@@ -288,8 +309,8 @@ const AnalisisContent = ({ isdarkmode = false }) => {
 
       console.log("Analysis response:", response.data); // Debug log
 
-      const { analysis_id } = response.data;
-      setStatus((prev) => ({ ...prev, analysisId: analysis_id }));
+      const { job_id } = response.data;
+      setStatus((prev) => ({ ...prev, analysisId: job_id }));
 
       // Clear previous results when starting new analysis
       setData((prev) => ({ ...prev, topics: [], sdgResults: [] }));
@@ -303,6 +324,30 @@ const AnalisisContent = ({ isdarkmode = false }) => {
     }
   };
 
+  // SDG totals of an analysis as share of the total SDG weight (percent)
+  const fetchSdgResults = async (analysisId) => {
+    try {
+      const response = await makeAuthenticatedRequest(
+        `/analysis/${analysisId}/topic-sdgs`
+      );
+      const totals = response.data.totals || [];
+      const totalWeight = totals.reduce((sum, item) => sum + item.weight, 0);
+      if (totalWeight <= 0) return [];
+
+      return totals
+        .map((item) => ({
+          sdg: `SDG ${item.sdg_id}`,
+          description: item.sdg_name,
+          score: (item.weight / totalWeight) * 100,
+          color: sdgColors[(item.sdg_id - 1) % sdgColors.length],
+        }))
+        .sort((a, b) => b.score - a.score);
+    } catch (err) {
+      console.error("Failed to fetch SDG results:", err);
+      return [];
+    }
+  };
+
   const pollAnalysisStatus = async (analysisId) => {
     try {
       const response = await makeAuthenticatedRequest(
@@ -312,33 +357,22 @@ const AnalisisContent = ({ isdarkmode = false }) => {
 
       console.log("Polling result:", result); // Debug log
 
-      if (result.status === "completed") {
+      if (result.status === "done") {
         let topics = [];
-        let sdgResults = [];
-
-        // Handle different result formats
-        if (result.results) {
-          if (result.results.topic_distribution) {
-            const topicData = result.results.topic_distribution;
-            if (Array.isArray(topicData) && typeof topicData[0] === "string") {
-              topics = parseLDATopics(topicData);
-            } else {
-              topics = topicData;
-            }
-          } else if (
-            result.results.topics &&
-            Array.isArray(result.results.topics)
-          ) {
-            if (typeof result.results.topics[0] === "string") {
-              topics = parseLDATopics(result.results.topics);
-            } else {
-              topics = result.results.topics;
-            }
+
+        if (result.results?.topics && Array.isArray(result.results.topics)) {
+          if (typeof result.results.topics[0] === "string") {
+            topics = parseLDATopics(result.results.topics);
+          } else {
+            topics = result.results.topics;
           }
-          sdgResults =
-            result.results.sdg_mapping || result.results.sdg_results || [];
         }
 
+        // SDG mapping of the trained model comes from the analysis endpoint
+        const sdgResults = result.analysis_id
+          ? await fetchSdgResults(result.analysis_id)
+          : [];
+
         console.log("Parsed topics from polling:", topics); // Debug log
         console.log("Parsed SDG results from polling:", sdgResults); // Debug log
 
@@ -354,10 +388,15 @@ const AnalisisContent = ({ isdarkmode = false }) => {
           error: `Analysis failed: ${result.message || "Unknown error"}`,
         }));
         return true; // Stop polling
-      } else if (
-        result.status === "processing" ||
-        result.status === "pending"
-      ) {
+      } else if (result.status === "cancelled") {
+        setStatus((prev) => ({
+          ...prev,
+          loading: false,
+          analysisId: null,
+          error: "Analysis was cancelled",
+        }));
+        return true; // Stop polling
+      } else if (result.status === "queued" || result.status === "running") {
         console.log("Analysis still processing..."); // Debug log
         return false; // Continue polling
       }